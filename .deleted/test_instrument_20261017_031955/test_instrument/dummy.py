@@ -0,0 +1 @@
+print('Hello')
\ No newline at end of file
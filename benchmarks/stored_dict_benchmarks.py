@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for StoredDict, the storage used for ``RE.md``.
+
+Each benchmark prints a table.  Run all of them, or name one::
+
+    python benchmarks/stored_dict_benchmarks.py
+    python benchmarks/stored_dict_benchmarks.py durability --repeat 200
+
+.. autosummary::
+    ~bench_durability
+    ~bench_load
+    ~bench_update
+"""
+
+import argparse
+import collections.abc
+import functools
+import pathlib
+import statistics
+import tempfile
+import time
+
+import pyRestTable
+
+from apsbits.utils.config_loaders import load_config_yaml
+from apsbits.utils.stored_dict import DURABILITY_LEVELS
+from apsbits.utils.stored_dict import StoredDict
+
+ICONFIG_FILE = (
+    pathlib.Path(__file__).parent.parent
+    / "src"
+    / "apsbits"
+    / "demo_instrument"
+    / "configs"
+    / "iconfig.yml"
+)
+
+
+def sample_metadata(n_keys: int = 0) -> dict:
+    """A dictionary resembling RE.md, with 'n_keys' additional keys."""
+    md = {
+        "login_id": "user@host",
+        "pid": 12345,
+        "scan_id": 1,
+        "versions": {f"package_{i}": f"{i}.0.0" for i in range(15)},
+        "iconfig": load_config_yaml(ICONFIG_FILE),
+    }
+    md.update({f"key_{i:06d}": f"value {i}" for i in range(n_keys)})
+    return md
+
+
+def _milliseconds(times: list) -> str:
+    """Format the median time (as ms)."""
+    return f"{1000 * statistics.median(times):.3f}"
+
+
+def bench_durability(repeat: int = 100) -> pyRestTable.Table:
+    """Cost of StoredDict.dump() for each durability level."""
+    table = pyRestTable.Table()
+    table.labels = ["durability", "median (ms)", "min (ms)", "max (ms)"]
+    md = sample_metadata()
+    with tempfile.TemporaryDirectory() as tmp:
+        file = pathlib.Path(tmp) / "re_md.yml"
+        for durability in DURABILITY_LEVELS:
+            times = []
+            for i in range(repeat):
+                md["scan_id"] = i
+                t0 = time.perf_counter()
+                StoredDict.dump(file, md, durability=durability)
+                times.append(time.perf_counter() - t0)
+            table.addRow(
+                (
+                    durability,
+                    _milliseconds(times),
+                    f"{1000 * min(times):.3f}",
+                    f"{1000 * max(times):.3f}",
+                )
+            )
+    return table
+
+
+def bench_load(repeat: int = 5) -> pyRestTable.Table:
+    """Time to load RE.md, by number of keys: YAML parsers and load cache."""
+    table = pyRestTable.Table()
+    table.labels = [
+        "keys",
+        "yaml.Loader (ms)",
+        "CSafeLoader (ms)",
+        "load cache (ms)",
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        file = pathlib.Path(tmp) / "re_md.yml"
+        for n_keys in (10, 100, 1_000, 10_000):
+            StoredDict.dump(file, sample_metadata(n_keys), load_cache=True)
+            row = [n_keys]
+            for loader in (
+                load_config_yaml,  # pure Python, full loader
+                StoredDict.load,
+                functools.partial(StoredDict.load, load_cache=True),
+            ):
+                times = []
+                for _i in range(repeat):
+                    t0 = time.perf_counter()
+                    loader(file)
+                    times.append(time.perf_counter() - t0)
+                row.append(_milliseconds(times))
+            table.addRow(row)
+    return table
+
+
+def bench_update(repeat: int = 5) -> pyRestTable.Table:
+    """Cost per key of RE.md.update(): key by key, or with one set_many()."""
+    table = pyRestTable.Table()
+    table.labels = ["keys", "per key, __setitem__ (us)", "per key, update (us)"]
+    with tempfile.TemporaryDirectory() as tmp:
+        file = pathlib.Path(tmp) / "re_md.yml"
+        for n_keys in (10, 100, 1_000):
+            md = sample_metadata(n_keys)
+            row = [len(md)]
+            for update in (
+                collections.abc.MutableMapping.update,  # one key at a time
+                StoredDict.update,
+            ):
+                times = []
+                for _i in range(repeat):
+                    file.unlink(missing_ok=True)
+                    sdict = StoredDict(file, delay=60)  # no write while timing
+                    t0 = time.perf_counter()
+                    update(sdict, md)
+                    times.append((time.perf_counter() - t0) / len(md))
+                    sdict.flush()
+                row.append(f"{1e6 * statistics.median(times):.2f}")
+            table.addRow(row)
+    return table
+
+
+BENCHMARKS = {
+    "durability": bench_durability,
+    "load": bench_load,
+    "update": bench_update,
+}
+
+
+def main() -> None:
+    """Run the benchmarks named on the command line (default: all)."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", help=f"any of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, help="repetitions (default: varies)")
+    args = parser.parse_args()
+    unknown = sorted(set(args.names) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    for name in args.names or BENCHMARKS:
+        benchmark = BENCHMARKS[name]
+        print(f"\n{name}: {benchmark.__doc__}")
+        kwargs = {} if args.repeat is None else {"repeat": args.repeat}
+        print(benchmark(**kwargs))
+
+
+if __name__ == "__main__":
+    main()
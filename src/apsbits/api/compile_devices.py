@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compile an instrument's devices files into one device manifest.
+
+The manifest is used by ``make_devices()`` (with iconfig
+``MAKE_DEVICES.MANIFEST``) to skip parsing the devices files that have not
+changed since the manifest was written.
+"""
+
+__version__ = "1.0.0"
+
+import argparse
+import pathlib
+import sys
+from typing import List
+from typing import Tuple
+
+from apsbits.utils.config_loaders import load_config_yaml
+from apsbits.utils.device_manifest import DEFAULT_MANIFEST
+from apsbits.utils.device_manifest import compile_manifest
+
+
+def get_device_files(iconfig_file: pathlib.Path) -> Tuple[List[pathlib.Path], str]:
+    """
+    Get the devices files and the manifest name from an iconfig file.
+
+    :param iconfig_file: Path to the instrument's iconfig.yml file.
+    :return: A tuple containing the paths of the devices files
+             (``DEVICES_FILES`` and ``APS_DEVICES_FILES``) and the manifest
+             file name (``MAKE_DEVICES.MANIFEST``, or the default).
+    """
+    iconfig = load_config_yaml(iconfig_file)
+    configs_path = iconfig_file.parent
+
+    device_files = []
+    for key in ("DEVICES_FILES", "APS_DEVICES_FILES"):
+        names = iconfig.get(key) or []
+        if isinstance(names, str):
+            names = [names]
+        device_files.extend(configs_path / name for name in names)
+
+    manifest = (iconfig.get("MAKE_DEVICES") or {}).get("MANIFEST") or DEFAULT_MANIFEST
+    return device_files, manifest
+
+
+def main() -> None:
+    """
+    Parse arguments and compile the device manifest.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compile an instrument's devices files (named in its iconfig.yml) "
+            "into one device manifest."
+        )
+    )
+    parser.add_argument(
+        "iconfig", type=str, help="Path to the instrument's iconfig.yml file."
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        type=str,
+        help="Manifest file to write (default: from iconfig, in its directory).",
+    )
+    args = parser.parse_args()
+
+    iconfig_file = pathlib.Path(args.iconfig).resolve()
+    if not iconfig_file.exists():
+        print(f"Error: iconfig file '{iconfig_file}' does not exist.", file=sys.stderr)
+        sys.exit(1)
+
+    device_files, manifest = get_device_files(iconfig_file)
+    missing = [path for path in device_files if not path.exists()]
+    for path in missing:
+        print(f"Warning: devices file '{path}' does not exist.", file=sys.stderr)
+    device_files = [path for path in device_files if path not in missing]
+
+    output = pathlib.Path(args.output or iconfig_file.parent / manifest)
+    try:
+        result = compile_manifest(device_files, output)
+    except (ImportError, ValueError) as exc:
+        print(f"Error compiling the device manifest: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    for name, entry in result["files"].items():
+        count = sum(len(defn.get("devices", [defn])) for defn in entry["entries"])
+        print(f"  {name}: {count} devices")
+    print(f"Device manifest written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Serve an instrument's device PVs from a local caproto IOC, or benchmark them.
+
+``bits-sim-ioc serve path/to/configs/iconfig.yml`` serves the PVs of the
+devices (EpicsMotor, EpicsSignal, ...) in the instrument's devices files.
+``bits-sim-ioc benchmark path/to/configs/iconfig.yml`` starts that IOC and
+compares the time to build and connect the devices with each
+``OPHYD.CONTROL_LAYER``.  Each control layer is measured in a new Python
+process (``bits-sim-ioc measure``), since it cannot be changed once used.
+"""
+
+__version__ = "1.0.0"
+
+import argparse
+import json
+import logging
+import os
+import pathlib
+import socket
+import subprocess
+import sys
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Sequence
+
+from apsbits.api.compile_devices import get_device_files
+from apsbits.utils.config_loaders import load_config
+from apsbits.utils.config_model import CONTROL_LAYERS
+from apsbits.utils.sim_ioc import DEFAULT_PORT
+from apsbits.utils.sim_ioc import LOCALHOST
+from apsbits.utils.sim_ioc import ca_environment
+from apsbits.utils.sim_ioc import device_pvs
+from apsbits.utils.sim_ioc import make_pvdb
+from apsbits.utils.sim_ioc import measure_connections
+from apsbits.utils.sim_ioc import run_ioc
+
+logger = logging.getLogger(__name__)
+
+IOC_STARTUP_TIMEOUT = 120.0
+"""Seconds to wait for the simulated IOC to build its devices and start."""
+
+
+def benchmark(
+    iconfig_file: pathlib.Path,
+    control_layers: Sequence[str] = CONTROL_LAYERS,
+    timeout: float = 30.0,
+) -> List[Dict[str, Any]]:
+    """
+    Start the simulated IOC, then measure each control layer.
+
+    :param iconfig_file: Path to the instrument's iconfig.yml file.
+    :param control_layers: The ``OPHYD.CONTROL_LAYER`` values to compare.
+    :param timeout: Seconds to wait for the devices to connect.
+    :return: The result of ``measure_connections()`` for each control layer.
+    :raises RuntimeError: If the IOC does not start or a measurement fails.
+    """
+    port = _free_port()
+    env = {**os.environ, **ca_environment(port)}
+    command = [sys.executable, "-m", "apsbits.api.sim_ioc"]
+    ioc = subprocess.Popen(
+        [*command, "serve", str(iconfig_file), "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for_port(port, IOC_STARTUP_TIMEOUT, ioc)
+        results = []
+        for layer in control_layers:
+            process = subprocess.run(
+                [
+                    *command,
+                    "measure",
+                    str(iconfig_file),
+                    "--control-layer",
+                    layer,
+                    "--timeout",
+                    str(timeout),
+                ],
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            lines = process.stdout.strip().splitlines()
+            if process.returncode != 0 or not lines:
+                raise RuntimeError(
+                    f"Measurement with {layer!r} failed:\n{process.stderr}"
+                )
+            results.append(json.loads(lines[-1]))
+        return results
+    finally:
+        ioc.terminate()
+        ioc.wait(timeout=timeout)
+
+
+def _free_port() -> int:
+    """(internal) A TCP port, not in use now."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((LOCALHOST, 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float, process: subprocess.Popen) -> None:
+    """(internal) Wait until the IOC (in 'process') accepts connections."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"The simulated IOC ended (status {process.returncode})."
+            )
+        try:
+            with socket.create_connection((LOCALHOST, port), timeout=0.1):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"The simulated IOC did not start within {timeout} s.")
+
+
+def _device_files(iconfig_file: pathlib.Path) -> List[pathlib.Path]:
+    """(internal) Load iconfig.  Return its devices files which exist."""
+    load_config(iconfig_file)
+    device_files, _manifest = get_device_files(iconfig_file)
+    for path in device_files:
+        if not path.exists():
+            print(f"Warning: devices file '{path}' does not exist.", file=sys.stderr)
+    return [path for path in device_files if path.exists()]
+
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    """(internal) Print the benchmark results, as a table."""
+    import pyRestTable
+
+    table = pyRestTable.Table()
+    table.labels = list(results[0])
+    for result in results:
+        table.addRow(list(result.values()))
+    print(table)
+
+
+def main() -> None:
+    """
+    Parse arguments and serve, measure, or benchmark.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Serve the PVs of an instrument's devices from a local caproto IOC, "
+            "or compare the time to connect them with each control layer."
+        )
+    )
+    subcommands = parser.add_subparsers(dest="subcommand", required=True)
+
+    serve_parser = subcommands.add_parser("serve", help="Serve the device PVs.")
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Channel Access server port (default: {DEFAULT_PORT}).",
+    )
+
+    benchmark_parser = subcommands.add_parser(
+        "benchmark", help="Compare the control layers."
+    )
+    benchmark_parser.add_argument(
+        "--control-layer",
+        action="append",
+        choices=CONTROL_LAYERS,
+        help="Control layer to measure (repeat for more; default: all).",
+    )
+    benchmark_parser.add_argument(
+        "--json", action="store_true", help="Print the results as JSON."
+    )
+
+    measure_parser = subcommands.add_parser(
+        "measure",
+        help="Measure one control layer, in this process (used by 'benchmark').",
+    )
+    measure_parser.add_argument(
+        "--control-layer", choices=CONTROL_LAYERS, default=CONTROL_LAYERS[0]
+    )
+
+    for sub in (serve_parser, benchmark_parser, measure_parser):
+        sub.add_argument(
+            "iconfig", type=str, help="Path to the instrument's iconfig.yml file."
+        )
+    for sub in (benchmark_parser, measure_parser):
+        sub.add_argument(
+            "--timeout",
+            type=float,
+            default=30.0,
+            help="Seconds to wait for the devices to connect (default: 30).",
+        )
+    args = parser.parse_args()
+
+    iconfig_file = pathlib.Path(args.iconfig).resolve()
+    if not iconfig_file.exists():
+        print(f"Error: iconfig file '{iconfig_file}' does not exist.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.subcommand == "serve":
+        pvs = device_pvs(_device_files(iconfig_file))
+        if len(pvs) == 0:
+            print("Error: the devices use no EPICS PVs.", file=sys.stderr)
+            sys.exit(1)
+        print("Clients of this IOC need these environment variables:")
+        for key, value in ca_environment(args.port).items():
+            print(f"  export {key}={value}")
+        sys.stdout.flush()
+        run_ioc(make_pvdb(pvs), args.port)
+
+    elif args.subcommand == "measure":
+        from apsbits.utils.controls_setup import set_control_layer
+
+        set_control_layer(args.control_layer)
+        result = measure_connections(_device_files(iconfig_file), args.timeout)
+        print(json.dumps(result))
+
+    else:
+        try:
+            results = benchmark(
+                iconfig_file, args.control_layer or CONTROL_LAYERS, args.timeout
+            )
+        except RuntimeError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            _print_table(results)
+
+
+if __name__ == "__main__":
+    main()
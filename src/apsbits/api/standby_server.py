@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Warm-standby server: start instrument sessions in about a second.
+
+``bits-standby PACKAGE`` imports the slow-to-import modules (bluesky,
+databroker, matplotlib, IPython, ...) and parses the instrument's
+configuration files once, then waits.  ``bits-session PACKAGE`` asks it for
+a new session.  The server forks: the new process takes the terminal,
+working directory, and environment of ``bits-session`` and runs
+``from PACKAGE.startup import *`` in IPython.  Only the instrument's own
+startup (RunEngine, devices, and their EPICS connections) remains to do.
+When no server is running, ``bits-session`` starts the session itself.
+
+The server must not import ophyd (or any module which starts threads or an
+EPICS context).  These do not survive a fork.  The server checks that it
+has only one thread before it accepts requests.
+"""
+
+__version__ = "1.0.0"
+
+import argparse
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import pathlib
+import selectors
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import types
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Sequence
+
+logger = logging.getLogger(__name__)
+
+PREWARM_MODULES = (
+    "numpy",
+    "yaml",
+    "matplotlib",
+    "IPython",
+    "bluesky",
+    "bluesky.plans",
+    "bluesky.plan_stubs",
+    "bluesky.callbacks.best_effort",
+    "databroker",
+    "pyRestTable",
+    "apsbits.utils.config_loaders",
+)
+"""Modules imported by the server.  None may import ophyd."""
+
+FORWARDED_SIGNALS = ("SIGINT", "SIGQUIT", "SIGTERM", "SIGHUP", "SIGWINCH")
+"""Signals received by ``bits-session``, passed to its session."""
+
+
+def socket_path(package: str) -> pathlib.Path:
+    """
+    Default path of the server's socket for this instrument package.
+
+    :param package: The name of the instrument package.
+    :return: A path in ``$XDG_RUNTIME_DIR`` (or the temporary directory).
+    """
+    directory = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return pathlib.Path(directory) / f"bits-standby-{os.getuid()}-{package}.sock"
+
+
+def prewarm(package: str, modules: Sequence[str] = PREWARM_MODULES) -> None:
+    """
+    Import 'modules' and parse the configuration files of 'package'.
+
+    :param package: The name of the instrument package (not imported).
+    :param modules: The modules to import.
+    :raises RuntimeError: If more than one thread is running afterwards.
+    """
+    t0 = time.time()
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as exc:
+            logger.warning("Cannot import %r: %s", name, exc)
+
+    spec = importlib.util.find_spec(package)
+    if spec is not None and spec.submodule_search_locations:
+        configs_path = pathlib.Path(spec.submodule_search_locations[0]) / "configs"
+        if configs_path.is_dir():
+            from apsbits.utils.config_loaders import preparse_configs
+
+            preparse_configs(configs_path)
+
+    if threading.active_count() > 1:
+        names = [thread.name for thread in threading.enumerate()]
+        raise RuntimeError(
+            "Cannot fork sessions: these modules started threads "
+            f"({', '.join(names)}).  Remove them from the modules to import."
+        )
+    logger.info("Ready for %r sessions in %.3f s.", package, time.time() - t0)
+
+
+def serve(
+    package: str,
+    path: Optional[pathlib.Path] = None,
+    modules: Sequence[str] = PREWARM_MODULES,
+) -> None:
+    """
+    Prewarm, then fork a session for each request, until terminated.
+
+    :param package: The name of the instrument package.
+    :param path: The server's socket (default: ``socket_path(package)``).
+    :param modules: The modules to import before accepting requests.
+    """
+    path = pathlib.Path(path or socket_path(package))
+    prewarm(package, modules)
+
+    if path.exists():
+        path.unlink()  # Left by a server which was not stopped cleanly.
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o077)  # Only this user may connect.
+    try:
+        listener.bind(str(path))
+    finally:
+        os.umask(umask)
+    listener.listen()
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    sessions: Dict[int, socket.socket] = {}  # pid: connection to bits-session
+    logger.info("Waiting for requests on %s", path)
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(listener, selectors.EVENT_READ)
+            while True:
+                if selector.select(timeout=0.2):
+                    conn, _ = listener.accept()
+                    pid = _start_session(package, conn, listener, selector, sessions)
+                    if pid is not None:
+                        sessions[pid] = conn
+                _reap(sessions)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        if path.exists():
+            path.unlink()
+        logger.info("Stopped.")
+
+
+def _start_session(package: str, conn, listener, selector, sessions) -> Optional[int]:
+    """
+    (internal) Fork a session for this request.  Return its process id.
+
+    The session closes the server's selector, listener, and connections.
+    """
+    if not _same_user(conn):
+        logger.warning("Request from another user refused.")
+        conn.close()
+        return None
+    try:
+        request, fds = _receive(conn)
+    except (OSError, ValueError) as exc:
+        logger.warning("Bad request: %s", exc)
+        conn.close()
+        return None
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:  # the session
+        status = 1
+        try:
+            selector.close()  # Its epoll (or kqueue) file is not the session's.
+            listener.close()
+            for other in [conn, *sessions.values()]:
+                other.close()
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            status = run_session(package, request)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(status)
+
+    for fd in fds:
+        os.close(fd)
+    _send(conn, {"pid": pid})
+    logger.info("Session %d started.", pid)
+    return pid
+
+
+def _reap(sessions: Dict[int, socket.socket]) -> None:
+    """(internal) Report the exit status of each finished session."""
+    while sessions:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        code = os.waitstatus_to_exitcode(status)
+        conn = sessions.pop(pid, None)
+        if conn is not None:
+            try:
+                _send(conn, {"status": code})
+            except OSError:
+                pass  # bits-session has gone.
+            conn.close()
+        logger.info("Session %d ended (status %d).", pid, code)
+
+
+def run_session(package: str, request: Dict[str, Any]) -> int:
+    """
+    Run a session, as described by a request: return its exit status.
+
+    Runs ``from PACKAGE.startup import *`` and then the request's command or,
+    without a command, an IPython console.
+
+    :param package: The name of the instrument package.
+    :param request: The session's ``cwd``, ``env``, ``argv``, and ``command``.
+    :return: The exit status.
+    """
+    os.chdir(request["cwd"])
+    # As the interpreter does for a command (or console): import from cwd.
+    sys.path.insert(0, request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = list(request["argv"])
+
+    if "apsbits" in sys.modules:
+        # Log files belong in the session's directory.
+        from apsbits.utils.logging_setup import configure_logging
+
+        configure_logging()
+
+    startup = f"from {package}.startup import *"
+    try:
+        if request.get("command") is None:
+            import IPython
+
+            IPython.start_ipython(argv=["-i", "-c", startup])
+        else:
+            main_module = types.ModuleType("__main__")
+            sys.modules["__main__"] = main_module
+            code = f"{startup}\n{request['command']}"
+            exec(compile(code, "<bits-session>", "exec"), vars(main_module))
+    except SystemExit as exc:
+        if exc.code is None or isinstance(exc.code, int):
+            return exc.code or 0
+        print(exc.code, file=sys.stderr)
+        return 1
+    except BaseException:
+        import traceback
+
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def request_session(
+    package: str,
+    command: Optional[str] = None,
+    path: Optional[pathlib.Path] = None,
+) -> int:
+    """
+    Ask the server for a session with this terminal, directory, environment.
+
+    :param package: The name of the instrument package.
+    :param command: Python code to run after startup (default: IPython).
+    :param path: The server's socket (default: ``socket_path(package)``).
+    :return: The exit status of the session.
+    :raises OSError: If no server is running.
+    """
+    path = pathlib.Path(path or socket_path(package))
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(str(path))
+        request = {
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+            "argv": sys.argv,
+            "command": command,
+        }
+        payload = json.dumps(request).encode()
+        socket.send_fds(conn, [struct.pack("!I", len(payload)) + payload], [0, 1, 2])
+
+        reader = conn.makefile("r")
+        pid = json.loads(reader.readline())["pid"]
+
+        def forward(signum, frame):
+            os.kill(pid, signum)
+
+        for name in FORWARDED_SIGNALS:
+            signal.signal(getattr(signal, name), forward)
+
+        reply = reader.readline()  # when the session ends
+        return json.loads(reply)["status"] if reply else 1
+    finally:
+        conn.close()
+
+
+def _receive(conn):
+    """(internal) A request (JSON) and the three standard file descriptors."""
+    data, fds, _flags, _address = socket.recv_fds(conn, 65536, 3)
+    if len(fds) != 3 or len(data) < 4:
+        for fd in fds:
+            os.close(fd)
+        raise ValueError("expected a request and 3 file descriptors")
+    (size,) = struct.unpack("!I", data[:4])
+    data = data[4:]
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ValueError("incomplete request")
+        data += chunk
+    return json.loads(data), fds
+
+
+def _send(conn, message: Dict[str, Any]) -> None:
+    """(internal) Send one line of JSON."""
+    conn.sendall(json.dumps(message).encode() + b"\n")
+
+
+def _same_user(conn) -> bool:
+    """(internal) Is the peer run by this user?  (Where it can be checked.)"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True  # The socket is accessible only by this user.
+    credentials = conn.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _pid, uid, _gid = struct.unpack("3i", credentials)
+    return uid == os.getuid()
+
+
+def main() -> None:
+    """
+    Parse arguments and run the warm-standby server.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Import the slow-to-import modules once, then fork a new session "
+            "of the instrument for each 'bits-session' request."
+        )
+    )
+    parser.add_argument("package_name", type=str, help="Name of the package.")
+    parser.add_argument("--socket", type=str, help="Path of the server's socket.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    try:
+        serve(args.package_name, args.socket)
+    except RuntimeError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+def session_main() -> None:
+    """
+    Parse arguments and start a session (from the server, if it is running).
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Start a session of the instrument: forked from a running "
+            "'bits-standby' server or, without one, here."
+        )
+    )
+    parser.add_argument("package_name", type=str, help="Name of the package.")
+    parser.add_argument("--socket", type=str, help="Path of the server's socket.")
+    parser.add_argument(
+        "-c",
+        "--command",
+        type=str,
+        help="Python code to run after startup (default: an IPython console).",
+    )
+    args = parser.parse_args()
+
+    try:
+        status = request_session(args.package_name, args.command, args.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print("No bits-standby server: starting here.", file=sys.stderr)
+        request = {
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+            "argv": sys.argv,
+            "command": args.command,
+        }
+        status = run_session(args.package_name, request)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
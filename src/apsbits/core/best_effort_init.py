@@ -3,18 +3,26 @@ BestEffortCallback: simple real-time visualizations, provides ``bec``.
 ======================================================================
 
 .. autosummary::
+    ~configure_bec
     ~init_bec_peaks
 """
 
 import logging
+import weakref
 
 from bluesky.callbacks.best_effort import BestEffortCallback
 
+from apsbits.utils.config_loaders import get_config_object
+from apsbits.utils.config_loaders import subscribe_config
+from apsbits.utils.config_model import compile_config
 from apsbits.utils.helper_functions import running_in_queueserver
 
 logger = logging.getLogger(__name__)
 logger.bsdev(__file__)
 
+_bec_ref = None
+"""(internal) Weak reference to the bec of the latest init_bec_peaks()."""
+
 
 def init_bec_peaks(iconfig):
     """
@@ -31,21 +39,43 @@ def init_bec_peaks(iconfig):
     bec = BestEffortCallback()
     """BestEffortCallback object, creates live tables and plots."""
 
-    bec_config = iconfig.get("BEC", {})
-
-    if not bec_config.get("BASELINE", True):
-        bec.disable_baseline()
-
-    if not bec_config.get("HEADING", True):
-        bec.disable_heading()
-
-    if not bec_config.get("PLOTS", True) or running_in_queueserver():
-        bec.disable_plots()
+    global _bec_ref
 
-    if not bec_config.get("TABLE", True):
-        bec.disable_table()
+    configure_bec(bec, compile_config(iconfig).BEC)
+    _bec_ref = weakref.ref(bec)
+    subscribe_config(_reconfigure_bec, "BEC")  # Once, for the latest bec.
 
     peaks = bec.peaks
     """Dictionary with statistical analysis of LivePlots."""
 
     return bec, peaks
+
+
+def _reconfigure_bec(changes):
+    """(internal) The ``BEC`` section changed: configure the latest bec."""
+    bec = None if _bec_ref is None else _bec_ref()
+    if bec is not None:
+        configure_bec(bec, get_config_object().BEC)
+
+
+def configure_bec(bec, bec_config):
+    """
+    Enable (or disable) the parts of a BestEffortCallback object.
+
+    Also called when the ``BEC`` section of iconfig changes.
+
+    Parameters:
+        bec (BestEffortCallback): The object to configure.
+        bec_config (BecConfig): The ``BEC`` section of iconfig.
+    """
+    for key, part in (
+        ("BASELINE", "baseline"),
+        ("HEADING", "heading"),
+        ("PLOTS", "plots"),
+        ("TABLE", "table"),
+    ):
+        enable = getattr(bec_config, key)
+        if part == "plots" and running_in_queueserver():
+            enable = False
+        action = "enable" if enable else "disable"
+        getattr(bec, f"{action}_{part}")()
@@ -19,12 +19,15 @@ from typing import Tuple
 import bluesky
 from bluesky.utils import ProgressBarManager
 
+from apsbits.utils.config_loaders import get_config_object
+from apsbits.utils.config_loaders import subscribe_config
+from apsbits.utils.config_model import compile_config
 from apsbits.utils.controls_setup import connect_scan_id_pv
 from apsbits.utils.controls_setup import set_control_layer
 from apsbits.utils.controls_setup import set_timeouts
 from apsbits.utils.metadata import get_md_path
+from apsbits.utils.metadata import make_md_storage
 from apsbits.utils.metadata import re_metadata
-from apsbits.utils.stored_dict import StoredDict
 
 logger = logging.getLogger(__name__)
 logger.bsdev(__file__)
@@ -68,12 +71,13 @@ def init_RE(
         additional configurations such as control layer, timeouts, and progress bar
         integration are applied.
     """
-    re_config = iconfig.get("RUN_ENGINE", {})
+    config = compile_config(iconfig)  # Problems in iconfig raise ValueError.
+    re_config = config.RUN_ENGINE
 
     # Steps that must occur before any EpicsSignalBase (or subclass) is created.
-    control_layer = iconfig.get("OPHYD", {}).get("CONTROL_LAYER", "PyEpics")
-    set_control_layer(control_layer=control_layer)
-    set_timeouts(timeouts=iconfig.get("OPHYD", {}).get("TIMEOUTS", {}))
+    set_control_layer(control_layer=config.OPHYD.CONTROL_LAYER)
+    set_timeouts(timeouts=config.OPHYD.TIMEOUTS)
+    subscribe_config(_apply_timeouts, "OPHYD.TIMEOUTS")  # Once, for all signals.
 
     RE = bluesky.RunEngine()
     """The Bluesky RunEngine object."""
@@ -85,39 +89,34 @@ def init_RE(
     MD_PATH = get_md_path(iconfig)
     # Save/restore RE.md dictionary in the specified order.
     if MD_PATH is not None:
-        handler_name = StoredDict
-        logger.debug(
-            "Selected %r to store 'RE.md' dictionary in %s.",
-            handler_name,
-            MD_PATH,
-        )
         try:
-            if handler_name == "PersistentDict":
-                RE.md = bluesky.utils.PersistentDict(MD_PATH)
-            else:
-                RE.md = StoredDict(MD_PATH)
+            RE.md = make_md_storage(iconfig, MD_PATH)
         except Exception as error:
             print(
                 "\n"
-                f"Could not create {handler_name} for RE metadata. Continuing "
+                f"Could not create {re_config.MD_BACKEND} for RE metadata. Continuing "
                 f"without saving metadata to disk. {error=}\n"
             )
-            logger.warning("%s('%s') error:%s", handler_name, MD_PATH, error)
+            logger.warning("%s('%s') error:%s", re_config.MD_BACKEND, MD_PATH, error)
 
     if cat_instance is not None:
         RE.md.update(re_metadata(iconfig, cat_instance))  # programmatic metadata
-        RE.md.update(re_config.get("DEFAULT_METADATA", {}))
+        RE.md.update(re_config.DEFAULT_METADATA)
         RE.subscribe(cat_instance.v1.insert)
     if bec_instance is not None:
         RE.subscribe(bec_instance)
     RE.preprocessors.append(sd)
 
-    scan_id_pv = iconfig.get("RUN_ENGINE", {}).get("SCAN_ID_PV")
-    connect_scan_id_pv(RE, pv=scan_id_pv)
+    connect_scan_id_pv(RE, pv=re_config.SCAN_ID_PV)
 
-    if re_config.get("USE_PROGRESS_BAR", True):
+    if re_config.USE_PROGRESS_BAR:
         # Add a progress bar.
         pbar_manager = ProgressBarManager()
         RE.waiting_hook = pbar_manager
 
     return RE, sd
+
+
+def _apply_timeouts(changes):
+    """(internal) ``OPHYD.TIMEOUTS`` changed: apply to the EPICS signals."""
+    set_timeouts(get_config_object().OPHYD.TIMEOUTS)
@@ -7,14 +7,11 @@ This module provides callbacks for writing data to Nexus data files.
 import logging
 
 from apsbits.utils.aps_functions import host_on_aps_subnet
-from apsbits.utils.config_loaders import get_config
+from apsbits.utils.config_loaders import get_config_object
 
 logger = logging.getLogger(__name__)
 logger.bsdev(__file__)
 
-# Get the configuration
-iconfig = get_config()
-
 
 if host_on_aps_subnet():
     from apstools.callbacks import NXWriterAPS as NXWriter
@@ -44,15 +41,13 @@ def nxwriter_init(RE):
     nxwriter = MyNXWriter()  # create the callback instance
     """The NeXus file writer object."""
 
-    if iconfig.get("NEXUS_DATA_FILES", {}).get("ENABLE", False):
+    nexus_config = get_config_object().NEXUS_DATA_FILES
+    if nexus_config.ENABLE:
         RE.subscribe(nxwriter.receiver)  # write data to NeXus files
 
-    nxwriter.file_extension = iconfig.get("NEXUS_DATA_FILES", {}).get(
-        "FILE_EXTENSION", "hdf"
-    )
+    nxwriter.file_extension = nexus_config.FILE_EXTENSION
 
     print(nxwriter.file_extension)
-    warn_missing = iconfig.get("NEXUS_DATA_FILES", {}).get("WARN_MISSING", False)
-    nxwriter.warn_on_missing_content = warn_missing
+    nxwriter.warn_on_missing_content = nexus_config.WARN_MISSING
 
     return nxwriter
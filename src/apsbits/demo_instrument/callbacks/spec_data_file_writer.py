@@ -17,13 +17,12 @@ import pathlib
 import apstools.callbacks
 import apstools.utils
 
-from apsbits.utils.config_loaders import get_config
+from apsbits.utils.config_loaders import get_config_object
 
 logger = logging.getLogger(__name__)
 logger.bsdev(__file__)
 
-iconfig = get_config()
-file_extension = iconfig.get("SPEC_DATA_FILES", {}).get("FILE_EXTENSION", "dat")
+file_extension = get_config_object().SPEC_DATA_FILES.FILE_EXTENSION
 
 
 def spec_comment(comment, doc=None):
@@ -68,7 +67,7 @@ def init_specwriter_with_RE(RE):
     # make the SPEC file in current working directory (assumes is writable)
     specwriter.newfile(specwriter.spec_filename)
 
-    if iconfig.get("SPEC_DATA_FILES", {}).get("ENABLE", False):
+    if get_config_object().SPEC_DATA_FILES.ENABLE:
         RE.subscribe(specwriter.receiver)  # write data to SPEC files
         logger.info("SPEC data file: %s", specwriter.spec_filename.resolve())
 
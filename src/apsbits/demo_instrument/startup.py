@@ -16,6 +16,8 @@ from apsbits.core.catalog_init import init_catalog
 from apsbits.core.run_engine_init import init_RE
 from apsbits.utils.aps_functions import aps_dm_setup
 from apsbits.utils.config_loaders import get_config
+from apsbits.utils.config_loaders import get_config_object
+from apsbits.utils.config_loaders import watch_config
 from apsbits.utils.controls_setup import oregistry
 from apsbits.utils.helper_functions import register_bluesky_magics
 from apsbits.utils.helper_functions import running_in_queueserver
@@ -35,18 +37,21 @@ aps_dm_setup(iconfig.get("DM_SETUP_FILE"))
 if iconfig.get("USE_BLUESKY_MAGICS", False):
     register_bluesky_magics()
 
+if iconfig.get("WATCH_ICONFIG", False):
+    watch_config()  # Apply changes to iconfig.yml without a restart.
+
 # Initialize core components
 bec, peaks = init_bec_peaks(iconfig)
 cat = init_catalog(iconfig)
 RE, sd = init_RE(iconfig, bec_instance=bec, cat_instance=cat)
 
 # Import optional components based on configuration
-if iconfig.get("NEXUS_DATA_FILES", {}).get("ENABLE", False):
+if get_config_object().NEXUS_DATA_FILES.ENABLE:
     from .callbacks.nexus_data_file_writer import nxwriter_init
 
     nxwriter = nxwriter_init(RE)
 
-if iconfig.get("SPEC_DATA_FILES", {}).get("ENABLE", False):
+if get_config_object().SPEC_DATA_FILES.ENABLE:
     from .callbacks.spec_data_file_writer import init_specwriter_with_RE
     from .callbacks.spec_data_file_writer import newSpecFile  # noqa: F401
     from .callbacks.spec_data_file_writer import spec_comment  # noqa: F401
@@ -2,15 +2,21 @@
 Test the configuration management module.
 """
 
+import os
 import pathlib
 import tempfile
+import threading
 from typing import TYPE_CHECKING
 
 import pytest
 import tomli_w
 import yaml
 
+from apsbits.utils.config_loaders import clear_parse_cache
 from apsbits.utils.config_loaders import load_config
+from apsbits.utils.config_loaders import load_config_yaml
+from apsbits.utils.config_loaders import parse_cache_stats
+from apsbits.utils.config_loaders import set_parse_cache_dir
 
 if TYPE_CHECKING:
     pass
@@ -111,3 +117,152 @@ def test_load_config_invalid_content() -> None:
             load_config(path)
     finally:
         path.unlink()
+
+
+def test_parse_cache(yml_config_file: pathlib.Path, mocker) -> None:
+    """An unchanged file is parsed only once."""
+    clear_parse_cache()
+    parse = mocker.spy(yaml, "load")
+
+    config = load_config_yaml(yml_config_file)
+    assert config["test_key"] == "test_value"
+    config["test_key"] = "changed by caller"  # Each caller gets a copy.
+    assert load_config_yaml(str(yml_config_file))["test_key"] == "test_value"
+    assert parse.call_count == 1
+    stats = parse_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    # load_config() parses with a different (safe) loader.
+    load_config(yml_config_file)
+    load_config(yml_config_file)
+    stats = parse_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+
+    # A changed file is parsed again.
+    yml_config_file.write_text("test_key: revised\n")
+    st = yml_config_file.stat()
+    os.utime(yml_config_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert load_config_yaml(yml_config_file)["test_key"] == "revised"
+    assert parse_cache_stats()["misses"] == 3
+
+
+def test_parse_cache_dir(yml_config_file: pathlib.Path) -> None:
+    """The on-disk cache skips parsing in a new session."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        set_parse_cache_dir(pathlib.Path(cache_dir))
+        try:
+            clear_parse_cache()
+            expected = load_config_yaml(yml_config_file)
+            assert len(list(pathlib.Path(cache_dir).iterdir())) == 1
+
+            clear_parse_cache()  # as in a new session
+            assert load_config_yaml(yml_config_file) == expected
+            stats = parse_cache_stats()
+            assert (stats["disk_hits"], stats["misses"]) == (1, 0)
+        finally:
+            set_parse_cache_dir(None)
+
+
+def test_diff_config() -> None:
+    """Changes are reported by (dotted) key."""
+    from apsbits.utils.config_loaders import MISSING
+    from apsbits.utils.config_loaders import diff_config
+
+    old = {"BEC": {"PLOTS": False, "TABLE": True}, "A": 1, "GONE": 2}
+    new = {"BEC": {"PLOTS": True, "TABLE": True}, "A": 1, "NEW": {"X": 3}}
+    assert diff_config(old, new) == {
+        "BEC.PLOTS": (False, True),
+        "GONE": (2, MISSING),
+        "NEW": (MISSING, {"X": 3}),
+    }
+
+
+def test_reload_config(yml_config_file: pathlib.Path) -> None:
+    """Subscribers are called with the changes of their keys."""
+    from apsbits.utils.config_loaders import _subscribers
+    from apsbits.utils.config_loaders import get_config
+    from apsbits.utils.config_loaders import reload_config
+    from apsbits.utils.config_loaders import stop_watching_config
+    from apsbits.utils.config_loaders import subscribe_config
+    from apsbits.utils.config_loaders import unsubscribe_config
+    from apsbits.utils.config_loaders import update_config
+    from apsbits.utils.config_loaders import watch_config
+
+    def write(config):
+        st = yml_config_file.stat() if yml_config_file.exists() else None
+        yml_config_file.write_text(yaml.dump(config))
+        if st is not None:  # Make sure the file looks changed.
+            os.utime(yml_config_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**7))
+
+    saved = dict(get_config())
+    bec_changes, all_changes = [], []
+    write({"BEC": {"PLOTS": False}, "OPHYD": {"TIMEOUTS": {"PV_READ": 5}}})
+    try:
+        load_config(yml_config_file)
+        update_config({"EXTRA": "kept"})
+        n_subscribers = len(_subscribers)
+        subscribe_config(bec_changes.append, "BEC")
+        subscribe_config(all_changes.append)
+        subscribe_config(bec_changes.append, "BEC")  # replaces, not added
+        assert len(_subscribers) == n_subscribers + 2
+
+        write({"BEC": {"PLOTS": True}, "OPHYD": {"TIMEOUTS": {"PV_READ": 5}}})
+        assert reload_config() == {"BEC.PLOTS": (False, True)}
+        assert get_config()["BEC"] == {"PLOTS": True}
+        assert get_config()["EXTRA"] == "kept"
+        assert bec_changes == [{"BEC.PLOTS": (False, True)}]
+
+        write({"BEC": {"PLOTS": True}, "OPHYD": {"TIMEOUTS": {"PV_READ": 1}}})
+        assert reload_config() == {"OPHYD.TIMEOUTS.PV_READ": (5, 1)}
+        assert len(bec_changes) == 1  # not called
+        assert len(all_changes) == 2
+
+        assert reload_config() == {}  # no changes
+
+        thread = watch_config(interval=0.01)
+        write({"BEC": {"PLOTS": False}, "OPHYD": {"TIMEOUTS": {"PV_READ": 1}}})
+        for _i in range(200):
+            if len(bec_changes) > 1:
+                break
+            thread.join(0.01)
+        assert bec_changes[-1] == {"BEC.PLOTS": (True, False)}
+        stop_watching_config()
+
+        # Readers on other threads never see the configuration incomplete.
+        missing = []
+
+        def reader():
+            for _i in range(20_000):
+                if get_config().get("EXTRA") != "kept":
+                    missing.append(dict(get_config()))
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        for i in range(50):
+            write({"BEC": {"PLOTS": i % 2 == 0}, "N": i})
+            reload_config()
+        thread.join()
+        assert missing == []
+    finally:
+        stop_watching_config()
+        unsubscribe_config(bec_changes.append)
+        unsubscribe_config(all_changes.append)
+        assert len(_subscribers) == n_subscribers
+        get_config().clear()
+        get_config().update(saved)
+
+
+def test_init_subscribes_once() -> None:
+    """Creating bec (or the RunEngine) again does not add subscribers."""
+    from apsbits.core.best_effort_init import _reconfigure_bec
+    from apsbits.core.best_effort_init import init_bec_peaks
+    from apsbits.utils.config_loaders import _subscribers
+    from apsbits.utils.config_loaders import unsubscribe_config
+
+    init_bec_peaks({})
+    n_subscribers = len(_subscribers)
+    bec, _peaks = init_bec_peaks({"BEC": {"TABLE": False}})
+    assert len(_subscribers) == n_subscribers
+    assert [item[0] for item in _subscribers].count(_reconfigure_bec) == 1
+    assert not bec._table_enabled
+    unsubscribe_config(_reconfigure_bec)
@@ -0,0 +1,76 @@
+"""
+Test the utils.config_model module.
+"""
+
+import dataclasses
+import logging
+import pathlib
+
+import pytest
+
+from apsbits.utils.config_loaders import load_config_yaml
+from apsbits.utils.config_model import IConfig
+from apsbits.utils.config_model import compile_config
+
+ICONFIG_FILE = (
+    pathlib.Path(__file__).parent.parent / "demo_instrument" / "configs" / "iconfig.yml"
+)
+
+
+def test_demo_iconfig():
+    """The demo iconfig compiles, values are converted."""
+    config = compile_config(load_config_yaml(ICONFIG_FILE))
+    assert isinstance(config, IConfig)
+    assert config.MAKE_DEVICES.LOG_LEVEL == logging.INFO
+    assert config.OPHYD.TIMEOUTS.PV_READ == 5.0
+    assert config.OPHYD.CONTROL_LAYER == "PyEpics"
+    assert config.BEC.PLOTS is False
+    assert config.SPEC_DATA_FILES.FILE_EXTENSION == "dat"
+    assert config.RUN_ENGINE.DEFAULT_METADATA["proposal_id"] == "commissioning"
+
+
+def test_defaults():
+    """Missing sections and keys get their defaults."""
+    config = compile_config({"OTHER": {"anything": 1}, "NEXUS_DATA_FILES": None})
+    assert config.RUN_ENGINE.MD_BACKEND == "StoredDict"
+    assert config.RUN_ENGINE.USE_PROGRESS_BAR is True
+    assert config.NEXUS_DATA_FILES.FILE_EXTENSION == "hdf"
+    assert config.OPHYD.TIMEOUTS.PV_CONNECTION == 60.0
+    assert config.MAKE_DEVICES.LOG_LEVEL == logging.INFO
+
+
+def test_read_only():
+    """The compiled object cannot be changed."""
+    config = compile_config({"BEC": {"TABLE": False}})
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        config.BEC.TABLE = True
+    with pytest.raises(TypeError):
+        config.RUN_ENGINE.DEFAULT_METADATA["key"] = "value"
+    assert not hasattr(config.BEC, "__dict__")  # slotted
+
+
+@pytest.mark.parametrize(
+    "iconfig, problem",
+    [
+        [{"BEC": {"PLOT": False}}, "BEC: unknown key 'PLOT'"],
+        [{"BEC": {"PLOTS": "no"}}, "BEC.PLOTS: must be true or false"],
+        [{"BEC": []}, "BEC: must be a dictionary"],
+        [{"MAKE_DEVICES": {"LOG_LEVEL": "loud"}}, "MAKE_DEVICES.LOG_LEVEL"],
+        [{"OPHYD": {"TIMEOUTS": {"PV_READ": -1}}}, "OPHYD.TIMEOUTS.PV_READ"],
+        [{"OPHYD": {"CONTROL_LAYER": "pva"}}, "OPHYD.CONTROL_LAYER"],
+        [{"RUN_ENGINE": {"MD_BACKEND": "zip"}}, "RUN_ENGINE.MD_BACKEND"],
+        [{"RUN_ENGINE": {"MD_HISTORY": 2.5}}, "RUN_ENGINE.MD_HISTORY"],
+    ],
+)
+def test_problems(iconfig, problem):
+    """Unknown keys and wrong values raise ValueError."""
+    with pytest.raises(ValueError, match="Problems in iconfig") as exc:
+        compile_config(iconfig)
+    assert problem in str(exc.value)
+
+
+def test_all_problems_reported():
+    """Each problem is reported, not just the first."""
+    with pytest.raises(ValueError) as exc:
+        compile_config({"BEC": {"PLOT": 1}, "SPEC_DATA_FILES": {"ENABLE": 1}})
+    assert len(str(exc.value).splitlines()) == 3
@@ -1,8 +1,18 @@
 """Test the device factories."""
 
+import threading
+import time
+
+import numpy as np
 import pytest
 
+from apsbits.utils.controls_setup import oregistry
+from apsbits.utils.sim_creator import SimFrameDetector
+from apsbits.utils.sim_creator import factory_base
+from apsbits.utils.sim_creator import factory_specs
+from apsbits.utils.sim_creator import frame_detectors
 from apsbits.utils.sim_creator import motors
+from apsbits.utils.sim_creator import parse_numbers
 from apsbits.utils.sim_creator import predefined_device
 
 
@@ -42,3 +52,115 @@ def test_motors(kwargs):
             assert device.name.startswith("m")
             assert isinstance(int(device.name[1:]), int)
     assert count == (1 + kwargs["last"] - kwargs["first"])
+
+
+@pytest.mark.parametrize(
+    "numbers, expected",
+    [
+        ["1-4,7-9,30", [1, 2, 3, 4, 7, 8, 9, 30]],
+        [" 9 - 7 , 2", [7, 8, 9, 2]],
+        [5, [5]],
+        [[1, "3-4", "10"], [1, 3, 4, 10]],
+    ],
+)
+def test_parse_numbers(numbers, expected):
+    """numbers from lists of ranges"""
+    assert parse_numbers(numbers) == expected
+
+
+@pytest.mark.parametrize("numbers", ["", "1-", "a-4", "1-4,3", [], "1;2"])
+def test_parse_numbers_errors(numbers):
+    """bad lists of ranges"""
+    with pytest.raises(ValueError):
+        parse_numbers(numbers)
+
+
+def test_factory_numbers():
+    """one entry, several ranges, registered together"""
+    creator, specs = factory_specs(prefix="ioc:m", names="rm{}", numbers="1-2,5")
+    assert creator == "ophyd.Signal"
+    assert [kw["name"] for kw in specs] == ["rm1", "rm2", "rm5"]
+    assert specs[-1]["prefix"] == "ioc:m5"
+    with pytest.raises(ValueError):
+        factory_specs(names="rm{}", first=1, last=2, numbers="5")
+
+    devices = list(motors(prefix="ioc:rm", names="rm{}", numbers="1-2,5"))
+    assert [device.name for device in devices] == ["rm1", "rm2", "rm5"]
+    assert oregistry.find(name="rm5") is devices[-1]
+    assert oregistry.find(name="rm5_user_setpoint") is devices[-1].user_setpoint
+
+    with oregistry.deferred() as created:  # as when make_devices() builds
+        (signal,) = factory_base(names="rs{}", numbers="3")
+        assert oregistry.find(name="rs3", allow_none=True) is None
+    assert oregistry.auto_register  # not changed
+    oregistry.register_created([signal], created)
+    assert oregistry.find(name="rs3") is signal
+
+
+@pytest.mark.parametrize(
+    "shape, dtype",
+    [
+        [[64], "float64"],
+        [64, "float32"],
+        [[32, 48], "uint16"],
+    ],
+)
+def test_frame_detectors(shape, dtype):
+    """create a block of simulated frame detectors"""
+    detectors = list(frame_detectors(first=1, last=3, shape=shape, dtype=dtype))
+    assert [det.name for det in detectors] == ["fdet1", "fdet2", "fdet3"]
+
+    det = detectors[0]
+    expected = list(np.atleast_1d(shape))
+    assert det.describe()["fdet1_image"]["shape"] == expected
+
+    frames = []
+    for _ in range(5):
+        det.trigger().wait(timeout=1)
+        reading = det.read()
+        frame = reading["fdet1_image"]["value"]
+        assert frame.dtype == np.dtype(dtype)
+        assert list(frame.shape) == expected
+        assert reading["fdet1_total"]["value"] == pytest.approx(frame.sum(dtype=float))
+        frames.append(frame)
+
+    # The preallocated buffers are reused (4, by default).
+    assert frames[4] is frames[0]
+    assert len({id(frame) for frame in frames[:4]}) == 4
+
+
+def test_frame_detector_rate():
+    """frames are not produced faster than 'rate'"""
+    det = SimFrameDetector(name="det", shape=[16], rate=50)
+    det.stage()
+    t0 = time.monotonic()
+    for _ in range(6):
+        det.trigger().wait(timeout=1)
+    assert time.monotonic() - t0 >= 5 / 50
+
+    # Frames triggered ahead finish in order, paced by one (lasting) thread.
+    statuses = [det.trigger() for _ in range(5)]
+    names = [thread.name for thread in threading.enumerate()]
+    assert names.count("SimFrameDetector pacer") == 1
+    order = []
+    for i, status in enumerate(statuses):
+        status.add_callback(lambda status, i=i: order.append(i))
+    for status in statuses:
+        status.wait(timeout=1)
+    det.unstage()
+    assert order == list(range(5))
+    assert time.monotonic() - t0 >= 10 / 50
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"shape": [2, 2, 2]},
+        {"shape": [0]},
+        {"buffers": 0},
+    ],
+)
+def test_frame_detector_errors(kwargs):
+    """bad frame detector parameters"""
+    with pytest.raises(ValueError):
+        SimFrameDetector(name="det", **kwargs)
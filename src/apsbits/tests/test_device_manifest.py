@@ -0,0 +1,158 @@
+"""
+Test the utils.device_manifest module and the bits-compile-devices command.
+"""
+
+import json
+import pathlib
+import sys
+
+import pytest
+import yaml
+
+from apsbits.api.compile_devices import main as compile_main
+from apsbits.utils.config_loaders import get_config
+from apsbits.utils.config_loaders import update_config
+from apsbits.utils.device_manifest import compile_manifest
+from apsbits.utils.device_manifest import manifest_entries
+from apsbits.utils.device_manifest import read_definitions
+from apsbits.utils.make_devices import Instrument
+
+DEVICES = {
+    "ophyd.Signal": [{"name": "sig", "value": 1}],
+    "apsbits.utils.sim_creator.factory_base": [
+        {"names": "s{}", "first": 1, "last": 3, "creator": "ophyd.Signal"}
+    ],
+}
+ICONFIG_FILE = (
+    pathlib.Path(__file__).parent.parent / "demo_instrument" / "configs" / "iconfig.yml"
+)
+
+
+@pytest.fixture
+def devices_file(tmp_path):
+    """A devices file, with a factory."""
+    path = tmp_path / "devices.yml"
+    path.write_text(yaml.dump(DEVICES, sort_keys=False))
+    return path
+
+
+def test_compile(devices_file):
+    """Definitions as in the file, factory devices listed, creators resolved."""
+    manifest_file = devices_file.parent / "manifest.json"
+    manifest = compile_manifest([devices_file], manifest_file)
+    assert json.loads(manifest_file.read_text()) == manifest
+
+    entry = manifest["files"]["devices.yml"]
+    factory = entry["entries"][1]
+    assert factory["device_class"] == "apsbits.utils.sim_creator.factory_base"
+    names = [defn["kwargs"]["name"] for defn in factory["devices"]]
+    assert names == ["s1", "s2", "s3"]
+    assert {defn["device_class"] for defn in factory["devices"]} == {"ophyd.Signal"}
+    assert entry["creators"] == {
+        "ophyd.Signal": "ophyd.signal:Signal",
+        "apsbits.utils.sim_creator.factory_base": (
+            "apsbits.utils.sim_creator:factory_base"
+        ),
+    }
+
+    definitions, creators = manifest_entries(manifest_file, devices_file)
+    assert definitions == read_definitions(devices_file)
+
+    # A changed file is not taken from the manifest.
+    devices_file.write_text(devices_file.read_text() + "\n# changed\n")
+    assert manifest_entries(manifest_file, devices_file) is None
+    assert manifest_entries(devices_file.parent / "none.json", devices_file) is None
+
+
+def test_make_devices_uses_manifest(devices_file):
+    """Instrument.parse_yaml_file() takes the definitions from the manifest."""
+    manifest_file = devices_file.parent / "manifest.json"
+    compile_manifest([devices_file], manifest_file)
+    saved = get_config().get("MAKE_DEVICES")
+    update_config({"MAKE_DEVICES": {"MANIFEST": str(manifest_file)}})
+    try:
+        definitions = Instrument({}).parse_yaml_file(devices_file)
+    finally:
+        update_config({"MAKE_DEVICES": saved})
+    assert definitions == read_definitions(devices_file)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_manifest_same_devices(devices_file, lazy):
+    """Devices are made and registered the same, with or without the manifest."""
+    from ophydregistry import Registry
+
+    from apsbits.utils.make_devices import LazyDevice
+
+    manifest_file = devices_file.parent / "manifest.json"
+    compile_manifest([devices_file], manifest_file)
+    saved = get_config().get("MAKE_DEVICES")
+    made = {}
+    try:
+        for manifest in (None, str(manifest_file)):
+            update_config({"MAKE_DEVICES": {"MANIFEST": manifest, "LAZY": lazy}})
+            registry = Registry(auto_register=False)
+            devices = Instrument({}, registry=registry).load(devices_file)
+            made[manifest] = (
+                [(device.name, type(device)) for device in devices],
+                list(registry._objects_by_name),
+            )
+    finally:
+        update_config({"MAKE_DEVICES": saved})
+
+    assert made[str(manifest_file)] == made[None]
+    devices, registered = made[None]
+    assert registered == ["sig", "s1", "s2", "s3"]
+    lazies = [name for name, klass in devices if klass is LazyDevice]
+    assert lazies == (["sig"] if lazy else [])  # Factory devices: never lazy.
+
+
+def test_reload_with_manifest(devices_file):
+    """Reload compares the same definitions, with or without the manifest."""
+    from ophydregistry import Registry
+
+    names = ["sig", "s1", "s2", "s3"]
+    manifest_file = devices_file.parent / "manifest.json"
+    compile_manifest([devices_file], manifest_file)
+    saved = get_config().get("MAKE_DEVICES")
+    registry = Registry(auto_register=True)
+    try:
+        update_config({"MAKE_DEVICES": {"MANIFEST": str(manifest_file)}})
+        instrument = Instrument({}, registry=registry)
+        instrument.load(devices_file)
+        before = {name: registry[name] for name in names}
+
+        # Turn the manifest off, then on again: no device is rebuilt.
+        for manifest in (None, str(manifest_file)):
+            update_config({"MAKE_DEVICES": {"MANIFEST": manifest}})
+            changes = instrument.reload(devices_file)
+            assert changes == {"added": [], "changed": [], "removed": []}
+        assert all(registry[name] is before[name] for name in names)
+
+        # A changed factory is rebuilt: all of its devices.
+        factory = dict(DEVICES["apsbits.utils.sim_creator.factory_base"][0], last=4)
+        devices = dict(DEVICES, **{"apsbits.utils.sim_creator.factory_base": [factory]})
+        devices_file.write_text(yaml.dump(devices, sort_keys=False))
+        compile_manifest([devices_file], manifest_file)
+        changes = instrument.reload(devices_file)
+        # (Keyed by its definition, the old factory is removed, the new added.)
+        assert len(changes["added"]) == len(changes["removed"]) == 1
+        assert changes["changed"] == []
+        assert registry["sig"] is before["sig"]
+        assert all(registry[name] is not before[name] for name in names[1:])
+        assert registry.find(name="s4") is not None
+    finally:
+        registry.auto_register = False
+        update_config({"MAKE_DEVICES": saved})
+
+
+def test_compile_command(tmp_path, monkeypatch, capsys):
+    """bits-compile-devices writes the manifest of the demo instrument."""
+    output = tmp_path / "manifest.json"
+    monkeypatch.setattr(
+        sys, "argv", ["bits-compile-devices", str(ICONFIG_FILE), "-o", str(output)]
+    )
+    compile_main()
+    assert "Device manifest written" in capsys.readouterr().out
+    manifest = json.loads(output.read_text())
+    assert len(manifest["files"]) == 2
@@ -0,0 +1,359 @@
+"""
+Test the utils.make_devices module.
+"""
+
+import pathlib
+import tempfile
+import threading
+import time
+
+import pytest
+import yaml
+from ophydregistry import Registry
+
+from apsbits.utils.config_loaders import get_config
+from apsbits.utils.config_loaders import update_config
+from apsbits.utils.controls_setup import DeferringRegistry
+from apsbits.utils.make_devices import Instrument
+
+NAMES = [f"signal_{i}" for i in (3, 1, 4, 15, 9, 2, 6, 5)]
+
+
+@pytest.fixture
+def devices_file():
+    """A YAML file describing some (simple) devices."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / "devices.yml"
+        specs = {"ophyd.Signal": [{"name": name, "value": 1} for name in NAMES]}
+        path.write_text(yaml.dump(specs))
+        yield path
+
+
+@pytest.fixture
+def make_devices_config():
+    """Restore iconfig MAKE_DEVICES after the test."""
+    saved = get_config().get("MAKE_DEVICES")
+    yield
+    update_config({"MAKE_DEVICES": saved})
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_workers(workers, devices_file, make_devices_config):
+    """Devices are registered in the YAML order, serial or parallel."""
+    update_config({"MAKE_DEVICES": {"LOG_LEVEL": "info", "WORKERS": workers}})
+    registry = DeferringRegistry(auto_register=True)
+    try:
+        instrument = Instrument({}, registry=registry)
+        instrument.load(devices_file)
+        assert registry.auto_register  # Never turned off.
+    finally:
+        registry.auto_register = False
+
+    assert list(registry._objects_by_name) == NAMES
+    assert [device.name for device in instrument.unconnected_devices] == NAMES
+    assert sorted(instrument.build_times) == sorted(NAMES)
+    assert all(t >= 0 for t in instrument.build_times.values())
+
+
+def test_deferred_registration():
+    """Registration is deferred only on the thread which asks."""
+    from ophyd import Device
+    from ophyd import Signal
+
+    registry = DeferringRegistry(auto_register=True)
+    try:
+        with registry.deferred() as created:
+            mine = Signal(name="mine")
+            extra = Signal(name="extra")
+            others = []
+            thread = threading.Thread(
+                target=lambda: others.append(Signal(name="other"))
+            )
+            thread.start()
+            thread.join()
+            assert registry.find(name="other") is others[0]
+            assert registry.find(name="mine", allow_none=True) is None
+            with registry.deferred() as inner:  # nested
+                device = Device(name="device")
+            registry.register_created([device], inner)
+            assert registry.find(name="device", allow_none=True) is None
+        registry.register_created([mine], created)
+    finally:
+        registry.auto_register = False
+
+    assert registry.find(name="mine") is mine
+    assert registry.find(name="extra") is extra
+    assert registry.find(name="device") is device
+
+
+def test_pv_names():
+    """List the PVs of devices and signals, in order, once each."""
+    from ophyd import Component
+    from ophyd import Device
+    from ophyd import EpicsSignal
+    from ophyd import Signal
+
+    from apsbits.utils.controls_setup import device_signals
+    from apsbits.utils.controls_setup import pv_names
+
+    class Gadget(Device):
+        rbv = Component(EpicsSignal, "RBV", write_pv="VAL")
+        val = Component(EpicsSignal, "VAL")
+        soft = Component(Signal)
+
+    gadget = Gadget("bits:test:", name="gadget")
+    soft = Signal(name="soft")
+    assert device_signals(soft) == [soft]
+    assert device_signals(gadget) == [gadget.rbv, gadget.val, gadget.soft]
+    assert pv_names(device_signals(gadget)) == ["bits:test:RBV", "bits:test:VAL"]
+    assert pv_names([soft]) == []
+    gadget.destroy()
+
+
+def test_wait_for_connections(caplog, monkeypatch):
+    """Return at once when connected, else report missing PVs at deadline."""
+    from ophyd import EpicsSignal
+    from ophyd import Signal
+
+    from apsbits.utils.controls_setup import unconnected_pvs
+    from apsbits.utils.make_devices import _wait_for_connections
+
+    connected = Signal(name="connected", value=1)
+    assert list(_wait_for_connections([connected], 10)) == []
+
+    missing = EpicsSignal("bits:test:nothing", name="missing")
+    assert unconnected_pvs([connected, missing]) == {"missing": ["bits:test:nothing"]}
+
+    t0 = time.monotonic()
+    messages = list(_wait_for_connections([connected, missing], 0.2))
+    assert len(messages) > 0
+    assert all(msg.command == "sleep" for msg in messages)
+    assert time.monotonic() - t0 >= 0.2
+    assert "'missing' not connected" in caplog.text
+    assert "bits:test:nothing" in caplog.text
+
+    # A connected device is checked once.  PVs are listed once, at deadline.
+    class Counted:
+        name = "counted"
+        checks = 0
+
+        @property
+        def connected(self):
+            self.checks += 1
+            return True
+
+    from apsbits.utils import make_devices
+
+    reports = []
+    monkeypatch.setattr(
+        make_devices,
+        "unconnected_pvs",
+        lambda devices: reports.append(devices) or unconnected_pvs(devices),
+    )
+    counted = Counted()
+    list(_wait_for_connections([counted, missing], 0.1))
+    assert counted.checks == 1
+    assert reports == [[missing]]
+    missing.destroy()
+
+
+def test_lazy(devices_file, make_devices_config):
+    """Devices are built on first use, or by materialize_all()."""
+    from ophyd import Signal
+
+    from apsbits.utils.make_devices import LazyDevice
+
+    update_config({"MAKE_DEVICES": {"LAZY": True}})
+    registry = Registry(auto_register=True)
+    try:
+        instrument = Instrument({}, registry=registry)
+        instrument.load(devices_file)
+        assert instrument.build_times == {}
+        assert list(registry._objects_by_name) == NAMES
+
+        proxy = registry["signal_3"]
+        assert isinstance(proxy, LazyDevice)
+        assert not proxy.is_built
+        assert "not built" in repr(proxy)
+
+        assert proxy.get() == 1  # first use
+        assert proxy.is_built
+        assert isinstance(registry["signal_3"], Signal)
+        assert list(instrument.build_times) == ["signal_3"]
+        proxy.put(2)
+        assert registry["signal_3"].get() == 2
+
+        built = instrument.materialize_all()
+        assert [device.name for device in built] == NAMES[1:]
+        assert all(isinstance(registry[name], Signal) for name in NAMES)
+        assert instrument.materialize_all() == []
+    finally:
+        registry.auto_register = False
+
+
+def test_reload(devices_file, make_devices_config):
+    """Reload builds only the devices added or changed in the file."""
+    update_config({"MAKE_DEVICES": {"LOG_LEVEL": "info"}})
+    registry = Registry(auto_register=True)
+    try:
+        instrument = Instrument({}, registry=registry)
+        instrument.load(devices_file)
+        before = {name: registry[name] for name in NAMES}
+
+        changes = instrument.reload(devices_file)
+        assert changes == {"added": [], "changed": [], "removed": []}
+        assert instrument.build_times == {}
+
+        specs = [{"name": name, "value": 1} for name in NAMES[1:]]
+        specs[0]["value"] = 2  # signal_1
+        specs.append({"name": "signal_92", "value": 1})
+        devices_file.write_text(yaml.dump({"ophyd.Signal": specs}))
+        changes = instrument.reload(devices_file)
+        assert changes == {
+            "added": ["signal_92"],
+            "changed": ["signal_1"],
+            "removed": ["signal_3"],
+        }
+        assert sorted(instrument.build_times) == ["signal_1", "signal_92"]
+
+        assert registry.find(name="signal_3", allow_none=True) is None
+        assert registry["signal_1"] is not before["signal_1"]
+        assert registry["signal_1"].get() == 2
+        assert registry["signal_92"].get() == 1
+        for name in NAMES[2:]:
+            assert registry[name] is before[name]  # unchanged
+
+        # The current devices are listed (once) as unconnected, no others.
+        current = [*NAMES[1:], "signal_92"]
+        for _ in range(2):
+            instrument.reload(devices_file)
+            names = [device.name for device in instrument.unconnected_devices]
+            assert names == current
+        assert instrument.unconnected_devices[0] is registry["signal_1"]
+        devices = instrument.load(devices_file)  # Again: all new devices.
+        assert instrument.unconnected_devices == devices
+    finally:
+        registry.auto_register = False
+
+
+def test_profile(devices_file, make_devices_config, tmp_path, caplog):
+    """Report each device's startup time, signals, PVs, and memory."""
+    import json
+    import tracemalloc
+
+    from apsbits.utils.make_devices import _report_profile
+
+    profile_file = tmp_path / "logs" / "profile.json"
+    update_config(
+        {"MAKE_DEVICES": {"PROFILE": True, "PROFILE_FILE": str(profile_file)}}
+    )
+    registry = Registry(auto_register=True)
+    tracemalloc.start()
+    try:
+        instrument = Instrument({}, registry=registry)
+        instrument.load(devices_file)
+    finally:
+        tracemalloc.stop()
+        registry.auto_register = False
+    assert list(instrument.profile) == NAMES
+
+    connected_at = {name: time.monotonic() for name in NAMES[:4]}
+    rows = _report_profile(instrument.profile, connected_at)
+    assert sorted(row["name"] for row in rows) == sorted(NAMES)
+    row = rows[0]
+    assert row["creator"] == "ophyd.signal.Signal"
+    assert row["signals"] == 1
+    assert row["pvs"] == 0
+    assert row["memory_bytes"] is not None
+    assert {row["name"] for row in rows if row["connect_s"] is None} == set(NAMES[4:])
+
+    report = json.loads(profile_file.read_text())
+    assert report["devices"] == rows
+    assert list(profile_file.parent.glob(".*.tmp")) == []
+
+    # Cannot write the file: a warning, not an error.
+    blocker = tmp_path / "not_a_directory"
+    blocker.write_text("")
+    update_config({"MAKE_DEVICES": {"PROFILE_FILE": str(blocker / "profile.json")}})
+    assert _report_profile(instrument.profile, connected_at) == rows
+    assert "Cannot write device startup profile" in caplog.text
+
+
+@pytest.mark.parametrize("verbose", [False, True])
+def test_publish(verbose, devices_file, make_devices_config, caplog):
+    """Only the new devices are added to __main__, with one summary line."""
+    import logging
+    import sys
+
+    from apsbits.utils.make_devices import _instr
+    from apsbits.utils.make_devices import _loader
+
+    update_config({"MAKE_DEVICES": {"LOG_LEVEL": "info", "VERBOSE": verbose}})
+    main_namespace = sys.modules["__main__"]
+    with caplog.at_level(logging.INFO):
+        devices = _loader(devices_file, main=True)
+    try:
+        assert [device.name for device in devices] == NAMES
+        for device in devices:
+            assert getattr(main_namespace, device.name) is device
+        messages = [
+            r.getMessage() for r in caplog.records if "'__main__'" in r.getMessage()
+        ]
+        assert messages[-1] == f"Added {len(NAMES)} devices to '__main__'."
+        assert len(messages) == (1 + len(NAMES) if verbose else 1)
+    finally:
+        for device in devices:
+            _instr._remove(device)
+        _instr.specs.pop(str(devices_file.resolve()), None)
+
+
+def test_pv_cache(tmp_path, monkeypatch):
+    """Save the connected PVs, then start to connect them, all at once."""
+    import json
+    import types
+
+    import epics
+    from ophyd.signal import EpicsSignalBase
+
+    from apsbits.utils.make_devices import _prewarm_pvs
+    from apsbits.utils.make_devices import _read_pv_cache
+    from apsbits.utils.make_devices import _save_pv_cache
+
+    cache_file = tmp_path / "logs" / "pv_cache.json"
+    assert _read_pv_cache(cache_file) == []  # no file yet
+
+    devices = [
+        types.SimpleNamespace(pvname=f"ioc:pv{i}", connected=i != 2) for i in range(4)
+    ]
+    assert _save_pv_cache(cache_file, devices) == ["ioc:pv0", "ioc:pv1", "ioc:pv3"]
+    assert _read_pv_cache(cache_file) == ["ioc:pv0", "ioc:pv1", "ioc:pv3"]
+
+    # PVs are made as ophyd's signals will ask: monitored only by default.
+    default = "_EpicsSignalBase__default_auto_monitor"
+    get_pv = epics.get_pv
+    for auto_monitor in (True, False):
+        monkeypatch.setattr(EpicsSignalBase, default, auto_monitor)
+        created = []
+        monkeypatch.setattr(
+            epics, "get_pv", lambda pvname, c=created, **kw: c.append((pvname, kw))
+        )
+        assert _prewarm_pvs(cache_file) == 3
+        expected = {"connect": False, "auto_monitor": auto_monitor}
+        assert created == [(pv, expected) for pv in _read_pv_cache(cache_file)]
+
+    # A real (never connected) PV: not monitored, as ophyd's signals expect.
+    monkeypatch.setattr(epics, "get_pv", get_pv)
+    pv_name = "apsbits:test:prewarm:never"
+    cache_file.write_text(cache_file.read_text().replace("ioc:pv0", pv_name))
+    try:
+        _prewarm_pvs(cache_file)
+        assert epics.get_pv(pv_name, connect=False).auto_monitor is False
+    finally:
+        for name in _read_pv_cache(cache_file):
+            key = (name, "time", epics.ca.current_context())
+            epics.ca.clear_channel(epics.pv._PVcache_.pop(key).chid)
+
+    cache = json.loads(cache_file.read_text())
+    cache["instrument"] = "/some/other/instrument/configs"
+    cache_file.write_text(json.dumps(cache))
+    assert _read_pv_cache(cache_file) == []
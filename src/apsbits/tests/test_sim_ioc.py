@@ -0,0 +1,61 @@
+"""Test the simulated IOC, made from the devices files."""
+
+import pathlib
+import shutil
+
+import pytest
+import yaml
+
+from apsbits.api.sim_ioc import benchmark
+from apsbits.utils.controls_setup import oregistry
+from apsbits.utils.sim_ioc import device_pvs
+from apsbits.utils.sim_ioc import make_pvdb
+
+DEMO_ICONFIG = (
+    pathlib.Path(__file__).parent.parent / "demo_instrument" / "configs" / "iconfig.yml"
+)
+DEVICES = {
+    "apsbits.utils.sim_creator.motors": [
+        {"prefix": "simioc:m", "names": "simioc_m{}", "first": 1, "last": 2},
+    ],
+    "ophyd.EpicsSignal": [
+        {"name": "simioc_temp", "read_pv": "simioc:temp", "write_pv": "simioc:sp"},
+        {"name": "simioc_label", "read_pv": "simioc:label", "string": True},
+    ],
+}
+
+
+@pytest.fixture
+def configs(tmp_path):
+    """An iconfig.yml and its devices.yml, in a temporary directory."""
+    shutil.copy(DEMO_ICONFIG, tmp_path / "iconfig.yml")
+    (tmp_path / "devices.yml").write_text(yaml.dump(DEVICES))
+    return tmp_path
+
+
+def test_device_pvs(configs):
+    """The PVs are recorded without connecting (or registering) the devices."""
+    pvs = device_pvs([configs / "devices.yml"])
+
+    assert pvs["simioc:m1.RBV"] == {"string": False, "readback": None}
+    assert pvs["simioc:m2.VAL"]["readback"] == "simioc:m2.RBV"
+    assert pvs["simioc:sp"]["readback"] == "simioc:temp"
+    assert pvs["simioc:label"]["string"]
+    assert len([pv for pv in pvs if pv.startswith("simioc:m1.")]) > 10
+    assert oregistry.find(name="simioc_m1", allow_none=True) is None
+
+    pvdb = make_pvdb(pvs)
+    assert list(pvdb) == list(pvs)
+    assert pvdb["simioc:m1.DMOV"].value == 1
+    assert pvdb["simioc:m1.RBV"].value == 0
+    assert pvdb["simioc:label"].value == ""
+    assert pvdb["simioc:m1.VAL"].readback is pvdb["simioc:m1.RBV"]
+
+
+def test_benchmark(configs):
+    """Serve the PVs and connect the devices to them."""
+    (result,) = benchmark(configs / "iconfig.yml", ["PyEpics"], timeout=20)
+    assert result["control_layer"] == "pyepics"
+    assert result["devices"] == 4
+    assert result["unconnected"] == 0
+    assert result["total_s"] >= result["connect_s"]
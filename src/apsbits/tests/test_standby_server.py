@@ -0,0 +1,103 @@
+"""
+Tests for the standby_server.py script (bits-standby and bits-session).
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from apsbits.api.standby_server import socket_path
+
+SERVER = (
+    "import sys; from apsbits.api.standby_server import serve; "
+    "serve('standby_pkg', sys.argv[1], modules=('json',))"
+)
+CLIENT = (
+    "import sys; from apsbits.api.standby_server import request_session; "
+    "sys.exit(request_session('standby_pkg', sys.argv[1], sys.argv[2]))"
+)
+
+
+@pytest.fixture
+def server(tmp_path: Path):
+    """Run a server for a (minimal) instrument package.  Yield its socket."""
+    package = tmp_path / "packages" / "standby_pkg"
+    (package / "configs").mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "startup.py").write_text("VALUE = 42\n")
+    (package / "configs" / "iconfig.yml").write_text("KEY: value\n")
+
+    env = dict(os.environ, PYTHONPATH=str(package.parent))
+    path = tmp_path / "standby.sock"
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER, str(path)], cwd=tmp_path, env=env
+    )
+    deadline = time.time() + 60
+    while not path.exists() and time.time() < deadline:
+        assert process.poll() is None, "server stopped"
+        time.sleep(0.05)
+    yield path, env
+
+    process.terminate()
+    assert process.wait(timeout=10) == 0
+    assert not path.exists()
+
+
+def request(command: str, path: Path, env: dict, cwd: Path):
+    """Ask the server for a session which runs 'command'."""
+    return subprocess.run(
+        [sys.executable, "-c", CLIENT, command, str(path)],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+
+def test_session(server, tmp_path: Path) -> None:
+    """A session runs startup and the command in the client's directory."""
+    path, env = server
+    work = tmp_path / "work"
+    work.mkdir()
+    command = "import os; print(VALUE, os.getcwd(), os.environ['MARKER'])"
+    result = request(command, path, dict(env, MARKER="here"), work)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["42", str(work), "here"]
+
+    result = request("raise SystemExit(3)", path, env, work)
+    assert result.returncode == 3
+
+
+@pytest.mark.skipif(not Path("/proc/self/fd").exists(), reason="needs /proc")
+def test_session_process(server, tmp_path: Path) -> None:
+    """A session imports from its directory, and has none of the server's fds."""
+    path, env = server
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "local_module.py").write_text("LOCAL = 'local'\n")
+    command = (
+        "import os, sys, local_module\n"
+        "print(local_module.LOCAL, sys.path[0])\n"
+        "for fd in sorted(os.listdir('/proc/self/fd'), key=int)[3:]:\n"
+        "    try:\n"
+        "        print(os.readlink(f'/proc/self/fd/{fd}'))\n"
+        "    except OSError:\n"
+        "        pass  # Such as the fd of listdir(), closed since."
+    )
+    result = request(command, path, env, work)
+    assert result.returncode == 0, result.stderr
+    first, *fds = result.stdout.splitlines()
+    assert first.split() == ["local", str(work)]
+    assert not any("eventpoll" in fd for fd in fds)  # the server's selector
+    assert not any(fd.startswith("socket:") for fd in fds), fds
+
+
+def test_socket_path() -> None:
+    """The default socket is specific to the user and the package."""
+    path = socket_path("my_instrument")
+    assert path.name == f"bits-standby-{os.getuid()}-my_instrument.sock"
@@ -1,15 +1,23 @@
 """
-Test the utils.stored_dict module.
+Test the utils.stored_dict module (and the other RE.md storage backends).
 """
 
+import copy
+import multiprocessing
 import pathlib
 import tempfile
+import threading
 import time
 from contextlib import nullcontext as does_not_raise
 
 import pytest
+import yaml
 
 from apsbits.utils.config_loaders import load_config_yaml
+from apsbits.utils.metadata import make_md_storage
+from apsbits.utils.sqlite_dict import SQLiteDict
+from apsbits.utils.stored_dict import DURABILITY_LEVELS
+from apsbits.utils.stored_dict import YAML_SAFE_LOADER
 from apsbits.utils.stored_dict import StoredDict
 
 
@@ -33,6 +41,29 @@ def md_file():
         path.unlink()  # delete the file
 
 
+@pytest.fixture(params=[StoredDict, SQLiteDict, dict])
+def storage(request, md_file):
+    """Provide a factory for each storage backend with the MutableMapping contract."""
+    klass = request.param
+    if klass is SQLiteDict:
+        md_file.unlink()  # SQLite creates its own (empty) database file.
+
+    def factory(**kwargs):
+        if klass is dict:  # MD_BACKEND: dict (kept in memory only)
+            iconfig = {"RUN_ENGINE": {"MD_BACKEND": "dict"}}
+            return make_md_storage(iconfig, md_file)
+        if klass is StoredDict:
+            kwargs.setdefault("delay", 0.2)
+            kwargs.setdefault("title", "unit testing")
+        return klass(md_file, **kwargs)
+
+    factory.persistent = klass is not dict
+    yield factory
+
+    for path in md_file.parent.glob(f"{md_file.name}-*"):  # SQLite WAL files
+        path.unlink()
+
+
 def test_StoredDict(md_file):
     """Test the StoredDict class."""
     assert md_file.exists()
@@ -114,26 +145,625 @@ def test_StoredDict(md_file):
         [{"a": {object(): [4, 5, 6]}}, TypeError, "keys must be str, int, "],
     ],
 )
-def test_set_exceptions(md, xcept, text, md_file):
+def test_set_exceptions(md, xcept, text, storage):
     """Cases that might raise an exception."""
-    sdict = StoredDict(md_file, delay=0.2, title="unit testing")
+    if not storage.persistent:
+        pytest.skip("Values kept in memory are not serialized.")
+    sdict = storage()
     context = does_not_raise() if xcept is None else pytest.raises(xcept)
     with context as reason:
         sdict.update(md)
     assert text in str(reason), f"{reason=}"
 
 
-def test_popitem(md_file):
+def test_popitem(storage):
     """Can't popitem from empty dict."""
-    sdict = StoredDict(md_file, delay=0.2, title="unit testing")
+    sdict = storage()
     with pytest.raises(KeyError) as reason:
         sdict.popitem()
     assert "dictionary is empty" in str(reason), f"{reason=}"
 
 
-def test_repr(md_file):
+def test_mapping(storage):
+    """The MutableMapping methods RE.md uses."""
+    sdict = storage()
+    sdict["a"] = 1
+    sdict.update({"bee": "bumble", 3: [4, 5, 6]})
+    assert sdict.setdefault("a", 2) == 1
+    assert sdict.get("missing", "default") == "default"
+    assert len(sdict) == 3
+    assert list(sdict) == ["a", "bee", 3]
+    assert sdict.pop("bee") == "bumble"
+    del sdict[3]
+    assert dict(sdict) == {"a": 1}
+    with pytest.raises(KeyError):
+        sdict["bee"]
+    sdict.clear()
+    assert len(sdict) == 0
+
+
+def test_repr(storage):
     """__repr__"""
+    if not storage.persistent:
+        pytest.skip("A dict has its own repr().")
+    sdict = storage()
+    sdict["a"] = 1
+    name = sdict.__class__.__name__
+    assert repr(sdict) == f"<{name} {{'a': 1}}>"
+    assert str(sdict) == f"<{name} {{'a': 1}}>"
+
+
+def test_reload(storage):
+    """Contents survive a new object using the same storage."""
+    if not storage.persistent:
+        pytest.skip("A dict is not saved.")
+    sdict = storage()
+    sdict.update({"a": 1, "bee": "bumble", 3: [4, 5, 6], "nested": {"x": 1.5}})
+    del sdict["bee"]
+    sdict["a"] = 2
+    sdict.flush()
+
+    restored = storage()
+    assert dict(restored) == {"a": 2, 3: [4, 5, 6], "nested": {"x": 1.5}}
+    assert list(restored) == ["a", 3, "nested"]
+
+
+@pytest.mark.parametrize(
+    "backend, klass",
+    [
+        [None, StoredDict],
+        ["StoredDict", StoredDict],
+        ["SQLiteDict", SQLiteDict],
+        ["dict", dict],
+    ],
+)
+def test_make_md_storage(backend, klass, md_file):
+    """RUN_ENGINE.MD_BACKEND selects the RE.md storage."""
+    iconfig = {"RUN_ENGINE": {"MD_PATH": str(md_file)}}
+    if backend is not None:
+        iconfig["RUN_ENGINE"]["MD_BACKEND"] = backend
+    md = make_md_storage(iconfig)
+    assert type(md) is klass
+    for path in md_file.parent.glob(f"{md_file.stem}.sqlite*"):
+        path.unlink()
+
+
+def test_make_md_storage_sqlite_path(md_file):
+    """SQLiteDict does not open the YAML file of MD_PATH (StoredDict's)."""
+    StoredDict.dump(md_file, {"scan_id": 3})
+    yaml_text = md_file.read_text()
+    iconfig = {"RUN_ENGINE": {"MD_PATH": str(md_file), "MD_BACKEND": "SQLiteDict"}}
+    sqlite_file = md_file.with_suffix(".sqlite")
+    try:
+        md = make_md_storage(iconfig)
+        assert type(md) is SQLiteDict
+        md["scan_id"] = 4
+        assert sqlite_file.exists()
+        assert md_file.read_text() == yaml_text  # untouched
+
+        # Any other file which is not an SQLite database is refused.
+        with pytest.raises(ValueError, match="is not an SQLite database"):
+            SQLiteDict(md_file)
+    finally:
+        for path in md_file.parent.glob(f"{md_file.stem}.sqlite*"):
+            path.unlink()
+
+
+def test_make_md_storage_unknown(md_file):
+    """Unrecognized RUN_ENGINE.MD_BACKEND is an error."""
+    iconfig = {"RUN_ENGINE": {"MD_PATH": str(md_file), "MD_BACKEND": "shelve"}}
+    with pytest.raises(ValueError) as reason:
+        make_md_storage(iconfig)
+    assert "Unknown MD_BACKEND" in str(reason), f"{reason=}"
+
+
+def test_coalesced_writes(md_file):
+    """Many changes within the delay are written by one dump."""
     sdict = StoredDict(md_file, delay=0.1, title="unit testing")
+    assert sdict.sync_stats["flushes"] == 0
+
+    for i in range(20):
+        sdict[f"key{i}"] = i
+    assert sdict.sync_in_progress
+    agent = sdict._sync_thread
+    assert agent is not None
+    assert agent.name == sdict._sync_key
+
+    luftpause(3 * sdict._delay)
+    assert not sdict.sync_in_progress
+    stats = sdict.sync_stats
+    assert stats["flushes"] == 1
+    assert stats["writes"] == 20
+    assert stats["last_writes_per_flush"] == 20
+    assert stats["last_flush_latency"] >= sdict._delay
+    assert len(load_config_yaml(md_file)) == 20
+
+    # The same agent handles the next burst of changes.
+    sdict["key0"] = "revised"
+    del sdict["key1"]
+    luftpause(3 * sdict._delay)
+    assert sdict._sync_thread is agent
+    assert agent.is_alive()
+    stats = sdict.sync_stats
+    assert stats["flushes"] == 2
+    assert stats["writes"] == 22
+    assert stats["last_writes_per_flush"] == 2
+    assert stats["max_writes_per_flush"] == 20
+    md = load_config_yaml(md_file)
+    assert md["key0"] == "revised"
+    assert "key1" not in md
+
+
+def test_nested_changes(md_file):
+    """Changes to nested dict and list values are written, too."""
+    sdict = StoredDict(md_file, delay=0.1)
+    sdict["versions"] = {"apsbits": "1.0"}
+    sdict["samples"] = ["water"]
+    sdict["other"] = 1
+    sdict.flush()
+    assert sdict.sync_stats["last_keys_serialized"] == 3
+
+    sdict["versions"]["bluesky"] = "1.13"
+    sdict["versions"].setdefault("ophyd", {})["version"] = "1.9"
+    sdict["samples"].append({"name": "air"})
+    sdict["samples"][1]["temperature"] = 25
+    assert sdict.sync_in_progress
+    luftpause(3 * sdict._delay)
+    assert not sdict.sync_in_progress
+    assert sdict.sync_stats["last_keys_serialized"] == 2  # not "other"
+
+    md = load_config_yaml(md_file)
+    assert md["versions"] == {
+        "apsbits": "1.0",
+        "bluesky": "1.13",
+        "ophyd": {"version": "1.9"},
+    }
+    assert md["samples"] == ["water", {"name": "air", "temperature": 25}]
+    assert "!!python" not in pathlib.Path(md_file).read_text()
+
+    with pytest.raises(TypeError):
+        sdict["samples"].append(object())  # not JSON serializable
+
+    # Values are stored as copies.
+    value = [1]
+    sdict["copy"] = value
+    value.append(2)
+    assert sdict["copy"] == [1]
+    assert type(copy.deepcopy(sdict)["copy"]) is list
+
+
+def test_update(md_file, mocker):
+    """update() checks all items and schedules one sync for them."""
+    sdict = StoredDict(md_file, delay=0.1)
+    schedule = mocker.spy(sdict, "_delayed_sync_to_storage")
+    updates = {f"key{i}": i for i in range(10)}
+
+    sdict.update(updates, extra={"a": [1, 2]})
+    assert schedule.call_count == 1
+    assert dict(sdict) == {**updates, "extra": {"a": [1, 2]}}
+    sdict.set_many([("key0", "revised")])
+    assert schedule.call_count == 2
+
+    with pytest.raises(TypeError):
+        sdict.update(key1="new", bad=object())
+    assert sdict["key1"] == 1  # Nothing was written.
+    assert "bad" not in sdict
+    assert schedule.call_count == 2
+
+    luftpause(3 * sdict._delay)
+    stats = sdict.sync_stats
+    assert stats["flushes"] == 1
+    assert stats["writes"] == 12
+    md = load_config_yaml(md_file)
+    assert md["key0"] == "revised"
+    assert md["extra"] == {"a": [1, 2]}
+
+    sdict["extra"]["a"].append(3)  # still tracked
+    sdict.flush()
+    assert load_config_yaml(md_file)["extra"] == {"a": [1, 2, 3]}
+
+
+def test_snapshot(md_file):
+    """Writes use a consistent, copy-on-write snapshot of the contents."""
+    sdict = StoredDict(md_file, delay=60)
+    sdict.update(a={"b": [1]}, c=2)
+    assert sdict.generation == 1
+    sdict.flush()
+    first = sdict._snapshot
+    assert sdict.sync_stats["last_generation_written"] == 1
+
+    sdict["a"]["b"].append(2)
+    assert sdict.generation == 2
+    sdict.flush()
+    assert sdict._snapshot["a"] == {"b": [1, 2]}
+    assert first["a"] == {"b": [1]}  # not changed by later writes
+    assert sdict._snapshot["c"] is first["c"]  # shared, not copied
+    assert sdict.sync_stats["last_generation_written"] == 2
+
+
+def test_snapshot_threads(md_file):
+    """Flushing while another thread writes never sees a torn state."""
+    sdict = StoredDict(md_file, delay=60)
+    sdict["scans"] = {}
+    errors = []
+
+    def writer():
+        try:
+            for i in range(2_000):
+                sdict["scans"][f"scan{i}"] = [i]
+                sdict["scans"][f"scan{i}"].append(i + 1)
+                sdict["scan_id"] = i
+        except Exception as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while thread.is_alive():
+        sdict.flush()
+    thread.join()
+    sdict.flush()
+
+    assert errors == []
+    md = load_config_yaml(md_file)
+    assert md["scan_id"] == 1_999
+    assert len(md["scans"]) == 2_000
+    assert all(md["scans"][f"scan{i}"] == [i, i + 1] for i in range(2_000))
+
+
+def test_history(md_file):
+    """restore() returns to an earlier state, by undoing the recent writes."""
+    sdict = StoredDict(md_file, delay=60, history=3)
+    sdict.update(proposal_id="12345", scan_id=10, sample={"name": "water"})
+    sdict.flush()
+    sdict["scan_id"] = 11
+    sdict["sample"]["name"] = "air"
+    sdict.flush()
+    sdict["proposal_id"] = "wrong"
+    sdict["scan_id"] = 0
+    sdict["extra"] = True
+    sdict.flush()
+
+    history = sdict.history()
+    assert [entry["n"] for entry in history] == [1, 2, 3]
+    assert sorted(history[0]["keys"]) == ["extra", "proposal_id", "scan_id"]
+    assert sorted(history[2]["keys"]) == ["proposal_id", "sample", "scan_id"]
+
+    sdict.restore(1)
+    expected = dict(proposal_id="12345", scan_id=11, sample={"name": "air"})
+    assert dict(sdict) == expected
+    sdict.flush()
+    assert load_config_yaml(md_file) == expected
+
+    sdict.restore(3)  # The restore above is in the history, too.
+    assert dict(sdict) == dict(
+        proposal_id="12345", scan_id=10, sample={"name": "water"}
+    )
+    assert len(sdict.history()) == 3  # bounded by count
+
+    with pytest.raises(IndexError):
+        sdict.restore(4)
+
+
+def test_history_pending(md_file):
+    """restore(n) counts the history() shown, with changes not yet written."""
+    sdict = StoredDict(md_file, delay=60, history=5)
+    for scan_id in (1, 2, 3):
+        sdict["scan_id"] = scan_id
+        sdict.flush()
+    assert len(sdict.history()) == 3  # before scan_id 1, 2, and 3
+
+    sdict["scan_id"] = 99  # Not written yet.
+    sdict.restore(1)  # Undoes the pending change, too.
+    assert sdict["scan_id"] == 2
+
+    with pytest.raises(IndexError):
+        sdict.restore(len(sdict.history()) + 1)
+
+
+def test_history_journal(md_file):
+    """History is not supported with the journal (written when compacted)."""
+    with pytest.raises(ValueError) as reason:
+        StoredDict(md_file, journal=True, history=3)
+    assert "cannot use a journal" in str(reason), f"{reason=}"
+
+
+def test_history_bytes(md_file):
+    """The history is also bounded by (approximate) size."""
+    sdict = StoredDict(md_file, delay=60, history=100, history_max_bytes=500)
+    for i in range(20):
+        sdict["big"] = "x" * 100 + str(i)
+        sdict.flush()
+    assert 1 <= len(sdict.history()) < 10
+    assert sdict._history_bytes <= 500
+    sdict.restore(len(sdict.history()))
+    assert sdict["big"].startswith("x" * 100)
+
+
+def test_sync_agent_ends(md_file):
+    """The sync agent stops when its StoredDict is deleted."""
+    sdict = StoredDict(md_file, delay=0.01, title="unit testing")
+    sdict["a"] = 1
+    luftpause()
+    agent = sdict._sync_thread
+    assert agent.is_alive()
+
+    del sdict
+    agent.join(timeout=1)
+    assert not agent.is_alive()
+
+
+def test_journal(md_file):
+    """Journal mode appends each change, compacts, and replays on reload."""
+    journal_file = md_file.with_name(md_file.name + ".journal")
+    sdict = StoredDict(md_file, delay=0.01, title="unit testing", journal=True)
+    assert sdict._journal_file == journal_file
+    assert not journal_file.exists()
+
+    sdict["a"] = 1
+    sdict["bee"] = "bumble"
+    sdict["a"] = 2
+    del sdict["bee"]
+    sdict[3] = [4, 5, 6]
+    sdict.flush()
+    assert len(open(md_file).read().splitlines()) == 0  # YAML not written
+    assert len(open(journal_file).read().splitlines()) == 5
+
+    # Replay snapshot + journal.
+    restored = StoredDict(md_file, delay=0.01, journal=True)
+    assert dict(restored) == {"a": 2, 3: [4, 5, 6]}
+    # Without the journal, only the (empty) snapshot.
+    assert len(StoredDict(md_file, delay=0.01)) == 0
+
+    sdict.compact()
+    assert not journal_file.exists()
+    assert load_config_yaml(md_file) == {"a": 2, 3: [4, 5, 6]}
+    assert sdict.sync_stats["compactions"] == 1
+
+    # Interrupted write leaves a partial last line, which is skipped.
+    sdict["a"] = 5
+    sdict.flush()
+    with open(journal_file, "a") as f:
+        f.write('{"op":"set","key":"a","va')
+    sdict.reload()
+    assert sdict["a"] == 5
+    journal_file.unlink()
+
+
+def test_journal_compaction(md_file):
+    """The journal is compacted when it grows too large."""
+    journal_file = md_file.with_name(md_file.name + ".journal")
+    sdict = StoredDict(md_file, delay=0.01, journal=True, journal_max_bytes=200)
+    for i in range(20):
+        sdict["scan_id"] = i
+        sdict.flush()
+    assert sdict.sync_stats["compactions"] > 0
+    assert journal_file.stat().st_size <= 200
+    restored = StoredDict(md_file, delay=0.01, journal=True)
+    assert restored["scan_id"] == 19
+    journal_file.unlink(missing_ok=True)
+
+
+@pytest.mark.parametrize("durability", DURABILITY_LEVELS)
+def test_durability(durability, md_file):
+    """Each durability level writes the file without leaving temporary files."""
+    sdict = StoredDict(md_file, delay=0.01, durability=durability)
     sdict["a"] = 1
-    assert repr(sdict) == "<StoredDict {'a': 1}>"
-    assert str(sdict) == "<StoredDict {'a': 1}>"
+    sdict.flush()
+    assert load_config_yaml(md_file) == {"a": 1}
+    assert list(md_file.parent.glob(f".{md_file.name}.*.tmp")) == []
+
+
+def test_durability_unknown(md_file):
+    """Unrecognized durability levels are rejected."""
+    with pytest.raises(ValueError) as reason:
+        StoredDict(md_file, durability="paranoid")
+    assert "Unknown durability" in str(reason), f"{reason=}"
+
+
+@pytest.mark.parametrize(
+    "durability, synchronous",
+    [["none", 0], ["file", 2], ["directory", 3]],  # OFF, FULL, EXTRA
+)
+def test_sqlite_durability(durability, synchronous, md_file):
+    """SQLiteDict syncs each commit to disk, as StoredDict's 'file' level."""
+    md_file.unlink()
+    sdict = SQLiteDict(md_file, durability=durability)
+    cursor = sdict._connection.execute("PRAGMA synchronous")
+    assert cursor.fetchone()[0] == synchronous
+    sdict._connection.close()
+    for path in md_file.parent.glob(f"{md_file.name}-*"):  # SQLite WAL files
+        path.unlink()
+
+
+def test_interrupted_dump(md_file, monkeypatch):
+    """An interrupted write leaves the previous file intact."""
+    sdict = StoredDict(md_file, delay=0.01)
+    sdict["scan_id"] = 41
+    sdict.flush()
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt("killed while writing")
+
+    monkeypatch.setattr("apsbits.utils.stored_dict.yaml.dump", interrupted)
+    sdict["scan_id"] = 42
+    with pytest.raises(KeyboardInterrupt):
+        sdict.flush()
+    monkeypatch.undo()
+
+    assert load_config_yaml(md_file) == {"scan_id": 41}
+    assert list(md_file.parent.glob(f".{md_file.name}.*.tmp")) == []
+
+
+def test_load_cache(md_file, mocker):
+    """The compact copy is used only while the YAML file is unchanged."""
+    cache_file = md_file.with_name(md_file.name + ".cache")
+    sdict = StoredDict(md_file, delay=0.01, load_cache=True)
+    sdict.update({"a": 1, 2: ["b", 3.5], "nested": {"c": None}})
+    sdict.flush()
+    assert cache_file.exists()
+
+    yaml_load = mocker.spy(yaml, "load")
+    restored = StoredDict(md_file, delay=0.01, load_cache=True)
+    assert dict(restored) == dict(sdict)
+    assert yaml_load.call_count == 0  # From the compact copy.
+
+    # Change the YAML file some other way.
+    with open(md_file, "a") as f:
+        f.write("d: 4\n")
+    restored.reload()
+    assert yaml_load.call_count == 1
+    assert restored["d"] == 4
+    restored.reload()
+    assert yaml_load.call_count == 1  # Compact copy was refreshed.
+
+    # Without load_cache, always parse the YAML.
+    StoredDict(md_file, delay=0.01)
+    assert yaml_load.call_count == 2
+    cache_file.unlink()
+
+
+def test_load_yaml(md_file):
+    """Read YAML with the (C) safe loader, or the full loader if needed."""
+    if hasattr(yaml, "CSafeLoader"):
+        assert YAML_SAFE_LOADER is yaml.CSafeLoader
+
+    sdict = StoredDict(md_file, delay=0.01)
+    sdict["tuple"] = (1, 2)  # Written with a '!!python/tuple' tag.
+    sdict.flush()
+    assert "!!python/tuple" in open(md_file).read()
+    assert StoredDict.load(md_file) == {"tuple": (1, 2)}
+
+
+def test_shared(md_file):
+    """Two users of the same file (in shared mode) merge their changes."""
+    lock_file = md_file.with_name(md_file.name + ".lock")
+    qserver = StoredDict(md_file, delay=0.01, shared=True)
+    console = StoredDict(md_file, delay=0.01, shared=True)
+
+    qserver["scan_id"] = 1
+    qserver.flush()
+    console["proposal_id"] = "commissioning"
+    console.flush()  # Merges the qserver's scan_id.
+    assert lock_file.exists()
+    assert load_config_yaml(md_file) == {
+        "scan_id": 1,
+        "proposal_id": "commissioning",
+    }
+
+    # Readers see changes written by others.
+    assert qserver["proposal_id"] == "commissioning"
+
+    # Changes not yet written are kept when merging.
+    qserver["scan_id"] = 2
+    del console["proposal_id"]
+    console.flush()
+    assert dict(qserver) == {"scan_id": 2}
+    qserver.flush()
+    console.reload()
+    assert dict(console) == {"scan_id": 2}
+
+    # Without shared mode, the last writer wins.
+    alone = StoredDict(md_file, delay=0.01)
+    console["sample"] = "Si"
+    console.flush()
+    alone["title"] = "ignores sample"
+    alone.flush()
+    assert "sample" not in load_config_yaml(md_file)
+    lock_file.unlink()
+
+
+def test_shared_read_while_writing(md_file):
+    """A read (merging changes by others) while a write is underway."""
+    qserver = StoredDict(md_file, delay=60, shared=True)
+    console = StoredDict(md_file, delay=60, shared=True)
+    qserver["scan_id"] = 1
+    qserver.flush()  # The console has not read this yet.
+
+    readers = []
+    take_pending = console._take_pending
+
+    def take_pending_then_read():
+        """Claim the pending changes, then let another thread read."""
+        pending = take_pending()
+        reader = threading.Thread(target=dict, args=(console,))
+        reader.start()
+        readers.append(reader)
+        luftpause()  # Give the reader the chance to merge now.
+        return pending
+
+    console._take_pending = take_pending_then_read
+    console["proposal_id"] = "commissioning"
+    console.flush()
+    readers[0].join()
+
+    expected = {"scan_id": 1, "proposal_id": "commissioning"}
+    assert dict(console) == expected
+    assert load_config_yaml(md_file) == expected
+    md_file.with_name(md_file.name + ".lock").unlink()
+
+
+def test_shared_nested(md_file):
+    """Nested values held by the caller are still tracked after a merge."""
+    qserver = StoredDict(md_file, delay=60, shared=True)
+    console = StoredDict(md_file, delay=60, shared=True)
+    console["sample"] = {"name": "Si"}
+    console["temperatures"] = [20]
+    console.flush()
+    sample = console["sample"]
+    temperatures = console["temperatures"]
+
+    qserver.reload()
+    qserver["scan_id"] = 1
+    qserver.flush()
+    assert console["scan_id"] == 1  # Merged.
+
+    sample["thickness"] = 0.5  # Values unchanged by the merge are kept.
+    temperatures.append(25)
+    console.flush()
+    assert load_config_yaml(md_file) == {
+        "sample": {"name": "Si", "thickness": 0.5},
+        "scan_id": 1,
+        "temperatures": [20, 25],
+    }
+
+    qserver.reload()
+    qserver["sample"] = {"name": "Ge"}
+    qserver.flush()
+    assert console["sample"] == {"name": "Ge"}
+    sample["thickness"] = 1.0  # Replaced by the merge: not written.
+    console.flush()
+    assert load_config_yaml(md_file)["sample"] == {"name": "Ge"}
+    md_file.with_name(md_file.name + ".lock").unlink()
+
+
+def test_shared_journal(md_file):
+    """Shared mode does not support the journal."""
+    with pytest.raises(ValueError) as reason:
+        StoredDict(md_file, shared=True, journal=True)
+    assert "cannot use a journal" in str(reason), f"{reason=}"
+
+
+def _shared_writer(md_file, name, n):
+    """(subprocess) Write one key 'n' times to a shared StoredDict."""
+    sdict = StoredDict(md_file, delay=60, shared=True)
+    for i in range(n):
+        sdict[name] = i
+        sdict.flush()
+
+
+def test_shared_processes(md_file):
+    """Several processes writing their own keys to the same file."""
+    context = multiprocessing.get_context("fork")
+    names = [f"process_{i}" for i in range(4)]
+    processes = [
+        context.Process(target=_shared_writer, args=(md_file, name, 10))
+        for name in names
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    assert load_config_yaml(md_file) == {name: 9 for name in names}
+    md_file.with_name(md_file.name + ".lock").unlink()
@@ -4,12 +4,37 @@ Configuration management for the instrument.
 This module serves as the single source of truth for instrument configuration.
 It loads and validates the configuration from the iconfig.yml file and provides
 access to the configuration throughout the application.
+
+Configuration files are parsed once per process: the result is kept in a
+cache, keyed on the file's resolved path, modification time, size and inode.
+An unchanged file is not parsed again.  Optionally (see
+``set_parse_cache_dir()``), the parsed results are also kept on disk so
+that unchanged files are not parsed again after a restart.  Counters
+(``parse_cache_stats()``) show how well the cache works.
+
+A session can follow changes to the configuration file without a restart:
+``watch_config()`` starts a thread which calls ``reload_config()`` when the
+file changes.  The changes (see ``diff_config()``) are applied to the
+configuration and passed to the callbacks registered by
+``subscribe_config()`` for the keys which changed.
+
+The sections used by apsbits are also checked when loaded and compiled into
+a read-only object (see ``get_config_object()`` and
+:mod:`apsbits.utils.config_model`).
 """
 
+import copy
+import hashlib
 import logging
+import os
 import pathlib
+import pickle
+import threading
+import types
 from pathlib import Path
+from typing import TYPE_CHECKING
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import List
 from typing import Optional
@@ -18,11 +43,44 @@ from typing import Tuple
 import tomli  # type: ignore
 import yaml
 
+if TYPE_CHECKING:
+    from apsbits.utils.config_model import IConfig
+
 logger = logging.getLogger(__name__)
 logger.bsdev(__file__)
 
 # Global configuration instance
 _iconfig: Dict[str, Any] = {}
+# Contents of the configuration file, as last (re)loaded.
+_iconfig_file: Dict[str, Any] = {}
+# Checked, read-only view of _iconfig (None: compile when next requested).
+_iconfig_object: Optional["IConfig"] = None
+
+MISSING = object()
+"""In a change from ``diff_config()``: the key is not present."""
+
+# Callbacks to changes: [(callback, (key, ...))]
+_subscribers: List[Tuple[Callable, Tuple[str, ...]]] = []
+_config_watcher: Optional[Tuple[threading.Thread, threading.Event]] = None
+
+PARSE_CACHE_DIR_ENV = "BITS_PARSE_CACHE_DIR"
+"""Environment variable: directory for the on-disk cache of parsed files."""
+PARSE_CACHE_VERSION = 1
+"""Change when the format of the on-disk cache changes."""
+
+# Parsed files: {(resolved path, kind): (file key, parsed contents)}
+_parse_cache: Dict[Tuple[str, str], Tuple[tuple, Any]] = {}
+_parse_cache_dir: Optional[Path] = (
+    Path(os.environ[PARSE_CACHE_DIR_ENV])
+    if os.environ.get(PARSE_CACHE_DIR_ENV)
+    else None
+)
+_parse_cache_lock = threading.Lock()
+_parse_cache_stats: Dict[str, int] = {
+    "hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+}
 
 
 def load_config(config_path: Optional[Path] = None) -> Dict[str, Any]:
@@ -35,11 +93,16 @@ def load_config(config_path: Optional[Path] = None) -> Dict[str, Any]:
     Returns:
         The loaded configuration dictionary.
 
+    The sections used by apsbits are checked (see ``get_config_object()``).
+
     Raises:
-        ValueError: If config_path is None or if the file extension is not supported.
+        ValueError: If config_path is None, if the file extension is not
+            supported, or if the configuration has problems.
         FileNotFoundError: If the configuration file does not exist.
     """
     global _iconfig
+    global _iconfig_file
+    global _iconfig_object
 
     if config_path is None:
         raise ValueError("config_path must be provided")
@@ -48,30 +111,33 @@ def load_config(config_path: Optional[Path] = None) -> Dict[str, Any]:
         raise FileNotFoundError(f"Configuration file not found at {config_path}")
 
     try:
-        with open(config_path, "rb") as f:
-            if config_path.suffix.lower() == ".yml":
-                config = yaml.safe_load(f)
-            elif config_path.suffix.lower() == ".toml":
-                config = tomli.load(f)
-            else:
-                raise ValueError(
-                    f"Unsupported configuration file format: {config_path.suffix}"
-                )
-
-            if config is None:
-                config = {}
-            _iconfig.update(config)
-
-            _iconfig["ICONFIG_PATH"] = str(config_path)
-            _iconfig["INSTRUMENT_PATH"] = str(config_path.parent)
-            _iconfig["INSTRUMENT_FOLDER"] = str(config_path.parent.name)
-
-            return _iconfig
+        config = _read_config_file(config_path)
+        iconfig_object = _compile_config({**_iconfig, **config})
+        _iconfig_file = copy.deepcopy(config)
+        _iconfig_object = iconfig_object
+        _iconfig.update(config)
+
+        _iconfig["ICONFIG_PATH"] = str(config_path)
+        _iconfig["INSTRUMENT_PATH"] = str(config_path.parent)
+        _iconfig["INSTRUMENT_FOLDER"] = str(config_path.parent.name)
+
+        return _iconfig
     except Exception as e:
         logger.error("Error loading configuration: %s", e)
         raise
 
 
+def _read_config_file(config_path: Path) -> Dict[str, Any]:
+    """(internal) Contents of a YAML or TOML configuration file."""
+    if config_path.suffix.lower() == ".yml":
+        config = _parse_file(config_path, "safe_yaml")
+    elif config_path.suffix.lower() == ".toml":
+        config = _parse_file(config_path, "toml")
+    else:
+        raise ValueError(f"Unsupported configuration file format: {config_path.suffix}")
+    return config or {}
+
+
 def get_config() -> Dict[str, Any]:
     """
     Get the current configuration.
@@ -82,6 +148,32 @@ def get_config() -> Dict[str, Any]:
     return _iconfig
 
 
+def get_config_object() -> "IConfig":
+    """
+    Get the current configuration, as a checked, read-only object.
+
+    EXAMPLE::
+
+        get_config_object().MAKE_DEVICES.LOG_LEVEL
+
+    Raises:
+        ValueError: If the configuration has problems.
+    """
+    global _iconfig_object
+
+    if _iconfig_object is None:
+        _iconfig_object = _compile_config(_iconfig)
+    return _iconfig_object
+
+
+def _compile_config(iconfig: Dict[str, Any]) -> "IConfig":
+    """(internal) Check the configuration, return it as an ``IConfig``."""
+    # Imported here: it needs (slower to import) modules for its choices.
+    from apsbits.utils.config_model import compile_config
+
+    return compile_config(iconfig)
+
+
 def update_config(updates: Dict[str, Any]) -> None:
     """
     Update the current configuration.
@@ -89,15 +181,198 @@ def update_config(updates: Dict[str, Any]) -> None:
     Args:
         updates: Dictionary of configuration updates.
     """
+    global _iconfig_object
+
     _iconfig.update(updates)
+    _iconfig_object = None  # Check again when next requested.
+
+
+def diff_config(old: Dict[str, Any], new: Dict[str, Any], prefix: str = "") -> dict:
+    """
+    Differences between two configurations.
+
+    Nested dictionaries are compared key by key.
+
+    Args:
+        old: The configuration before.
+        new: The configuration after.
+        prefix: Prepended to the keys of the result.
+
+    Returns:
+        Dictionary of changes: ``{"SECTION.KEY": (old_value, new_value)}``.
+        ``MISSING`` is used for a key which is not present.
+    """
+    changes = {}
+    for key in list(old) + [k for k in new if k not in old]:
+        before = old.get(key, MISSING)
+        after = new.get(key, MISSING)
+        path = f"{prefix}{key}"
+        if isinstance(before, dict) and isinstance(after, dict):
+            changes.update(diff_config(before, after, prefix=f"{path}."))
+        elif before is MISSING or after is MISSING or before != after:
+            changes[path] = before, after
+    return changes
+
+
+def subscribe_config(callback: Callable[[dict], Any], *keys: str) -> None:
+    """
+    Call ``callback(changes)`` when the configuration is reloaded.
+
+    Args:
+        callback: Function called with the changes (see ``diff_config()``).
+        keys: Call only for changes of these keys (such as ``"BEC"`` or
+            ``"OPHYD.TIMEOUTS"``), and pass only those changes.  Without
+            keys, call for any change.
+
+    Subscribing a callback again replaces its earlier subscription.
+    """
+    unsubscribe_config(callback)
+    _subscribers.append((callback, keys))
+
+
+def unsubscribe_config(callback: Callable[[dict], Any]) -> None:
+    """Stop calling ``callback`` for configuration changes."""
+    _subscribers[:] = [
+        item for item in _subscribers if not _same_callback(item[0], callback)
+    ]
+
+
+def _same_callback(a: Callable, b: Callable) -> bool:
+    """(internal) Same function or same method of the same object?"""
+    owner = getattr(a, "__self__", None)
+    if owner is None or isinstance(owner, types.ModuleType):
+        return a == b
+    # Bound methods compare their objects with ==, such as two empty lists.
+    return owner is getattr(b, "__self__", None) and a.__name__ == getattr(
+        b, "__name__", None
+    )
+
+
+def _key_matches(path: str, keys: Tuple[str, ...]) -> bool:
+    """(internal) Is the change at 'path' within (or above) any of 'keys'?"""
+    if len(keys) == 0:
+        return True
+    return any(
+        path == key or path.startswith(f"{key}.") or key.startswith(f"{path}.")
+        for key in keys
+    )
+
+
+def reload_config() -> dict:
+    """
+    Read the configuration file again.  Apply and announce the changes.
+
+    Only the keys read from the file are compared, so keys added by
+    ``update_config()`` are kept.  Each subscriber (see
+    ``subscribe_config()``) is called with the changes of its keys.
+
+    Returns:
+        The changes (see ``diff_config()``).
+
+    Raises:
+        ValueError: If no configuration file has been loaded, or if the
+            changed configuration has problems (then, nothing is changed).
+    """
+    global _iconfig_file
+    global _iconfig_object
+
+    if "ICONFIG_PATH" not in _iconfig:
+        raise ValueError("No configuration file has been loaded.")
+    config = _read_config_file(Path(_iconfig["ICONFIG_PATH"]))
+    changes = diff_config(_iconfig_file, config)
+    if len(changes) == 0:
+        return changes
+
+    revised = dict(_iconfig)
+    for key in set(_iconfig_file) | set(config):
+        if key not in config:
+            revised.pop(key, None)
+        elif _iconfig_file.get(key, MISSING) != config[key]:
+            revised[key] = config[key]
+    _iconfig_object = _compile_config(revised)
+    _iconfig_file = copy.deepcopy(config)
+    # Same dictionary object, revised in place: readers (on other threads)
+    # never see it empty or missing keys that remain.
+    for key, value in revised.items():
+        if _iconfig.get(key, MISSING) is not value:
+            _iconfig[key] = value
+    for key in [key for key in _iconfig if key not in revised]:
+        del _iconfig[key]
+    logger.info("Configuration changed: %s", ", ".join(changes))
+
+    for callback, keys in list(_subscribers):
+        selected = {k: v for k, v in changes.items() if _key_matches(k, keys)}
+        if len(selected) > 0:
+            try:
+                callback(selected)
+            except Exception:
+                logger.exception("Configuration subscriber %r failed.", callback)
+    return changes
+
+
+def watch_config(interval: float = 1.0) -> threading.Thread:
+    """
+    Reload the configuration when its file changes.
+
+    A (daemon) thread checks the file (with ``os.stat()``, it is not read)
+    every ``interval`` seconds and calls ``reload_config()`` when the file
+    has changed.  Replaces a watcher started before.
+
+    Returns:
+        The watcher thread.
+    """
+    global _config_watcher
+
+    stop_watching_config()
+    path = Path(_iconfig["ICONFIG_PATH"])
+    stop = threading.Event()
+
+    def watcher():
+        last = _stat_key(path)
+        while not stop.wait(interval):
+            key = _stat_key(path)
+            if key != last:
+                last = key
+                try:
+                    reload_config()
+                except Exception:
+                    logger.exception("Could not reload configuration from %s", path)
+
+    thread = threading.Thread(target=watcher, name="iconfig_watcher", daemon=True)
+    _config_watcher = thread, stop
+    thread.start()
+    return thread
+
+
+def stop_watching_config() -> None:
+    """Stop the thread started by ``watch_config()`` (if any)."""
+    global _config_watcher
+
+    if _config_watcher is not None:
+        thread, stop = _config_watcher
+        stop.set()
+        thread.join()
+        _config_watcher = None
+
+
+def _stat_key(path: Path) -> Optional[tuple]:
+    """(internal) Identify one version of a file (None if not found)."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
 
 
 def load_config_yaml(config_obj) -> dict:
     """
     Load configuration from a YAML file.
 
+    A file given by its path is parsed only if it changed since it was last
+    parsed (see ``parse_cache_stats()``).
+
     Args:
-        config_path: Path to the configuration file.
+        config_path: Path to the configuration file (or a file-like object).
 
     Returns:
         The loaded configuration dictionary.
@@ -110,13 +385,11 @@ def load_config_yaml(config_obj) -> dict:
         raise ValueError("config_path must be provided")
 
     try:
-        # If it's a path, open it first
+        # If it's a path, use the parse cache
         if isinstance(config_obj, (str, pathlib.Path)):
-            with open(config_obj, "r") as f:
-                content = f.read()
+            return _parse_file(config_obj, "yaml")
         # Otherwise assume it's a file-like object
-        else:
-            content = config_obj.read()
+        content = config_obj.read()
 
         iconfig = yaml.load(content, yaml.Loader)
         return iconfig
@@ -125,6 +398,169 @@ def load_config_yaml(config_obj) -> dict:
         raise
 
 
+def parse_cache_stats() -> Dict[str, int]:
+    """
+    Counters of the parse cache.
+
+    ==========  ========================================================
+    key         description
+    ==========  ========================================================
+    hits        Files not parsed again: found in the (in-memory) cache.
+    disk_hits   Files not parsed again: found in the on-disk cache.
+    misses      Files parsed.
+    entries     Files in the (in-memory) cache now.
+    ==========  ========================================================
+    """
+    with _parse_cache_lock:
+        return dict(_parse_cache_stats, entries=len(_parse_cache))
+
+
+def clear_parse_cache() -> None:
+    """Empty the (in-memory) parse cache and reset its counters."""
+    with _parse_cache_lock:
+        _parse_cache.clear()
+        for key in _parse_cache_stats:
+            _parse_cache_stats[key] = 0
+
+
+def set_parse_cache_dir(path: Optional[Path] = None) -> None:
+    """
+    Keep parsed files in this directory (None: do not keep them on disk).
+
+    The default is taken from the ``BITS_PARSE_CACHE_DIR`` environment
+    variable.  The files in that directory are Python pickles: use a
+    directory which only you can write.
+    """
+    global _parse_cache_dir
+
+    _parse_cache_dir = None if path is None else Path(path)
+
+
+def preparse_configs(configs_path: Path) -> List[Path]:
+    """
+    Parse an instrument's configuration files into the parse cache.
+
+    A process which starts sessions (such as by ``fork()``) calls this so
+    that the sessions find these files already parsed.  ``iconfig`` files
+    are parsed as by ``load_config()``, other YAML files as by
+    ``load_config_yaml()``.
+
+    Returns:
+        The files parsed.
+    """
+    parsed = []
+    for path in sorted(Path(configs_path).iterdir()):
+        if path.name in ("iconfig.yml", "iconfig.toml"):
+            _read_config_file(path)
+        elif path.suffix.lower() == ".yml":
+            load_config_yaml(path)
+        else:
+            continue
+        parsed.append(path)
+    return parsed
+
+
+def _parse_yaml(path: Path) -> Any:
+    """(internal) Parse a YAML file (Python-specific tags allowed)."""
+    with open(path, "r") as f:
+        return yaml.load(f.read(), yaml.Loader)
+
+
+def _parse_safe_yaml(path: Path) -> Any:
+    """(internal) Parse a YAML file (standard tags only)."""
+    with open(path, "rb") as f:
+        return yaml.safe_load(f)
+
+
+def _parse_toml(path: Path) -> Any:
+    """(internal) Parse a TOML file."""
+    with open(path, "rb") as f:
+        return tomli.load(f)
+
+
+_PARSERS = {
+    "safe_yaml": _parse_safe_yaml,
+    "toml": _parse_toml,
+    "yaml": _parse_yaml,
+}
+
+
+def _parse_file(path, kind: str) -> Any:
+    """
+    (internal) Parsed contents of a file, parsing only if it has changed.
+
+    The file is identified by its resolved path, modification time (ns),
+    size and inode.  Each caller gets its own copy of the contents.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    path = Path(path).resolve()
+    stat = os.stat(path)
+    key = (str(path), stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    with _parse_cache_lock:
+        entry = _parse_cache.get((key[0], kind))
+        if entry is not None and entry[0] == key:
+            _parse_cache_stats["hits"] += 1
+            return copy.deepcopy(entry[1])
+
+    found, contents = _read_parse_cache_file(key, kind)
+    if found:
+        counter = "disk_hits"
+    else:
+        counter = "misses"
+        contents = _PARSERS[kind](path)
+        _write_parse_cache_file(key, kind, contents)
+
+    with _parse_cache_lock:
+        _parse_cache_stats[counter] += 1
+        _parse_cache[(key[0], kind)] = key, contents
+    return copy.deepcopy(contents)
+
+
+def _parse_cache_file(key: tuple, kind: str) -> Optional[Path]:
+    """(internal) The on-disk cache file for a parsed file (None: no cache)."""
+    if _parse_cache_dir is None:
+        return None
+    name = hashlib.sha256(f"{kind}:{key[0]}".encode()).hexdigest()[:32]
+    return _parse_cache_dir / f"{name}.pickle"
+
+
+def _read_parse_cache_file(key: tuple, kind: str) -> Tuple[bool, Any]:
+    """(internal) (True, contents) from the on-disk cache, if it is current."""
+    cache_file = _parse_cache_file(key, kind)
+    if cache_file is None:
+        return False, None
+    try:
+        with open(cache_file, "rb") as f:
+            version, cached_key, contents = pickle.load(f)
+    except FileNotFoundError:
+        return False, None
+    except Exception as exc:
+        logger.debug("Ignoring parse cache file %s: %s", cache_file, exc)
+        return False, None
+    if (version, cached_key) != (PARSE_CACHE_VERSION, key):
+        return False, None
+    return True, contents
+
+
+def _write_parse_cache_file(key: tuple, kind: str, contents: Any) -> None:
+    """(internal) Write parsed contents to the on-disk cache (if enabled)."""
+    cache_file = _parse_cache_file(key, kind)
+    if cache_file is None:
+        return
+    temporary = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(temporary, "wb") as f:
+            pickle.dump((PARSE_CACHE_VERSION, key, contents), f)
+        os.replace(temporary, cache_file)
+    except Exception as exc:  # The cache is optional.
+        logger.debug("Could not write parse cache file %s: %s", cache_file, exc)
+        temporary.unlink(missing_ok=True)
+
+
 def validate_instrument_path(
     instrument_path: Optional[Path] = None,
     expected_files: Optional[List[str]] = None,
@@ -0,0 +1,268 @@
+"""
+Typed iconfig
+=============
+
+Read-only, typed view of the iconfig sections used by apsbits.
+
+``compile_config()`` checks the ``RUN_ENGINE``, ``OPHYD``, ``BEC``,
+``NEXUS_DATA_FILES``, ``SPEC_DATA_FILES``, and ``MAKE_DEVICES`` sections
+once (when the configuration is loaded), converts values (such as a log
+level name to its number), and fills in the defaults.  Settings are then
+read by attribute::
+
+    from apsbits.utils.config_loaders import get_config_object
+
+    config = get_config_object()
+    config.MAKE_DEVICES.LOG_LEVEL  # 20 (logging.INFO)
+    config.OPHYD.TIMEOUTS.PV_READ
+
+An unknown key or a value of the wrong type in one of these sections raises
+``ValueError`` (listing all problems) at startup.  Other sections of iconfig
+are not checked.
+
+.. autosummary::
+    ~compile_config
+    ~IConfig
+    ~BecConfig
+    ~DataFilesConfig
+    ~MakeDevicesConfig
+    ~NexusDataFilesConfig
+    ~OphydConfig
+    ~RunEngineConfig
+    ~TimeoutsConfig
+"""
+
+import dataclasses
+import logging
+import types
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Mapping
+from typing import Optional
+
+from apsbits.utils.controls_setup import DEFAULT_CONTROL_LAYER
+from apsbits.utils.controls_setup import DEFAULT_TIMEOUT
+from apsbits.utils.metadata import DEFAULT_MD_BACKEND
+from apsbits.utils.metadata import MD_BACKENDS
+from apsbits.utils.stored_dict import DEFAULT_DURABILITY
+from apsbits.utils.stored_dict import DURABILITY_LEVELS
+
+logger = logging.getLogger(__name__)
+logger.bsdev(__file__)
+
+CONTROL_LAYERS = ("PyEpics", "caproto")
+"""Choices for ``OPHYD.CONTROL_LAYER``."""
+
+
+def _bool(value: Any) -> bool:
+    """(internal) Check a true/false value."""
+    if not isinstance(value, bool):
+        raise ValueError(f"must be true or false, not {value!r}")
+    return value
+
+
+def _count(value: Any) -> int:
+    """(internal) Check a whole number, zero or more."""
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError(f"must be a whole number (0 or more), not {value!r}")
+    return value
+
+
+def _seconds(value: Any) -> float:
+    """(internal) Check a time (seconds), zero or more."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"must be a number of seconds (0 or more), not {value!r}")
+    return float(value)
+
+
+def _text(value: Any) -> str:
+    """(internal) Check a text value."""
+    if not isinstance(value, str):
+        raise ValueError(f"must be text, not {value!r}")
+    return value
+
+
+def _optional_text(value: Any) -> Optional[str]:
+    """(internal) Check a text value (or null)."""
+    return None if value is None else _text(value)
+
+
+def _mapping(value: Any) -> Mapping:
+    """(internal) Check a dictionary.  Make it read-only."""
+    if not isinstance(value, dict):
+        raise ValueError(f"must be a dictionary, not {value!r}")
+    return types.MappingProxyType(dict(value))
+
+
+def _choice(choices) -> Callable[[Any], str]:
+    """(internal) Check one of 'choices' (not case-sensitive)."""
+
+    def check(value: Any) -> str:
+        for choice in choices:
+            if isinstance(value, str) and value.lower() == choice.lower():
+                return choice
+        raise ValueError(f"must be one of {', '.join(choices)}, not {value!r}")
+
+    return check
+
+
+def _log_level(value: Any) -> int:
+    """(internal) Check a log level (name or number), return its number."""
+    if isinstance(value, str) and value.upper() in logging._nameToLevel:
+        return logging._nameToLevel[value.upper()]
+    if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+        return value
+    raise ValueError(f"must be a log level (such as 'info'), not {value!r}")
+
+
+def _setting(check: Callable[[Any], Any], default: Any = None, **kwargs):
+    """(internal) A setting: its check (and conversion) and default value."""
+    if isinstance(default, dict):
+        kwargs["default_factory"] = lambda: types.MappingProxyType({})
+    else:
+        kwargs["default"] = default
+    return dataclasses.field(metadata={"check": check}, **kwargs)
+
+
+def _section(cls):
+    """(internal) A subsection, all defaults."""
+    return dataclasses.field(default_factory=cls)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class TimeoutsConfig:
+    """iconfig ``OPHYD.TIMEOUTS``: EPICS timeouts (seconds)."""
+
+    PV_READ: float = _setting(_seconds, float(DEFAULT_TIMEOUT))
+    PV_WRITE: float = _setting(_seconds, float(DEFAULT_TIMEOUT))
+    PV_CONNECTION: float = _setting(_seconds, float(DEFAULT_TIMEOUT))
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class OphydConfig:
+    """iconfig ``OPHYD``: how ophyd communicates with EPICS."""
+
+    CONTROL_LAYER: str = _setting(_choice(CONTROL_LAYERS), DEFAULT_CONTROL_LAYER)
+    TIMEOUTS: TimeoutsConfig = _section(TimeoutsConfig)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class RunEngineConfig:
+    """iconfig ``RUN_ENGINE``: the RunEngine and its metadata (RE.md)."""
+
+    DEFAULT_METADATA: Mapping = _setting(_mapping, {})
+    SCAN_ID_PV: Optional[str] = _setting(_optional_text)
+    MD_PATH: Optional[str] = _setting(_optional_text)
+    MD_BACKEND: str = _setting(_choice(MD_BACKENDS), DEFAULT_MD_BACKEND)
+    MD_JOURNAL: bool = _setting(_bool, False)
+    MD_DURABILITY: str = _setting(_choice(DURABILITY_LEVELS), DEFAULT_DURABILITY)
+    MD_LOAD_CACHE: bool = _setting(_bool, False)
+    MD_SHARED: bool = _setting(_bool, False)
+    MD_HISTORY: int = _setting(_count, 0)
+    USE_PROGRESS_BAR: bool = _setting(_bool, True)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class BecConfig:
+    """iconfig ``BEC``: parts of the BestEffortCallback to show."""
+
+    BASELINE: bool = _setting(_bool, True)
+    HEADING: bool = _setting(_bool, True)
+    PLOTS: bool = _setting(_bool, True)
+    TABLE: bool = _setting(_bool, True)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class DataFilesConfig:
+    """iconfig ``SPEC_DATA_FILES``: write data files of this format?"""
+
+    ENABLE: bool = _setting(_bool, False)
+    FILE_EXTENSION: str = _setting(_text, "dat")
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class NexusDataFilesConfig:
+    """iconfig ``NEXUS_DATA_FILES``: write NeXus data files?"""
+
+    ENABLE: bool = _setting(_bool, False)
+    FILE_EXTENSION: str = _setting(_text, "hdf")
+    WARN_MISSING: bool = _setting(_bool, False)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class MakeDevicesConfig:
+    """iconfig ``MAKE_DEVICES``: how ``make_devices()`` works."""
+
+    LOG_LEVEL: int = _setting(_log_level, logging.INFO)
+    VERBOSE: bool = _setting(_bool, False)
+    WORKERS: int = _setting(_count, 1)
+    LAZY: bool = _setting(_bool, False)
+    MANIFEST: Optional[str] = _setting(_optional_text)
+    PROFILE: bool = _setting(_bool, False)
+    PROFILE_FILE: Optional[str] = _setting(_optional_text)
+    PV_CACHE: Optional[str] = _setting(_optional_text)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class IConfig:
+    """The iconfig sections used by apsbits, checked and read-only."""
+
+    RUN_ENGINE: RunEngineConfig = _section(RunEngineConfig)
+    OPHYD: OphydConfig = _section(OphydConfig)
+    BEC: BecConfig = _section(BecConfig)
+    NEXUS_DATA_FILES: NexusDataFilesConfig = _section(NexusDataFilesConfig)
+    SPEC_DATA_FILES: DataFilesConfig = _section(DataFilesConfig)
+    MAKE_DEVICES: MakeDevicesConfig = _section(MakeDevicesConfig)
+
+
+def compile_config(iconfig: Mapping) -> IConfig:
+    """
+    Check the iconfig sections used by apsbits and make an ``IConfig``.
+
+    Args:
+        iconfig: The configuration dictionary (as from ``load_config()``).
+
+    Returns:
+        The sections as (read-only) objects, with defaults filled in.
+
+    Raises:
+        ValueError: Describing each unknown key and each value of the wrong
+            type in the checked sections.
+    """
+    problems: List[str] = []
+    config = _compile_section(IConfig, iconfig, "", problems, top=True)
+    if problems:
+        raise ValueError("Problems in iconfig:\n  " + "\n  ".join(problems))
+    return config
+
+
+def _compile_section(cls, data, where, problems, top=False):
+    """(internal) Make a 'cls' object from 'data', noting any problems."""
+    if data is None:
+        data = {}
+    if not isinstance(data, Mapping):
+        problems.append(f"{where}: must be a dictionary, not {data!r}")
+        return cls()
+
+    fields = {field.name: field for field in dataclasses.fields(cls)}
+    if not top:  # Other (top-level) iconfig keys are not checked.
+        for key in data:
+            if key not in fields:
+                problems.append(
+                    f"{where}: unknown key {key!r}. Known keys: {', '.join(fields)}"
+                )
+
+    values = {}
+    for name, field in fields.items():
+        if name not in data:
+            continue
+        path = f"{where}.{name}" if where else name
+        if dataclasses.is_dataclass(field.type):
+            values[name] = _compile_section(field.type, data[name], path, problems)
+            continue
+        try:
+            values[name] = field.metadata["check"](data[name])
+        except ValueError as exc:
+            problems.append(f"{path}: {exc}")
+    return cls(**values)
@@ -4,13 +4,20 @@ EPICS & ophyd related setup
 
 .. autosummary::
     ~connect_scan_id_pv
+    ~DeferringRegistry
+    ~device_signals
     ~epics_scan_id_source
     ~oregistry
+    ~pv_names
     ~set_control_layer
     ~set_timeouts
+    ~unconnected_pvs
 """
 
+import contextlib
 import logging
+import threading
+import types
 from typing import Optional
 
 import ophyd
@@ -92,17 +99,145 @@ def set_control_layer(control_layer: str = DEFAULT_CONTROL_LAYER):
 
 
 def set_timeouts(timeouts):
-    """Set default timeout for all EpicsSignal connections & communications."""
+    """
+    Set default timeout for all EpicsSignal connections & communications.
+
+    Once EpicsSignals have been created, the defaults cannot be changed.
+    Then, set the timeouts of the EpicsSignals in the ``oregistry``.
+
+    ``timeouts`` is the ``OPHYD.TIMEOUTS`` section of iconfig: a dict or
+    a ``TimeoutsConfig`` object.
+    """
+    if isinstance(timeouts, dict):
+        timeouts = types.SimpleNamespace(
+            PV_READ=timeouts.get("PV_READ", DEFAULT_TIMEOUT),
+            PV_WRITE=timeouts.get("PV_WRITE", DEFAULT_TIMEOUT),
+            PV_CONNECTION=timeouts.get("PV_CONNECTION", DEFAULT_TIMEOUT),
+        )
+    timeout = timeouts.PV_READ
+    write_timeout = timeouts.PV_WRITE
+    connection_timeout = timeouts.PV_CONNECTION
     if not EpicsSignalBase._EpicsSignalBase__any_instantiated:
         # Only BEFORE any EpicsSignalBase (or subclass) are created!
         EpicsSignalBase.set_defaults(
             auto_monitor=True,
-            timeout=timeouts.get("PV_READ", DEFAULT_TIMEOUT),
-            write_timeout=timeouts.get("PV_WRITE", DEFAULT_TIMEOUT),
-            connection_timeout=timeouts.get("PV_CONNECTION", DEFAULT_TIMEOUT),
+            timeout=timeout,
+            write_timeout=write_timeout,
+            connection_timeout=connection_timeout,
         )
+        return
+
+    for signal in oregistry.all_devices:
+        if isinstance(signal, EpicsSignalBase):
+            signal._timeout = timeout
+            signal._write_timeout = write_timeout
+            signal._connection_timeout = connection_timeout
 
 
-oregistry = Registry(auto_register=True)
+def device_signals(device) -> list:
+    """The signals of a device (or the signal itself)."""
+    if hasattr(device, "walk_signals"):
+        return [walk.item for walk in device.walk_signals()]
+    return [device]
+
+
+def pv_names(signals) -> list[str]:
+    """
+    The EPICS PV names used by these signals, in order, without repeats.
+
+    Both the read (``pvname``) and write (``setpoint_pvname``) PVs.
+    Objects without PVs (such as soft signals) are skipped.
+    """
+    pvs = []
+    for signal in signals:
+        for attr in ("pvname", "setpoint_pvname"):
+            pv = getattr(signal, attr, None)
+            if pv is not None and pv not in pvs:
+                pvs.append(pv)
+    return pvs
+
+
+def unconnected_pvs(devices) -> dict[str, list[str]]:
+    """
+    The unconnected devices, by name, with their unconnected PVs.
+
+    Connected devices are not listed.
+    """
+    stragglers = {}
+    for device in devices:
+        if getattr(device, "connected", True):
+            continue
+        stragglers[device.name] = pv_names(
+            signal
+            for signal in device_signals(device)
+            if not getattr(signal, "connected", True)
+        )
+    return stragglers
+
+
+class DeferringRegistry(Registry):
+    """
+    Registry (of ophyd-style objects) which can defer registration.
+
+    Within ``with registry.deferred() as created:``, objects created (or
+    registered) on this thread are listed in ``created`` instead of being
+    registered.  Other threads are not affected.  Then,
+    ``register_created(devices, created)`` registers the finished devices
+    (and their components) once, in order.  Deferrals may be nested.
+
+    Registration is serialized by a lock, so objects may be created on
+    several threads.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Prepare the lock and the (per-thread) deferrals."""
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        super().__init__(*args, **kwargs)
+
+    def register(self, component, labels=None):
+        """Register a device, component, etc. (or defer, on this thread)."""
+        created = getattr(self._local, "created", None)
+        if created is not None and not isinstance(component, type):
+            created.append(component)
+            return component
+        with self._lock:
+            return super().register(component, labels=labels)
+
+    def pop(self, *args, **kwargs):
+        """Remove an object from the registry."""
+        with self._lock:
+            return super().pop(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def deferred(self):
+        """Defer registration of the objects created on this thread."""
+        previous = getattr(self._local, "created", None)
+        created = []
+        self._local.created = created
+        try:
+            yield created
+        finally:
+            self._local.created = previous
+
+    def register_created(self, devices, created=()):
+        """
+        Register 'devices' (in order), then the others of 'created'.
+
+        Components of the devices are registered with them.  Other objects
+        of 'created' (those without a parent) are registered after.
+        Returns the devices.
+        """
+        for device in devices:
+            self.register(device)
+        registered = {id(device) for device in devices}
+        for obj in created:
+            if getattr(obj, "parent", None) is None and id(obj) not in registered:
+                registered.add(id(obj))
+                self.register(obj)
+        return devices
+
+
+oregistry = DeferringRegistry(auto_register=True)
 """Registry of all ophyd-style Devices and Signals."""
 oregistry.warn_duplicates = False
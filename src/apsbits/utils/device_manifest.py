@@ -0,0 +1,237 @@
+"""
+Device manifest
+===============
+
+Precompiled device definitions, for faster startup.
+
+``bits-compile-devices`` (or ``compile_manifest()``) reads each devices
+file named in iconfig and writes one manifest file (JSON) with:
+
+* the content hash (SHA-256) of each devices file,
+* its device definitions, as in the file,
+* for each device factory, the ``devices`` it makes: its range (such as
+  ``first: 1, last: 22``) expanded into one definition per device,
+* the import path of each creator (class or factory).
+
+With ``MAKE_DEVICES.MANIFEST`` (iconfig), ``make_devices()`` uses the
+definitions from the manifest for each devices file that has not changed
+since.  A changed (or new) devices file is parsed, as usual.  Either way,
+the definitions (and so, the devices made) are the same: each factory is
+called to make its devices.
+
+.. autosummary::
+    ~compile_manifest
+    ~manifest_entries
+    ~read_definitions
+    ~resolve_creator
+"""
+
+import datetime
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pathlib
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from apstools.utils import dynamic_import
+
+from apsbits.utils.config_loaders import load_config_yaml
+from apsbits.utils.sim_creator import factory_specs
+from apsbits.utils.sim_creator import frame_detectors_specs
+from apsbits.utils.sim_creator import motors_specs
+
+logger = logging.getLogger(__name__)
+logger.bsdev(__file__)
+
+DEFAULT_MANIFEST = "devices_manifest.json"
+"""Default name of the manifest file (in the instrument's configs directory)."""
+
+MANIFEST_VERSION = 3
+"""Changes when the manifest's layout changes.  Other versions are ignored."""
+
+_EXPANSIONS = {
+    "apsbits.utils.sim_creator.factory_base": factory_specs,
+    "apsbits.utils.sim_creator.motors": motors_specs,
+    "apsbits.utils.sim_creator.frame_detectors": frame_detectors_specs,
+}
+"""(internal) Factories whose devices can be listed without building them."""
+
+
+def read_definitions(config_file: pathlib.Path | str) -> List[Dict[str, Any]]:
+    """
+    Parse the device definitions from a devices (YAML) file.
+
+    Each definition is a dictionary with keys: ``device_class`` (name of the
+    creator), ``args``, and ``kwargs``.
+    """
+    config_data = load_config_yaml(config_file)
+    return [
+        {
+            "device_class": creator,
+            "args": (),  # ALL specs are kwargs!
+            "kwargs": table,
+        }
+        # each support type (class, factory, function, ...)
+        for creator, specs in config_data.items()
+        for table in specs
+    ]
+
+
+def resolve_creator(path: str):
+    """Import a creator from its resolved path (``"module:qualname"``)."""
+    module_name, _, qualname = path.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def compile_manifest(
+    device_files: List[pathlib.Path | str],
+    manifest_file: pathlib.Path | str,
+) -> Dict[str, Any]:
+    """
+    Write the manifest for these devices files.
+
+    Args:
+        device_files: The devices (YAML) files, as named in iconfig
+            ``DEVICES_FILES`` and ``APS_DEVICES_FILES``.
+        manifest_file: Write the manifest (JSON) to this file.
+
+    Returns:
+        The manifest (as written).
+
+    Raises:
+        ImportError: If a creator cannot be imported.
+        ValueError: If a definition cannot be written to JSON.
+    """
+    manifest_file = pathlib.Path(manifest_file)
+    files = {}
+    for config_file in device_files:
+        config_file = pathlib.Path(config_file)
+        entries = []
+        for defn in read_definitions(config_file):
+            entry = {**defn, "args": list(defn["args"])}
+            expand = _EXPANSIONS.get(defn["device_class"])
+            if expand is not None:
+                creator, specs = expand(**defn["kwargs"])
+                entry["devices"] = [
+                    {"device_class": creator, "kwargs": kwargs} for kwargs in specs
+                ]
+            entries.append(entry)
+        creators = {
+            name: _resolved_path(name)
+            for name in dict.fromkeys(
+                defn["device_class"]
+                for entry in entries
+                for defn in [entry, *entry.get("devices", [])]
+            )
+        }
+        files[_file_key(config_file, manifest_file)] = {
+            "sha256": _file_hash(config_file),
+            "creators": creators,
+            "entries": entries,
+        }
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "files": files,
+    }
+    try:
+        text = json.dumps(manifest, indent=2)
+    except TypeError as exc:
+        raise ValueError(f"Cannot write device definitions as JSON: {exc}") from exc
+
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    temporary = manifest_file.with_name(f".{manifest_file.name}.tmp")
+    temporary.write_text(text)
+    os.replace(temporary, manifest_file)
+    logger.info(
+        "Wrote %d device definitions from %d files to %s",
+        sum(len(entry["entries"]) for entry in files.values()),
+        len(files),
+        manifest_file,
+    )
+    return manifest
+
+
+def manifest_entries(
+    manifest_file: pathlib.Path | str,
+    config_file: pathlib.Path | str,
+) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, str]]]:
+    """
+    Device definitions of a devices file, from the manifest.
+
+    The definitions are those of the devices file (as ``read_definitions()``
+    returns), so each factory makes its devices, as without the manifest.
+
+    Returns:
+        ``(definitions, creators)`` or ``None`` if the manifest cannot be
+        used for this file: it does not exist, is from another version, does
+        not list this file, or the file has changed since.
+    """
+    manifest_file = pathlib.Path(manifest_file)
+    config_file = pathlib.Path(config_file)
+    try:
+        manifest = json.loads(manifest_file.read_text())
+    except (OSError, ValueError) as exc:
+        logger.debug("Cannot read device manifest %s: %s", manifest_file, exc)
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.debug("Device manifest %s: other version, ignored.", manifest_file)
+        return None
+
+    entry = manifest.get("files", {}).get(_file_key(config_file, manifest_file))
+    if entry is None:
+        logger.debug("%s is not in the device manifest.", config_file)
+        return None
+    if entry["sha256"] != _file_hash(config_file):
+        logger.info(
+            "%s changed since the device manifest was written.  Parsing it.",
+            config_file,
+        )
+        return None
+
+    definitions = [
+        {
+            "device_class": defn["device_class"],
+            "args": tuple(defn["args"]),
+            "kwargs": defn["kwargs"],
+        }
+        for defn in entry["entries"]
+    ]
+    return definitions, entry["creators"]
+
+
+def _file_hash(path: pathlib.Path) -> str:
+    """(internal) SHA-256 of the file's content."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _file_key(config_file: pathlib.Path, manifest_file: pathlib.Path) -> str:
+    """(internal) Name of a devices file, relative to the manifest's directory."""
+    return os.path.relpath(config_file.resolve(), manifest_file.resolve().parent)
+
+
+def _resolved_path(name: str) -> str:
+    """(internal) Import path (``"module:qualname"``) where 'name' is defined."""
+    obj = dynamic_import(name)
+    module_name = getattr(obj, "__module__", None)
+    qualname = getattr(obj, "__qualname__", None)
+    if module_name and qualname and "<" not in qualname:
+        path = f"{module_name}:{qualname}"
+        try:
+            if resolve_creator(path) is obj:
+                return path
+        except (ImportError, AttributeError):
+            pass
+    # Not found where it claims to be defined: use the name as given.
+    module_name, _, qualname = name.rpartition(".")
+    return f"{module_name}:{qualname}"
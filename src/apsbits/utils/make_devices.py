@@ -8,41 +8,64 @@ Construct ophyd-style devices from simple specifications in YAML files.
     :nosignatures:
 
     ~make_devices
+    ~materialize_all
     ~Instrument
+    ~LazyDevice
 """
 
+import concurrent.futures
+import contextlib
+import copy
+import datetime
+import inspect
+import json
 import logging
+import os
 import pathlib
 import sys
+import threading
 import time
+import tracemalloc
+import warnings
 
 import guarneri
+import ophyd
+import pyRestTable
 from apstools.plans import run_blocking_function
 from apstools.utils import dynamic_import
 from bluesky import plan_stubs as bps
 
 from apsbits.utils.aps_functions import host_on_aps_subnet
 from apsbits.utils.config_loaders import get_config
-from apsbits.utils.config_loaders import load_config_yaml
+from apsbits.utils.config_loaders import get_config_object
+from apsbits.utils.controls_setup import device_signals
 from apsbits.utils.controls_setup import oregistry  # noqa: F401
+from apsbits.utils.controls_setup import pv_names
+from apsbits.utils.controls_setup import unconnected_pvs
+from apsbits.utils.device_manifest import manifest_entries
+from apsbits.utils.device_manifest import read_definitions
+from apsbits.utils.device_manifest import resolve_creator
 
 logger = logging.getLogger(__name__)
 logger.bsdev(__file__)
 
 MAIN_NAMESPACE = "__main__"
+PV_CACHE_VERSION = 1
+"""Changes when the PV cache's layout changes.  Other versions are ignored."""
 
 
 def _get_make_devices_log_level() -> int:
     """(internal) User choice for log level used in 'make_devices()'."""
-    level = get_config().get("MAKE_DEVICES", {}).get("LOG_LEVEL", "info")
-    if isinstance(level, str):
-        # Allow log level as str or int in iconfig.yml.
-        level = logging._nameToLevel[level.upper()]
-    return level
+    # Checked (and converted from str) when iconfig was loaded.
+    return get_config_object().MAKE_DEVICES.LOG_LEVEL
 
 
 def make_devices(
-    *, pause: float = 1, clear: bool = True, file: str | pathlib.Path | None = None
+    *,
+    pause: float = 1,
+    clear: bool = True,
+    file: str | pathlib.Path | None = None,
+    reload: bool = False,
 ):
     """
     (plan stub) Create the ophyd-style controls for this instrument.
@@ -53,32 +76,51 @@ def make_devices(
 
         RE(make_devices())  # Use default iconfig.yml
         RE(make_devices(file="custom_devices.yml"))  # Use custom devices file
+        RE(make_devices(reload=True))  # Only what changed in the YAML file(s)
+
+    The devices are added to the ``__main__`` namespace.  One line is logged
+    (at ``MAKE_DEVICES.LOG_LEVEL``) for each devices file.  With
+    ``MAKE_DEVICES.VERBOSE`` (iconfig), each device is also logged.
+
+    With ``MAKE_DEVICES.PV_CACHE`` (iconfig), the PVs connected by the
+    previous session start to connect (all at once) before any device is
+    built.  The PVs connected this time are saved for the next session.
 
     PARAMETERS
 
     pause : float
-        Wait 'pause' seconds (default: 1) for slow objects to connect.
+        Wait at most 'pause' seconds (default: 1) for slow objects to connect.
+        Returns as soon as all devices are connected.  Any devices still
+        not connected are then reported, with the PVs they are missing.
     clear : bool
         Clear 'oregistry' first if True (the default).
     file : str | pathlib.Path | None
         Optional path to a custom YAML/TOML file containing device configurations.
         If provided, this file will be used instead of the default iconfig.yml.
         If None (default), uses the standard iconfig.yml configuration.
+    reload : bool
+        If True, compare each YAML file with the specifications used to build
+        its devices.  Build only devices added or changed since, remove those
+        no longer there, and keep the others (registered and connected).
+        'clear' is ignored.  Default: False (build all the devices again).
 
     """
     logger.debug("(Re)Loading local control objects.")
 
-    if clear:
-        log_level = _get_make_devices_log_level()
-
-        main_namespace = sys.modules[MAIN_NAMESPACE]
-        for dev_name in oregistry.device_names:
-            # Remove from __main__ namespace any devices registered previously.
-            if hasattr(main_namespace, dev_name):
-                logger.log(log_level, "Removing %r from %r", dev_name, MAIN_NAMESPACE)
-                delattr(main_namespace, dev_name)
+    if clear and not reload:
+        # Remove from __main__ namespace any devices registered previously.
+        namespace = vars(sys.modules[MAIN_NAMESPACE])
+        names = [name for name in oregistry.device_names if name in namespace]
+        for name in names:
+            del namespace[name]
+        _log_names("Removed", names, "from")
 
         oregistry.clear()
+        _instr.forget()
+
+    pv_cache = _pv_cache_file()
+    if pv_cache is not None and not reload:
+        _prewarm_pvs(pv_cache)
 
     if file is not None:
         # Use the provided file directly
@@ -88,7 +130,9 @@ def make_devices(
             return
         logger.info("Loading device file: %s", device_path)
         try:
-            yield from run_blocking_function(_loader, device_path, main=True)
+            yield from run_blocking_function(
+                _loader, device_path, main=True, reload=reload
+            )
         except Exception as e:
             logger.error("Error loading device file %s: %s", device_path, str(e))
             return
@@ -113,7 +157,9 @@ def make_devices(
                 continue
             logger.info("Loading device file: %s", device_path)
             try:
-                yield from run_blocking_function(_loader, device_path, main=True)
+                yield from run_blocking_function(
+                    _loader, device_path, main=True, reload=reload
+                )
             except Exception as e:
                 logger.error("Error loading device file %s: %s", device_path, str(e))
                 continue
@@ -131,24 +177,227 @@ def make_devices(
                     continue
                 logger.info("Loading APS device file: %s", device_path)
                 try:
-                    yield from run_blocking_function(_loader, device_path, main=True)
+                    yield from run_blocking_function(
+                        _loader, device_path, main=True, reload=reload
+                    )
                 except Exception as e:
                     logger.error(
                         "Error loading APS device file %s: %s", device_path, str(e)
                     )
                     continue
 
+    connected_at = {}
     if pause > 0:
-        logger.debug(
-            "Waiting %s seconds for slow objects to connect.",
-            pause,
-        )
-        yield from bps.sleep(pause)
+        devices = [
+            device
+            for device in oregistry.root_devices
+            if not isinstance(device, LazyDevice)  # Not built yet.
+        ]
+        connected_at = yield from _wait_for_connections(devices, pause)
+        if pv_cache is not None:
+            _save_pv_cache(pv_cache, devices)
+
+    if get_config_object().MAKE_DEVICES.PROFILE:
+        _report_profile(_instr.profile, connected_at)
 
     # Configure any of the controls here, or in plan stubs
 
 
-def _loader(yaml_device_file, main=True):
+def _wait_for_connections(devices, timeout: float, poll: float = 0.02):
+    """
+    (plan stub) Wait for all 'devices' to connect, with one overall deadline.
+
+    The devices connect concurrently (in the background).  Return as soon
+    as all are connected or, after 'timeout' seconds, report (as warnings)
+    the devices not yet connected and their missing PVs.
+
+    Returns the time (``time.monotonic()``) each device was first seen
+    connected, by name.
+    """
+    devices = list(devices)
+    connected_at = {}
+    pending = devices  # Only these are checked again.
+    t0 = time.monotonic()
+    deadline = t0 + timeout
+    while True:
+        now = time.monotonic()
+        waiting = []
+        for device in pending:
+            if getattr(device, "connected", True):
+                connected_at.setdefault(device.name, now)
+            else:
+                waiting.append(device)
+        pending = waiting
+        remaining = deadline - time.monotonic()
+        if len(pending) == 0 or remaining <= 0:
+            break
+        yield from bps.sleep(min(poll, remaining))
+
+    elapsed = time.monotonic() - t0
+    if len(pending) == 0:
+        logger.debug("All %d devices connected in %.3f s.", len(devices), elapsed)
+        return connected_at
+    stragglers = unconnected_pvs(pending)  # Once, for the report.
+    for name, pvs in sorted(stragglers.items()):
+        logger.warning(
+            "Device %r not connected after %.3f s.  Missing PVs: %s",
+            name,
+            elapsed,
+            ", ".join(pvs) or "(unknown)",
+        )
+    return connected_at
+
+
+def _pv_cache_file() -> pathlib.Path | None:
+    """(internal) The PV cache file, if iconfig names one."""
+    pv_cache = get_config_object().MAKE_DEVICES.PV_CACHE
+    return None if pv_cache is None else pathlib.Path(pv_cache)
+
+
+def _read_pv_cache(path: pathlib.Path) -> list[str]:
+    """
+    (internal) The PV names saved (for this instrument) in the PV cache.
+
+    An empty list if the file does not exist, cannot be read, is from
+    another version, or was saved by another instrument.
+    """
+    try:
+        cache = json.loads(path.read_text())
+    except (OSError, ValueError) as exc:
+        logger.debug("Cannot read PV cache %s: %s", path, exc)
+        return []
+    if cache.get("version") != PV_CACHE_VERSION:
+        logger.debug("PV cache %s: other version, ignored.", path)
+        return []
+    if cache.get("instrument") != get_config().get("INSTRUMENT_PATH"):
+        logger.debug("PV cache %s: other instrument, ignored.", path)
+        return []
+    return list(cache.get("pvs", []))
+
+
+def _prewarm_pvs(path: pathlib.Path) -> int:
+    """
+    (internal) Start to connect all the PVs in the PV cache, at once.
+
+    With PyEpics, the PVs are created (and their searches sent) together,
+    before any device is built.  The devices then use these PVs, connected
+    or connecting.  (The caproto client already sends the searches of the
+    PVs created together in batches.)  Returns the number of PVs.
+    """
+    control_layer = ophyd.get_cl().name
+    if control_layer != "pyepics":
+        logger.debug("No PV pre-warm with control layer %r.", control_layer)
+        return 0
+    pvs = _read_pv_cache(path)
+    if len(pvs) == 0:
+        return 0
+
+    import epics
+    from ophyd.signal import EpicsSignalBase
+
+    # Same as the signals will ask.  (PyEpics never stops monitoring a
+    # cached PV, so a monitored PV here would be monitored for good.)
+    auto_monitor = EpicsSignalBase._EpicsSignalBase__default_auto_monitor
+    t0 = time.time()
+    for pv in pvs:
+        # As ophyd will ask for it, so the devices find this PV in the cache.
+        epics.get_pv(pv, connect=False, auto_monitor=auto_monitor)
+    epics.ca.flush_io()
+    logger.info(
+        "Connecting %d PVs (from %s) in %.3f s.", len(pvs), path, time.time() - t0
+    )
+    return len(pvs)
+
+
+def _save_pv_cache(path: pathlib.Path, devices) -> list[str]:
+    """(internal) Save the names of the connected PVs of these devices."""
+    pvs = pv_names(
+        signal
+        for device in devices
+        for signal in device_signals(device)
+        if getattr(signal, "connected", False)
+    )
+    cache = {
+        "version": PV_CACHE_VERSION,
+        "instrument": get_config().get("INSTRUMENT_PATH"),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "pvs": pvs,
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.tmp")
+        temporary.write_text(json.dumps(cache, indent=2))
+        os.replace(temporary, path)
+    except OSError as exc:
+        logger.warning("Cannot write PV cache %s: %s", path, exc)
+        return pvs
+    logger.debug("Saved %d PV names to %s", len(pvs), path)
+    return pvs
+
+
+def _report_profile(profile: dict, connected_at: dict) -> list[dict]:
+    """
+    (internal) Report the time (and memory) each device took at startup.
+
+    Log a table, slowest device first.  With ``MAKE_DEVICES.PROFILE_FILE``
+    (iconfig), also write the table (as JSON) to that file.
+    """
+    rows = []
+    for name, entry in profile.items():
+        device = entry["device"]
+        signals = device_signals(device)
+        connected = connected_at.get(name)
+        rows.append(
+            {
+                "name": name,
+                "creator": entry["creator"],
+                "build_s": entry["build_s"],
+                "connect_s": None if connected is None else connected - entry["built"],
+                "signals": len(signals),
+                "pvs": len(pv_names(signals)),
+                "memory_bytes": entry["memory_bytes"],
+            }
+        )
+    rows.sort(key=lambda row: -(row["build_s"] + (row["connect_s"] or 0)))
+
+    table = pyRestTable.Table()
+    table.labels = "device creator build(s) connect(s) signals PVs memory(kB)".split()
+    for row in rows:
+        table.addRow(
+            (
+                row["name"],
+                row["creator"],
+                f"{row['build_s']:.3f}",
+                "-" if row["connect_s"] is None else f"{row['connect_s']:.3f}",
+                row["signals"],
+                row["pvs"],
+                "-"
+                if row["memory_bytes"] is None
+                else f"{row['memory_bytes'] / 1024:.1f}",
+            )
+        )
+    logger.info("Device startup profile (slowest first):\n%s", table.reST())
+
+    profile_file = get_config_object().MAKE_DEVICES.PROFILE_FILE
+    if profile_file is not None:
+        path = pathlib.Path(profile_file)
+        report = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "devices": rows,
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_name(f".{path.name}.tmp")
+            temporary.write_text(json.dumps(report, indent=2))
+            os.replace(temporary, path)
+        except OSError as exc:
+            logger.warning("Cannot write device startup profile %s: %s", path, exc)
+            return rows
+        logger.debug("Device startup profile written to %s", path)
+    return rows
+
+
+def _loader(yaml_device_file, main=True, reload=False):
     """
     Load our ophyd-style controls as described in a YAML file.
 
@@ -158,54 +407,523 @@ def _loader(yaml_device_file, main=True):
         YAML file describing ophyd-style controls to be created.
     main : bool
         If ``True`` add these devices to the ``__main__`` namespace.
+    reload : bool
+        If ``True`` only build the devices added or changed in the file.
 
+    RETURNS
+
+    The devices made from the file.
     """
     logger.debug("Devices file %r.", str(yaml_device_file))
+    # With MAKE_DEVICES.PROFILE, note the memory used by each device.
+    tracing = get_config_object().MAKE_DEVICES.PROFILE and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
     t0 = time.time()
-    _instr.load(yaml_device_file)
-    logger.info("Devices loaded in %.3f s.", time.time() - t0)
+    try:
+        if reload:
+            changes = _instr.reload(yaml_device_file)
+            devices = [device for _defn, made in _instr.made for device in made]
+            logger.info(
+                "Devices reloaded in %.3f s: %s",
+                time.time() - t0,
+                "; ".join(
+                    f"{action} {', '.join(keys)}"
+                    for action, keys in changes.items()
+                    if keys
+                )
+                or "no changes",
+            )
+        else:
+            devices = _instr.load(yaml_device_file)
+            logger.info("Devices loaded in %.3f s.", time.time() - t0)
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+    if len(_instr.build_times) > 0:
+        slowest = sorted(_instr.build_times.items(), key=lambda kv: -kv[1])[:5]
+        logger.debug(
+            "Slowest devices to build: %s",
+            ", ".join(f"{label} ({elapsed:.3f} s)" for label, elapsed in slowest),
+        )
 
     if main:
-        log_level = _get_make_devices_log_level()
+        # Only the devices just made, all in one step.
+        new = {device.name: device for device in devices if getattr(device, "name", "")}
+        vars(sys.modules[MAIN_NAMESPACE]).update(new)
+        _log_names("Added", list(new), "to")
 
-        main_namespace = sys.modules[MAIN_NAMESPACE]
-        for label in oregistry.device_names:
-            logger.log(log_level, "Adding ophyd device %r to main namespace", label)
-            setattr(main_namespace, label, oregistry[label])
+    return devices
+
+
+def _log_names(action: str, names: list[str], preposition: str):
+    """
+    (internal) Log a change to the __main__ namespace: one summary line.
+
+    With ``MAKE_DEVICES.VERBOSE`` (iconfig), also log each name.
+    """
+    log_level = _get_make_devices_log_level()
+    if get_config_object().MAKE_DEVICES.VERBOSE:
+        for name in names:
+            logger.log(
+                log_level, "%s %r %s %r", action, name, preposition, MAIN_NAMESPACE
+            )
+    if len(names) > 0:
+        logger.log(
+            log_level,
+            "%s %d devices %s %r.",
+            action,
+            len(names),
+            preposition,
+            MAIN_NAMESPACE,
+        )
 
 
 class Instrument(guarneri.Instrument):
-    """Custom YAML loader for guarneri."""
+    """
+    Custom YAML loader for guarneri.
+
+    With ``MAKE_DEVICES.WORKERS`` (iconfig) greater than 1, the devices of
+    a file are built in parallel, on a pool of that many threads.  The
+    devices are still registered (in ``oregistry``) in the order of the
+    YAML file.  The time to build each device is kept in ``build_times``.
+
+    With ``MAKE_DEVICES.LAZY`` (iconfig), devices are not built until first
+    used.  See ``LazyDevice``.
+
+    The specification of each device loaded is kept (in ``specs``) so that
+    ``reload()`` can change only the devices whose specifications changed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Also prepare the tables of build times and specifications."""
+        super().__init__(*args, **kwargs)
+        self.build_times: dict[str, float] = {}
+        """Seconds to build each device (by name), from the latest file."""
+        self.made: list[tuple[dict, list]] = []
+        """Each definition and the devices made from it, from the latest file."""
+        self.specs: dict[str, dict[str, tuple[dict, list]]] = {}
+        """By file: each device's key, its definition, and the devices made."""
+        self.profile: dict[str, dict] = {}
+        """By device name: time (and memory) to build, since forget()."""
+
+    def load(
+        self,
+        config_file: pathlib.Path | str,
+        *,
+        fake: bool = False,
+        device_classes: dict | None = None,
+        ignored_classes: list[str] | None = None,
+    ) -> list:
+        """
+        Load devices from a file.  Remember their specifications.
+
+        As guarneri's ``load()``, but the devices are registered (once)
+        by ``make_devices()``.  Returns the devices made from the file, in
+        order.
+        """
+        old_classes = self.device_classes
+        old_ignored = self.ignored_classes
+        defns = self.parse_config(pathlib.Path(config_file))
+        if device_classes is not None:
+            self.device_classes = device_classes
+        if ignored_classes is not None:
+            self.ignored_classes = ignored_classes
+        try:
+            devices = self.make_devices(defns, fake=fake)
+        finally:
+            self.device_classes = old_classes
+            self.ignored_classes = old_ignored
+
+        self.specs[_file_key(config_file)] = {
+            _spec_key(defn): (defn, devices) for defn, devices in self.made
+        }
+        self._list_unconnected(devices)
+        return [device for _defn, devices in self.made for device in devices]
+
+    def reload(self, config_file: pathlib.Path | str, *, fake: bool = False):
+        """
+        Load devices from a file again, changing only what has changed.
+
+        Compare the file's device definitions with those used before.  Remove
+        (and destroy) devices no longer defined, build the devices that are
+        new, and rebuild those defined differently.  Other devices are kept,
+        as they are (still registered and connected).
+
+        Returns a dictionary of the keys (usually, the device names):
+        ``{"added": [...], "changed": [...], "removed": [...]}``.
+        """
+        file_key = _file_key(config_file)
+        if file_key not in self.specs:
+            self.load(config_file, fake=fake)
+            return {"added": list(self.specs[file_key]), "changed": [], "removed": []}
+
+        old = self.specs[file_key]
+        new = {
+            _spec_key(defn): defn
+            for defn in self.parse_config(pathlib.Path(config_file))
+        }
+        added = [key for key in new if key not in old]
+        changed = [key for key in new if key in old and old[key][0] != new[key]]
+        removed = [key for key in old if key not in new]
+        unchanged = [key for key in new if key in old and key not in changed]
+
+        for key in removed + changed:
+            for device in old[key][1]:
+                self._remove(device)
+        devices = self.make_devices([new[key] for key in added + changed], fake)
+
+        made = {_spec_key(defn): (defn, devices) for defn, devices in self.made}
+        self.specs[file_key] = {
+            key: old[key] if key in unchanged else made.get(key, (defn, []))
+            for key, defn in new.items()
+        }
+        self._list_unconnected(devices)
+        return {"added": added, "changed": changed, "removed": removed}
+
+    def _list_unconnected(self, devices):
+        """
+        (internal) List the current devices not known to be connected.
+
+        These are the new 'devices' and those listed before, once each, in
+        the order loaded.  Devices removed (or replaced) are not listed.
+        """
+        listed = {id(device) for device in [*self.unconnected_devices, *devices]}
+        unconnected = []
+        for specs in self.specs.values():
+            for _defn, made in specs.values():
+                for device in made:
+                    if id(device) in listed:
+                        listed.remove(id(device))  # Once.
+                        unconnected.append(device)
+        self.unconnected_devices[:] = unconnected
+
+    def forget(self):
+        """Forget all devices loaded (such as after ``oregistry.clear()``)."""
+        self.specs.clear()
+        self.unconnected_devices.clear()
+        self.profile.clear()
+
+    def _remove(self, device):
+        """(internal) Unregister, remove from __main__, and destroy a device."""
+        built = device._device if isinstance(device, LazyDevice) else device
+        registry = self.devices
+        for obj in (device, built):
+            if obj is not None and obj in registry.findall(
+                name=obj.name, allow_none=True
+            ):
+                registry.pop(obj)
+
+        main_namespace = sys.modules[MAIN_NAMESPACE]
+        if getattr(main_namespace, device.name, None) in (device, built):
+            delattr(main_namespace, device.name)
+        if device in self.unconnected_devices:
+            self.unconnected_devices.remove(device)
+        if built is not None and hasattr(built, "destroy"):
+            built.destroy()  # Disconnect from EPICS.
+        logger.debug("Removed device %r.", device.name)
+
+    def make_device(self, Klass, args, kwargs, fake):
+        """Create a device from its parameters.  Note the time it took."""
+        tracing = tracemalloc.is_tracing()
+        memory = tracemalloc.get_traced_memory()[0] if tracing else 0
+        t0 = time.time()
+        result = super().make_device(Klass, args, kwargs, fake)
+        if inspect.isgenerator(result):
+            result = list(result)  # A factory builds its devices now.
+        elapsed = time.time() - t0
+        memory = tracemalloc.get_traced_memory()[0] - memory if tracing else None
+        label = kwargs.get("name") or getattr(Klass, "__name__", str(Klass))
+        self.build_times[label] = elapsed
+        logger.debug("Built %r in %.3f s.", label, elapsed)
+
+        # A factory's devices share its time and memory.
+        devices = result if isinstance(result, list) else [result]
+        creator = f"{Klass.__module__}.{getattr(Klass, '__qualname__', label)}"
+        for device in devices:
+            self.profile[getattr(device, "name", label)] = {
+                "device": device,
+                "creator": creator,
+                "build_s": elapsed / len(devices),
+                "built": time.monotonic(),
+                "memory_bytes": None if memory is None else memory // len(devices),
+            }
+        return result
+
+    def make_devices(self, defns, fake):
+        """
+        Create Device instances based on device definitions.
+
+        Build serially (as guarneri does) or, with ``MAKE_DEVICES.WORKERS``
+        greater than 1, on a thread pool.  With ``MAKE_DEVICES.LAZY``,
+        return a ``LazyDevice`` in place of each device class (with a
+        ``name``) and build it when it is first used.  Either way, the
+        devices are registered, and returned in the order of the definitions.
+        """
+        self.build_times = {}
+        self.made = []
+        config = get_config_object().MAKE_DEVICES
+
+        jobs = []
+        for defn in defns:
+            if defn["device_class"] in self.ignored_classes:
+                continue
+            try:
+                Klass = self.device_classes[defn["device_class"]]
+            except KeyError as exc:
+                warnings.warn(f"Unknown device class: {exc}", stacklevel=2)
+                continue
+            # Validate all the definitions before building any device.
+            self.validate_params(defn["kwargs"], Klass)
+            jobs.append((Klass, defn.get("args", ()), defn.get("kwargs", {})))
+            self.made.append((copy.deepcopy(defn), []))
+
+        results = [None] * len(jobs)
+        eager = []  # Indices of the jobs to build now.
+        for i, (Klass, args, kwargs) in enumerate(jobs):
+            # Factories (functions) might make any number of devices.
+            if config.LAZY and isinstance(Klass, type) and kwargs.get("name"):
+                results[i] = LazyDevice(self, Klass, args, kwargs, fake)
+                self.devices.register(results[i])
+            else:
+                eager.append(i)
+        built = self._build([jobs[i] for i in eager], fake, config.WORKERS)
+        for i, result in zip(eager, built, strict=True):
+            results[i] = result
+
+        devices = []
+        for (_defn, made), device in zip(self.made, results, strict=True):
+            try:
+                # Maybe its a list of devices?
+                made.extend(device)
+            except TypeError:
+                # No, assume it's just a single device then
+                made.append(device)
+            devices.extend(made)
+        return devices
+
+    def _build(self, jobs, fake, workers):
+        """
+        (internal) Build each job, in parallel if more than 1 worker.
+
+        Registration of the objects a job creates is deferred (on the
+        thread building it) until the job is finished.  Then its devices
+        are registered, in order, with their components.  Built in
+        parallel, the jobs are registered in order after all are finished.
+        Other threads are not affected.
+        """
+        deferred = getattr(self.devices, "deferred", contextlib.nullcontext)
+
+        def build(job):
+            with deferred() as created:
+                result = self.make_device(*job, fake)
+            return result, created or ()
+
+        def register(result, created):
+            devices = result if isinstance(result, list) else [result]
+            if hasattr(self.devices, "register_created"):
+                self.devices.register_created(devices, created)
+            else:  # Such as guarneri's Registry.
+                for device in devices:
+                    self.devices.register(device)
+            return result
+
+        if workers <= 1 or len(jobs) <= 1:
+            return [register(*build(job)) for job in jobs]
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="make_devices",
+            initializer=_use_initial_ca_context,
+        ) as pool:
+            futures = [pool.submit(build, job) for job in jobs]
+            built = [future.result() for future in futures]
+        return [register(*item) for item in built]
+
+    def materialize_all(self) -> list:
+        """Build each ``LazyDevice`` not built yet.  Return the new devices."""
+        proxies = [
+            device
+            for device in self.unconnected_devices
+            if isinstance(device, LazyDevice) and not device.is_built
+        ]
+        return [proxy.materialize() for proxy in proxies]
 
     def parse_yaml_file(self, config_file: pathlib.Path | str) -> list[dict]:
-        """Read device configurations from YAML format file."""
+        """
+        Read device configurations from YAML format file.
+
+        With ``MAKE_DEVICES.MANIFEST`` (iconfig), use the definitions from
+        the device manifest, unless the file has changed since.
+        """
         if isinstance(config_file, str):
             config_file = pathlib.Path(config_file)
 
-        def parser(creator, specs):
+        manifest_file = _manifest_file()
+        if manifest_file is not None:
+            found = manifest_entries(manifest_file, config_file)
+            if found is not None:
+                devices, creators = found
+                for creator, path in creators.items():
+                    if creator not in self.device_classes:
+                        self.device_classes[creator] = resolve_creator(path)
+                logger.debug("Device definitions of %s from manifest.", config_file)
+                return devices
+
+        devices = read_definitions(config_file)
+        for device in devices:
+            creator = device["device_class"]
             if creator not in self.device_classes:
                 self.device_classes[creator] = dynamic_import(creator)
-            entries = [
-                {
-                    "device_class": creator,
-                    "args": (),  # ALL specs are kwargs!
-                    "kwargs": table,
-                }
-                for table in specs
-            ]
-            return entries
-
-        with open(config_file, "r") as f:
-            config_data = load_config_yaml(f)
-
-            devices = [
-                device
-                # parse the file using already loaded config data
-                for k, v in config_data.items()
-                # each support type (class, factory, function, ...)
-                for device in parser(k, v)
-            ]
         return devices
 
 
+def _manifest_file() -> pathlib.Path | None:
+    """(internal) The device manifest file, if iconfig names one."""
+    manifest = get_config_object().MAKE_DEVICES.MANIFEST
+    if manifest is None:
+        return None
+    path = pathlib.Path(manifest)
+    if not path.is_absolute():
+        configs_path = pathlib.Path(get_config().get("INSTRUMENT_PATH", "."))
+        path = configs_path / path
+    return path
+
+
+class LazyDevice:
+    """
+    Stand-in for a device, built (and connected) when first used.
+
+    With ``MAKE_DEVICES.LAZY`` (iconfig), ``make_devices()`` puts one of
+    these into ``oregistry`` and the ``__main__`` namespace for each device
+    class in the YAML file.  The first access to any (public) attribute of
+    the device, such as ``sim_det.read()`` or its use in a plan, builds the
+    real device.  The real device then replaces this stand-in in
+    ``oregistry`` and ``__main__``.  References to the stand-in (held, for
+    example, in a plan) use the real device.
+
+    Call ``materialize_all()`` to build all the devices now, such as for
+    the queueserver.
+    """
+
+    __slots__ = (
+        "name",
+        "_ophyd_labels_",
+        "_instrument",
+        "_job",
+        "_fake",
+        "_device",
+        "_lock",
+    )
+
+    parent = None  # Always a root device.
+
+    def __init__(self, instrument, Klass, args, kwargs, fake):
+        """Remember how to build the device."""
+        object.__setattr__(self, "name", kwargs["name"])
+        object.__setattr__(self, "_ophyd_labels_", set(kwargs.get("labels", [])))
+        object.__setattr__(self, "_instrument", instrument)
+        object.__setattr__(self, "_job", (Klass, args, kwargs))
+        object.__setattr__(self, "_fake", fake)
+        object.__setattr__(self, "_device", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def is_built(self) -> bool:
+        """Has the real device been built?"""
+        return self._device is not None
+
+    def materialize(self):
+        """Build (and connect) the real device, once.  Return it."""
+        with self._lock:
+            if self._device is None:
+                object.__setattr__(self, "_device", self._make())
+        return self._device
+
+    def _make(self):
+        """(internal) Build the device and replace this stand-in with it."""
+        registry = self._instrument.devices
+        if self in registry.findall(name=self.name, allow_none=True):
+            registry.pop(self)
+        device = self._instrument.make_device(*self._job, self._fake)
+        registry.register(device)
+
+        main_namespace = sys.modules[MAIN_NAMESPACE]
+        if getattr(main_namespace, self.name, None) is self:
+            setattr(main_namespace, self.name, device)
+
+        if hasattr(device, "wait_for_connection"):
+            timeout = get_config_object().OPHYD.TIMEOUTS.PV_CONNECTION
+            try:
+                device.wait_for_connection(timeout=timeout)
+            except TimeoutError:
+                pvs = unconnected_pvs([device]).get(self.name, [])
+                logger.warning(
+                    "Device %r not connected.  Missing PVs: %s",
+                    self.name,
+                    ", ".join(pvs) or "(unknown)",
+                )
+        return device
+
+    def __getattr__(self, attr):
+        """Build the device on first use.  Then, use the device."""
+        if self._device is None and (attr.startswith("_") or attr == "children"):
+            # Do not build for introspection (such as by oregistry).
+            raise AttributeError(attr)
+        return getattr(self.materialize(), attr)
+
+    def __setattr__(self, attr, value):
+        """Set attributes of the device (build it first)."""
+        setattr(self.materialize(), attr, value)
+
+    def __dir__(self):
+        """Attributes of the device (build it first)."""
+        return dir(self.materialize())
+
+    def __repr__(self):
+        """Describe the device or, if not yet built, how it will be built."""
+        if self._device is not None:
+            return repr(self._device)
+        Klass = self._job[0]
+        return (
+            f"<{type(self).__name__} {self.name!r}:"
+            f" {Klass.__module__}.{Klass.__qualname__}, not built>"
+        )
+
+
+def _file_key(config_file: pathlib.Path | str) -> str:
+    """(internal) Identify a devices file."""
+    return str(pathlib.Path(config_file).resolve())
+
+
+def _spec_key(defn: dict) -> str:
+    """(internal) Identify a device definition: its name, if it has one."""
+    kwargs = defn.get("kwargs", {})
+    if kwargs.get("name"):
+        return kwargs["name"]
+    return (
+        f"{defn['device_class']}({', '.join(f'{k}={v!r}' for k, v in kwargs.items())})"
+    )
+
+
+def materialize_all() -> list:
+    """
+    Build each device still waiting (``MAKE_DEVICES.LAZY``) to be built.
+
+    Call this when all devices are needed now, such as before the
+    queueserver reports its list of devices.  Returns the devices built.
+    """
+    return _instr.materialize_all()
+
+
 _instr = Instrument({}, registry=oregistry)  # singleton
+
+
+def _use_initial_ca_context():
+    """(internal) Worker threads share the main EPICS CA (PyEpics) context."""
+    try:
+        import epics
+    except ImportError:
+        return
+    epics.ca.use_initial_context()
@@ -4,6 +4,7 @@ RunEngine Metadata
 
 .. autosummary::
     ~get_md_path
+    ~make_md_storage
     ~re_metadata
 """
 
@@ -33,7 +34,10 @@ logger = logging.getLogger(__name__)
 logger.bsdev(__file__)
 
 
+DEFAULT_MD_BACKEND = "StoredDict"
 DEFAULT_MD_PATH = pathlib.Path.home() / ".config" / "Bluesky_RunEngine_md"
+MD_BACKENDS = ("StoredDict", "SQLiteDict", "dict", "PersistentDict")
+"""Choices for the RE.md storage, iconfig: ``RUN_ENGINE.MD_BACKEND``."""
 HOSTNAME = socket.gethostname() or "localhost"
 USERNAME = getpass.getuser() or "Bluesky user"
 VERSIONS = dict(
@@ -62,7 +66,10 @@ def get_md_path(iconfig=None):
     support         path
     ==============  ==============================================
     PersistentDict  Directory where dictionary keys are stored in separate files.
+    SQLiteDict      SQLite database file, one row per dictionary key.
+                    (A YAML name, such as the default, gets ``.sqlite``.)
     StoredDict      File where dictionary is stored as YAML.
+    dict            (not used: dictionary is kept only in memory)
     ==============  ==============================================
 
     In either case, the 'path' can be relative or absolute.  Relative
@@ -76,6 +83,54 @@ def get_md_path(iconfig=None):
     return str(path)
 
 
+def make_md_storage(iconfig=None, md_path=None):
+    """
+    Create the storage for the RE.md dictionary, as chosen in iconfig.
+
+    The ``RUN_ENGINE.MD_BACKEND`` key selects one of ``MD_BACKENDS``
+    (default: ``"StoredDict"``).  See ``get_md_path()`` for ``md_path``.
+    The ``RUN_ENGINE.MD_JOURNAL``, ``RUN_ENGINE.MD_DURABILITY``,
+    ``RUN_ENGINE.MD_LOAD_CACHE``, ``RUN_ENGINE.MD_SHARED``, and
+    ``RUN_ENGINE.MD_HISTORY`` keys apply
+    as supported by the backend.
+
+    Raises:
+        ValueError: If the backend is not recognized.
+    """
+    from apsbits.utils.sqlite_dict import SQLiteDict
+    from apsbits.utils.stored_dict import DEFAULT_DURABILITY
+    from apsbits.utils.stored_dict import StoredDict
+
+    RE_CONFIG = (iconfig or {}).get("RUN_ENGINE", {})
+    backend = RE_CONFIG.get("MD_BACKEND", DEFAULT_MD_BACKEND)
+    durability = RE_CONFIG.get("MD_DURABILITY", DEFAULT_DURABILITY)
+    if md_path is None:
+        md_path = get_md_path(iconfig)
+    logger.debug("Selected %r to store 'RE.md' dictionary in %s.", backend, md_path)
+
+    if backend == "StoredDict":
+        return StoredDict(
+            md_path,
+            journal=RE_CONFIG.get("MD_JOURNAL", False),
+            durability=durability,
+            load_cache=RE_CONFIG.get("MD_LOAD_CACHE", False),
+            shared=RE_CONFIG.get("MD_SHARED", False),
+            history=RE_CONFIG.get("MD_HISTORY", 0),
+        )
+    if backend == "SQLiteDict":
+        path = pathlib.Path(md_path)
+        if path.suffix.lower() in (".yml", ".yaml"):
+            # Not the StoredDict's YAML file (such as the default MD_PATH).
+            path = path.with_suffix(".sqlite")
+            logger.info("SQLiteDict stores 'RE.md' in %s.", path)
+        return SQLiteDict(path, durability=durability)
+    if backend == "dict":
+        return {}
+    if backend == "PersistentDict":
+        return bluesky.utils.PersistentDict(md_path)
+    raise ValueError(f"Unknown MD_BACKEND {backend!r}.  Use one of {MD_BACKENDS}.")
+
+
 def re_metadata(iconfig=None, cat=None):
     """Programmatic metadata for the RunEngine."""
     md = {
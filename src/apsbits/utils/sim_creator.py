@@ -10,16 +10,37 @@ Device factories are used to:
 * *Import* a device which is pre-defined in a module, such as the
   ophyd simulators in ``ophyd.sim``.
 
+* *Simulate* detectors which produce 1-D or 2-D NumPy frames at a chosen
+  rate, to test the RunEngine, callbacks, and catalog at high data rates.
+
 .. autosummary::
 
     ~factory_base
+    ~factory_specs
+    ~frame_detectors
+    ~frame_detectors_specs
     ~motors
+    ~motors_specs
+    ~parse_numbers
     ~predefined_device
+    ~SimFrameDetector
 """
 
+import collections
+import functools
+import heapq
+import itertools
 import logging
+import re
+import threading
+import time
 
+import numpy as np
 from apstools.utils import dynamic_import
+from ophyd import Component
+from ophyd import Device
+from ophyd import Signal
+from ophyd.status import DeviceStatus
 
 from apsbits.utils.controls_setup import oregistry
 
@@ -63,6 +84,7 @@ def factory_base(
     names="object{}",
     first=0,
     last=0,
+    numbers=None,
     creator="ophyd.Signal",
     **kwargs,
 ):
@@ -91,6 +113,11 @@ def factory_base(
         The first object number in the continuous series from 'first' through
         'last' (inclusive).
 
+    numbers : str or [int, ...]
+        Instead of 'first' and 'last', the object numbers as a list of
+        ranges, such as ``"1-4,7-22,30-199"`` (inclusive), or as a list of
+        numbers and ranges, such as ``[1, 2, "7-22"]``.
+
     creator : str
         Name of the *creator* code that will be used to construct each device.
         (default: ``"ophyd.Signal"``)
@@ -98,23 +125,125 @@ def factory_base(
     kwargs : dict
         Dictionary of additional keyword arguments.  This is included
         when creating each object.
+
+    All the objects are created, then registered (in ``oregistry``, with
+    their components) in order.  Meanwhile, registration is deferred on
+    this thread only.  (See ``DeferringRegistry``.)
+    """
+    creator, specs = factory_specs(
+        prefix=prefix,
+        names=names,
+        first=first,
+        last=last,
+        numbers=numbers,
+        creator=creator,
+        **kwargs,
+    )
+    klass = _creator_class(creator)
+
+    with oregistry.deferred() as created:
+        devices = [klass(**keywords) for keywords in specs]
+    oregistry.register_created(devices, created)
+    logger.debug(
+        "Made %d %s objects: %s",
+        len(devices),
+        creator,
+        ", ".join(device.name for device in devices),
+    )
+    yield from devices
+
+
+def factory_specs(
+    *,
+    prefix=None,
+    names="object{}",
+    first=0,
+    last=0,
+    numbers=None,
+    creator="ophyd.Signal",
+    **kwargs,
+):
+    """
+    Keyword arguments of each object 'factory_base()' would make.
+
+    Same parameters as 'factory_base()'.  Nothing is imported or created.
+
+    RETURNS
+
+    (creator, [keywords, ...]) : tuple
+        The name of the *creator* and a list with the keyword arguments
+        for each object, in order.
     """
     if "{" not in names:
         names += "{}"
     if prefix is not None and "{" not in prefix:
         prefix += "{}"
 
-    klass = dynamic_import(creator)
+    if numbers is None:
+        first, last = sorted([first, last])
+        numbers = range(first, 1 + last)
+    elif first != 0 or last != 0:
+        raise ValueError("Use either 'numbers' or 'first' and 'last', not both.")
+    else:
+        numbers = parse_numbers(numbers)
 
-    first, last = sorted([first, last])
-    for i in range(first, 1 + last):
+    specs = []
+    for i in numbers:
         keywords = {"name": names.format(i)}
         if prefix is not None:
             keywords["prefix"] = prefix.format(i)
         keywords.update(kwargs)
-        device = klass(**keywords)
-        logger.debug(device)
-        yield device
+        specs.append(keywords)
+    return creator, specs
+
+
+_RANGE_PATTERN = re.compile(r"^\s*(\d+)\s*(?:-\s*(\d+)\s*)?$")
+"""(internal) A number (such as ``7``) or a range (such as ``7-22``)."""
+
+
+def parse_numbers(numbers):
+    """
+    Object numbers from a list of ranges, such as ``"1-4,7-22,30-199"``.
+
+    PARAMETERS
+
+    numbers : str, int, or [str or int, ...]
+        Comma-separated numbers and (inclusive) ranges of numbers, or a
+        list of them.  A range may be descending (``"9-7"``), as with
+        'first' and 'last'.
+
+    RETURNS
+
+    [int, ...] : list
+        The numbers, in the order given.
+
+    Raises ``ValueError`` for text that is not a number or range, for no
+    numbers, or for a number given more than once.
+    """
+    items = numbers if isinstance(numbers, (list, tuple)) else [numbers]
+    result = []
+    for item in items:
+        if isinstance(item, int):
+            result.append(item)
+            continue
+        for part in str(item).split(","):
+            match = _RANGE_PATTERN.match(part)
+            if match is None:
+                raise ValueError(f"Not a number or range: {part!r} in {numbers!r}.")
+            first, last = sorted(int(n) for n in match.groups(match.group(1)))
+            result.extend(range(first, 1 + last))
+    if len(result) == 0:
+        raise ValueError(f"No numbers in {numbers!r}.")
+    repeated = sorted(i for i, n in collections.Counter(result).items() if n > 1)
+    if len(repeated) > 0:
+        raise ValueError(f"Numbers given more than once: {repeated}.")
+    return result
+
+
+@functools.cache
+def _creator_class(creator):
+    """(internal) Import the 'creator' (by name) once."""
+    return dynamic_import(creator)
 
 
 def motors(
@@ -123,6 +252,7 @@ def motors(
     names="m{}",
     first=0,
     last=0,
+    numbers=None,
     **kwargs,
 ):
     """
@@ -137,6 +267,8 @@ def motors(
           - {prefix: "ioc:m", first: 1, last: 4, labels: ["motor"]}
           # skip m5 & m6
           - {prefix: "ioc:m", first: 7, last: 22, labels: ["motor"]}
+          # or, in one entry
+          - {prefix: "ioc:m", numbers: "1-4,7-22", labels: ["motor"]}
 
     Uses this pattern:
 
@@ -149,7 +281,8 @@ def motors(
                 **kwargs,
             )
 
-    where ``i`` iterates from 'first' through 'last' (inclusive).
+    where ``i`` iterates from 'first' through 'last' (inclusive), or through
+    'numbers'.
 
     PARAMETERS
 
@@ -179,24 +312,306 @@ def motors(
         The first motor number in the continuous series from 'first' through
         'last' (inclusive).
 
+    numbers : str or [int, ...]
+        Instead of 'first' and 'last', the motor numbers as a list of
+        ranges, such as ``"1-4,7-22,30-199"``.  (See 'parse_numbers()'.)
+
     kwargs : dict
         Dictionary of additional keyword arguments.  This is included
         with each EpicsMotor object.
     """
+    kwargs = _motors_kwargs(
+        prefix=prefix, names=names, first=first, last=last, numbers=numbers, **kwargs
+    )
+    for motor in factory_base(**kwargs):
+        yield motor
+
+
+def motors_specs(**kwargs):
+    """
+    Keyword arguments of each motor 'motors()' would make.
+
+    Same parameters as 'motors()'.  Nothing is imported or created.
+    Returns ``(creator, [keywords, ...])``, as 'factory_specs()'.
+    """
+    return factory_specs(**_motors_kwargs(**kwargs))
+
+
+def _motors_kwargs(
+    *, prefix=None, names="m{}", first=0, last=0, numbers=None, **kwargs
+):
+    """(internal) The 'factory_base()' keyword arguments for 'motors()'."""
     if prefix is None:
         raise ValueError("Must define a string value for 'prefix'.")
 
-    kwargs["names"] = names or "m{}"
-    kwargs["prefix"] = prefix
     kwargs.update(
         {
             "prefix": prefix,
             "names": names or "m{}",
             "first": first,
             "last": last,
+            "numbers": numbers,
             "creator": "ophyd.EpicsMotor",
         }
     )
+    return kwargs
 
-    for motor in factory_base(**kwargs):
-        yield motor
+
+class _Pacer:
+    """
+    (internal) Call functions when they are due, all on one thread.
+
+    The (daemon) thread is started when first needed, and again if it is
+    gone (such as in a forked process).  Functions are called in the order
+    of their due times (``time.monotonic()``).
+    """
+
+    def __init__(self, name):
+        """Prepare the queue.  No thread yet."""
+        self.name = name
+        self._condition = threading.Condition()
+        self._queue = []  # heap of (due, sequence, function)
+        self._sequence = itertools.count()
+        self._thread = None
+
+    def call_at(self, due, function):
+        """Call 'function()' (on the pacing thread) when 'due'."""
+        with self._condition:
+            heapq.heappush(self._queue, (due, next(self._sequence), function))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        """(internal) Wait for the next function due, then call it."""
+        while True:
+            with self._condition:
+                while True:
+                    delay = (
+                        self._queue[0][0] - time.monotonic() if self._queue else None
+                    )
+                    if delay is not None and delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                _due, _sequence, function = heapq.heappop(self._queue)
+            try:
+                function()
+            except Exception:
+                logger.exception("Paced function %r failed.", function)
+
+
+_pacer = _Pacer("SimFrameDetector pacer")
+"""(internal) Completes the paced frames of all SimFrameDetectors."""
+
+
+class SimFrameDetector(Device):
+    """
+    Simulated detector: each trigger produces a new NumPy frame.
+
+    Each frame is a peak (Gaussian, at the center) above a background, plus
+    noise.  Frames are written into a ring of 'buffers' preallocated arrays
+    and the noise is taken from a precomputed block, so no memory is
+    allocated and no random numbers are drawn per frame.  The ``total``
+    (sum of the frame) is computed from precomputed sums.
+
+    Since the buffers are reused, a frame read from ``image`` is
+    overwritten 'buffers' triggers later.  The RunEngine's event documents
+    hold the frame itself (not a copy).  So a callback which keeps a
+    frame, or handles it later (such as a threaded or queued writer, live
+    plotting, or a publisher), must copy it first.  Or, use enough
+    'buffers' to cover that delay.
+
+    Example entry in `devices.yml` file:
+
+    .. code-block:: yaml
+        :linenos:
+
+        apsbits.utils.sim_creator.SimFrameDetector:
+          - {name: frames, shape: [512, 512], dtype: uint16, rate: 100}
+
+    PARAMETERS
+
+    shape : int or [int, ...]
+        Shape of each frame: 1-D (``[2048]``) or 2-D (``[512, 512]``).
+        (default: ``[1024]``)
+
+    dtype : str
+        NumPy data type of the frames, such as ``"uint16"``.  With an
+        integer type, 'peak' + 'background' + 'noise' should fit.
+        (default: ``"float64"``)
+
+    rate : float
+        Most frames per second.  A trigger completes when its frame is due.
+        ``0`` is as fast as possible.  (default: ``0``)
+
+    peak, background, noise : float
+        Height of the peak, level of the background, and range of the
+        (uniform) noise.  (defaults: ``1000``, ``10``, ``10``)
+
+    buffers : int
+        Number of preallocated frames, reused in turn.  (default: ``4``)
+
+    seed : int
+        Seed for the noise.  (default: ``None``)
+    """
+
+    image = Component(Signal, value=np.zeros(0), kind="normal")
+    total = Component(Signal, value=0.0, kind="hinted")
+    rate = Component(Signal, value=0.0, kind="config")
+
+    _noise_span = 4096  # offsets into the noise block
+
+    def __init__(
+        self,
+        prefix="",
+        *,
+        shape=(1024,),
+        dtype="float64",
+        rate=0,
+        peak=1000.0,
+        background=10.0,
+        noise=10.0,
+        buffers=4,
+        seed=None,
+        **kwargs,
+    ):
+        """Compute the peak, noise, and buffers of the frames, once."""
+        super().__init__(prefix, **kwargs)
+        shape = tuple(np.atleast_1d(shape).astype(int).tolist())
+        if len(shape) not in (1, 2) or min(shape) < 1:
+            raise ValueError(f"Frame shape must be 1-D or 2-D, received {shape}.")
+        if buffers < 1:
+            raise ValueError(f"Must have at least one buffer, received {buffers}.")
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.rate.put(float(rate))
+
+        rng = np.random.default_rng(seed)
+        size = int(np.prod(shape))
+        r2 = sum(
+            ((axis - (n - 1) / 2) / max(n / 8, 1)) ** 2
+            for axis, n in zip(np.indices(shape), shape, strict=True)
+        )
+        self._base = (peak * np.exp(-r2 / 2) + background).astype(self.dtype).ravel()
+        self._noise = (rng.random(size + self._noise_span) * noise).astype(self.dtype)
+        self._noise_sums = np.concatenate(([0], np.cumsum(self._noise, dtype=float)))
+        self._base_sum = float(self._base.sum(dtype=float))
+        self._buffers = [np.empty(shape, dtype=self.dtype) for _ in range(buffers)]
+
+        self._frames = 0
+        self._due = 0.0  # time.monotonic() when the next frame is due
+        self.image.put(self._buffers[-1])
+
+    def stage(self):
+        """Start pacing the frames from now."""
+        self._due = 0.0
+        return super().stage()
+
+    def _next_frame(self):
+        """(internal) Write the next frame into the next buffer: return both."""
+        frame = self._buffers[self._frames % len(self._buffers)]
+        size = frame.size
+        offset = (self._frames * 977) % self._noise_span
+        np.add(self._base, self._noise[offset : offset + size], out=frame.ravel())
+        total = (
+            self._base_sum + self._noise_sums[offset + size] - self._noise_sums[offset]
+        )
+        self._frames += 1
+        return frame, total
+
+    def trigger(self):
+        """Make the next frame, complete when it is due (at 'rate')."""
+        status = DeviceStatus(device=self)
+        now = time.monotonic()
+        due = max(now, self._due)
+        rate = self.rate.get()
+        self._due = due + (1 / rate if rate > 0 else 0)
+
+        frame, total = self._next_frame()
+
+        def finish():
+            self.image.put(frame)
+            self.total.put(total)
+            status.set_finished()
+
+        if due > now:
+            _pacer.call_at(due, finish)
+        else:
+            finish()
+        return status
+
+
+def frame_detectors(
+    *,
+    names="fdet{}",
+    first=0,
+    last=0,
+    numbers=None,
+    **kwargs,
+):
+    """
+    Make one or more '``SimFrameDetector``' objects.
+
+    Example entry in `devices.yml` file:
+
+    .. code-block:: yaml
+        :linenos:
+
+        apsbits.utils.sim_creator.frame_detectors:
+          - {first: 1, last: 4, shape: [2048], rate: 1000, labels: ["detectors"]}
+          - {names: "cam{}", first: 1, last: 1, shape: [1024, 1024], dtype: uint16}
+
+    PARAMETERS
+
+    names : str
+        Name *pattern* for the detectors.  The default pattern is
+        ``"fdet{}"``.  (See 'factory_base()'.)
+
+    first : int
+        The first detector number in the continuous series from 'first'
+        through 'last' (inclusive).
+
+    last : int
+        The last detector number in the continuous series from 'first'
+        through 'last' (inclusive).
+
+    numbers : str or [int, ...]
+        Instead of 'first' and 'last', the detector numbers as a list of
+        ranges, such as ``"1-4,9"``.  (See 'parse_numbers()'.)
+
+    kwargs : dict
+        Dictionary of additional keyword arguments (such as 'shape',
+        'dtype', and 'rate').  This is included with each detector.
+    """
+    kwargs = _frame_detectors_kwargs(
+        names=names, first=first, last=last, numbers=numbers, **kwargs
+    )
+    for detector in factory_base(**kwargs):
+        yield detector
+
+
+def frame_detectors_specs(**kwargs):
+    """
+    Keyword arguments of each detector 'frame_detectors()' would make.
+
+    Same parameters as 'frame_detectors()'.  Nothing is imported or created.
+    Returns ``(creator, [keywords, ...])``, as 'factory_specs()'.
+    """
+    return factory_specs(**_frame_detectors_kwargs(**kwargs))
+
+
+def _frame_detectors_kwargs(*, names="fdet{}", first=0, last=0, numbers=None, **kwargs):
+    """(internal) The 'factory_base()' keyword arguments for 'frame_detectors()'."""
+    kwargs.update(
+        {
+            "names": names or "fdet{}",
+            "first": first,
+            "last": last,
+            "numbers": numbers,
+            "creator": "apsbits.utils.sim_creator.SimFrameDetector",
+        }
+    )
+    return kwargs
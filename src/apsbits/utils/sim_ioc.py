@@ -0,0 +1,323 @@
+"""
+Simulated IOC
+=============
+
+Serve the PVs of an instrument's devices from a local caproto IOC.
+
+Without a beamline IOC, the EPICS Channel Access path of ``make_devices()``
+(searching for and connecting the PVs of each device) cannot be tested.
+``device_pvs()`` builds each device defined in the devices files (named in
+iconfig ``DEVICES_FILES`` and ``APS_DEVICES_FILES``), with a control layer
+which only records the PVs each signal would connect (nothing connects).
+``make_pvdb()`` makes a caproto channel for each of these PVs and
+``run_ioc()`` serves them, on this host only.
+
+``bits-sim-ioc benchmark`` uses them to compare the time to connect the
+devices with each ``OPHYD.CONTROL_LAYER`` (``PyEpics`` and ``caproto``).
+
+A device which reads its PVs while it is built (such as ``ScalerCH``)
+cannot be built this way.  It is logged (as a warning) and only the PVs it
+used until then are served.
+
+.. autosummary::
+    ~build_devices
+    ~ca_environment
+    ~device_pvs
+    ~make_pvdb
+    ~measure_connections
+    ~run_ioc
+"""
+
+import contextlib
+import logging
+import os
+import pathlib
+import threading
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import ophyd
+
+from apsbits.utils.controls_setup import device_signals
+from apsbits.utils.controls_setup import oregistry
+from apsbits.utils.controls_setup import pv_names
+from apsbits.utils.controls_setup import unconnected_pvs
+from apsbits.utils.make_devices import Instrument
+
+logger = logging.getLogger(__name__)
+logger.bsdev(__file__)
+
+LOCALHOST = "127.0.0.1"
+"""The simulated IOC serves (and is searched for) on this interface only."""
+
+DEFAULT_PORT = 5094
+"""
+Default Channel Access server port of the simulated IOC.
+
+Not the usual port (5064), so that clients must choose the simulated IOC.
+"""
+
+_INITIAL_VALUES = {".DMOV": 1}
+"""(internal) Initial values of PVs (by suffix) which are not zero."""
+
+
+def ca_environment(port: int = DEFAULT_PORT) -> Dict[str, str]:
+    """
+    EPICS environment variables for clients of the simulated IOC.
+
+    Set these (before the first PV is connected) so that the control
+    layer searches only the simulated IOC.
+    """
+    return {
+        "EPICS_CA_ADDR_LIST": LOCALHOST,
+        "EPICS_CA_AUTO_ADDR_LIST": "NO",
+        "EPICS_CA_SERVER_PORT": str(port),
+    }
+
+
+def build_devices(device_files: List[pathlib.Path | str]) -> List[Any]:
+    """
+    Build the devices defined in these devices files, as ``make_devices()``.
+
+    The devices are not added to the console namespace.  A device which
+    cannot be built is logged (as a warning) and skipped.
+
+    Args:
+        device_files: The devices (YAML) files.
+
+    Returns:
+        The devices, in the order of their definitions.
+    """
+    instrument = Instrument({})
+    devices = []
+    for config_file in device_files:
+        for defn in instrument.parse_yaml_file(config_file):
+            creator = instrument.device_classes[defn["device_class"]]
+            try:
+                result = instrument.make_device(
+                    creator, defn["args"], defn["kwargs"], False
+                )
+            except Exception as exc:
+                logger.warning(
+                    "Cannot build %s(%s): %s", defn["device_class"], defn["kwargs"], exc
+                )
+                continue
+            devices.extend(result if isinstance(result, list) else [result])
+    return devices
+
+
+def device_pvs(device_files: List[pathlib.Path | str]) -> Dict[str, Dict[str, Any]]:
+    """
+    The EPICS PVs the devices of these devices files would connect.
+
+    Args:
+        device_files: The devices (YAML) files.
+
+    Returns:
+        By PV name (in the order first used): ``{"string": bool, "readback":
+        str | None}``.  ``string`` is true for PVs read as text.
+        ``readback`` names the PV which follows this (setpoint) PV.
+    """
+    with _recording_control_layer() as layer:
+        devices = build_devices(device_files)
+
+    pvs = {name: {"string": False, "readback": None} for name in layer.pvs}
+    for device in devices:
+        for signal in device_signals(device):
+            for name in pv_names([signal]):
+                if name in pvs:
+                    pvs[name]["string"] = bool(getattr(signal, "as_string", False))
+            setpoint = getattr(signal, "setpoint_pvname", None)
+            if setpoint not in (None, signal.pvname) and setpoint in pvs:
+                pvs[setpoint]["readback"] = signal.pvname
+        for positioner in _positioners(device):
+            setpoint = positioner.user_setpoint.setpoint_pvname
+            if setpoint in pvs:
+                pvs[setpoint]["readback"] = positioner.user_readback.pvname
+        # Recorded only: forget these devices.
+        if device in oregistry.findall(name=device.name, allow_none=True):
+            oregistry.pop(device)
+        if hasattr(device, "destroy"):
+            device.destroy()
+    return pvs
+
+
+def make_pvdb(pvs: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    A caproto channel for each PV (from ``device_pvs()``).
+
+    Numbers are ``ChannelDouble`` (``0``, or ``1`` for a motor's ``.DMOV``)
+    and text is ``ChannelString``.  Writing a setpoint also writes its
+    readback, so positioners (such as ``EpicsMotor``) arrive at once.
+
+    Returns:
+        The channels, by PV name, for ``run_ioc()``.
+    """
+    from caproto import ChannelDouble
+    from caproto import ChannelString
+
+    class Setpoint(ChannelDouble):
+        """A setpoint: its readback follows each value written."""
+
+        def __init__(self, *, readback, **kwargs):
+            """Remember the readback channel."""
+            super().__init__(**kwargs)
+            self.readback = readback
+
+        async def verify_value(self, data):
+            """Also write the value to the readback."""
+            await self.readback.write(data)
+            return data
+
+    pvdb = {}
+    for name, spec in pvs.items():
+        if spec["string"]:
+            pvdb[name] = ChannelString(value="")
+        else:
+            suffix = name[name.rfind(".") :] if "." in name else ""
+            pvdb[name] = ChannelDouble(value=_INITIAL_VALUES.get(suffix, 0.0))
+    for name, spec in pvs.items():
+        readback = pvdb.get(spec["readback"])
+        if isinstance(readback, ChannelDouble) and not spec["string"]:
+            pvdb[name] = Setpoint(readback=readback, value=pvdb[name].value)
+    return pvdb
+
+
+def run_ioc(pvdb: Dict[str, Any], port: int = DEFAULT_PORT) -> None:
+    """
+    Serve these channels (from ``make_pvdb()``) until interrupted.
+
+    Serves on this host only (``LOCALHOST``), at 'port'.  Also runs a CA
+    repeater (which receives the IOC's beacons), unless one is running.
+    Changes the EPICS environment variables of this process: run it in a
+    process of its own.
+    """
+    from caproto.asyncio.server import run
+    from caproto.sync import repeater
+
+    os.environ.update(
+        {
+            "EPICS_CA_SERVER_PORT": str(port),
+            "EPICS_CAS_AUTO_BEACON_ADDR_LIST": "NO",
+            "EPICS_CAS_BEACON_ADDR_LIST": LOCALHOST,
+        }
+    )
+    threading.Thread(
+        target=repeater.run,
+        kwargs={"host": LOCALHOST},
+        name="ca_repeater",
+        daemon=True,
+    ).start()
+    time.sleep(0.1)  # Let the repeater start before the first beacon.
+    logger.info("Serving %d PVs on %s:%d", len(pvdb), LOCALHOST, port)
+    run(pvdb, interfaces=[LOCALHOST], log_pv_names=False)
+
+
+def measure_connections(
+    device_files: List[pathlib.Path | str],
+    timeout: float = 30.0,
+    poll: float = 0.01,
+) -> Dict[str, Any]:
+    """
+    Build the devices, then wait for them to connect.  Report the times.
+
+    Uses the control layer set (by ``set_control_layer()``) in this process.
+
+    Args:
+        device_files: The devices (YAML) files.
+        timeout: Seconds to wait for the devices to connect.
+        poll: Seconds between checks.
+
+    Returns:
+        The ``control_layer``, the numbers of ``devices``, ``pvs`` and
+        ``unconnected`` devices, and the seconds to build the devices
+        (``build_s``), then to connect them (``connect_s``), and both
+        (``total_s``).
+    """
+    t0 = time.monotonic()
+    devices = build_devices(device_files)
+    built = time.monotonic()
+    deadline = built + timeout
+    while unconnected_pvs(devices) and time.monotonic() < deadline:
+        time.sleep(poll)
+    done = time.monotonic()
+
+    signals = [signal for device in devices for signal in device_signals(device)]
+    return {
+        "control_layer": ophyd.cl.name,
+        "devices": len(devices),
+        "pvs": len(pv_names(signals)),
+        "unconnected": len(unconnected_pvs(devices)),
+        "build_s": round(built - t0, 4),
+        "connect_s": round(done - built, 4),
+        "total_s": round(done - t0, 4),
+    }
+
+
+def _positioners(device) -> List[Any]:
+    """(internal) The device and its sub-devices which are EPICS motors."""
+    candidates = [device]
+    if hasattr(device, "walk_subdevices"):
+        candidates += [sub for _attr, sub in device.walk_subdevices()]
+    return [item for item in candidates if isinstance(item, ophyd.EpicsMotor)]
+
+
+class _RecordingPV:
+    """(internal) Stands in for a PV: never connects."""
+
+    connected = False
+
+    def __init__(self, pvname: str):
+        """Remember the name."""
+        self.pvname = pvname
+        self._reference_count = 0
+
+    def add_callback(self, *args, **kwargs) -> int:
+        """Accept (and ignore) a callback."""
+        return 0
+
+    def remove_callback(self, *args, **kwargs) -> None:
+        """Nothing to remove."""
+
+    def clear_callbacks(self) -> None:
+        """Nothing to clear."""
+
+    def wait_for_connection(self, timeout: Optional[float] = None) -> bool:
+        """Never connects."""
+        return False
+
+
+class _RecordingControlLayer:
+    """(internal) The ophyd control layer, but its PVs are only recorded."""
+
+    name = "recording"
+
+    def __init__(self, layer):
+        """Wrap the control layer in use."""
+        self._layer = layer
+        self.pvs: Dict[str, _RecordingPV] = {}
+
+    def __getattr__(self, attr):
+        """Everything else is from the wrapped control layer."""
+        return getattr(self._layer, attr)
+
+    def get_pv(self, pvname: str, **kwargs) -> _RecordingPV:
+        """Record the PV name."""
+        return self.pvs.setdefault(pvname, _RecordingPV(pvname))
+
+    def release_pvs(self, *pvs, **kwargs) -> None:
+        """Nothing to release."""
+
+
+@contextlib.contextmanager
+def _recording_control_layer():
+    """(internal) Signals created in this context only record their PVs."""
+    layer = _RecordingControlLayer(ophyd.get_cl())
+    ophyd.cl = layer
+    try:
+        yield layer
+    finally:
+        ophyd.cl = layer._layer
@@ -0,0 +1,187 @@
+"""SQLite-backed Dictionary
+========================
+
+A dictionary that stores each of its keys as one row of an SQLite database.
+Changing one key updates one row, no matter how large the dictionary is.
+Like :class:`~apsbits.utils.stored_dict.StoredDict`, it ensures that all
+contents are JSON serializable.
+
+.. autosummary::
+    ~SQLiteDict
+"""
+
+__all__ = ["SQLiteDict"]
+
+import collections.abc
+import copy
+import json
+import logging
+import pathlib
+import sqlite3
+import threading
+import weakref
+from typing import Any
+from typing import Dict
+from typing import Union
+
+from apsbits.utils.stored_dict import DEFAULT_DURABILITY
+from apsbits.utils.stored_dict import DURABILITY_DIRECTORY
+from apsbits.utils.stored_dict import DURABILITY_FILE
+from apsbits.utils.stored_dict import DURABILITY_LEVELS
+from apsbits.utils.stored_dict import DURABILITY_NONE
+
+logger = logging.getLogger(__name__)
+logger.bsdev(__file__)
+
+SYNCHRONOUS = {
+    DURABILITY_NONE: "OFF",
+    DURABILITY_FILE: "FULL",
+    DURABILITY_DIRECTORY: "EXTRA",
+}
+"""
+SQLite 'synchronous' setting for each durability level.
+
+As ``StoredDict``: with ``"file"`` (``FULL``), each commit is synced to
+disk (in WAL mode, ``NORMAL`` would not sync each commit).  ``"directory"``
+(``EXTRA``) also syncs the directory of the database's journal files.
+"""
+SQLITE_HEADER = b"SQLite format 3\x00"
+"""First bytes of each SQLite database file."""
+TABLE = "md"
+
+
+class SQLiteDict(collections.abc.MutableMapping):
+    """
+    Dictionary that stores its contents, one row per key, in an SQLite file.
+
+    Keys and values are stored as JSON text.  Reads come from an in-memory
+    cache.  Each change is written (and committed) immediately.
+    """
+
+    def __init__(
+        self,
+        file: Union[str, pathlib.Path],
+        serializable: bool = True,
+        durability: str = DEFAULT_DURABILITY,
+    ) -> None:
+        """
+        Initialize the SQLiteDict instance.
+
+        Args:
+            file (str or pathlib.Path): Path to the SQLite database file.
+            serializable (bool): If True, check that new dictionary entries
+            are JSON serializable (with the same errors as ``StoredDict``).
+            durability (str): One of ``DURABILITY_LEVELS``, applied as the
+            SQLite ``synchronous`` setting.  Defaults to ``"file"``.
+
+        Raises:
+            ValueError: If ``durability`` is not recognized, or if ``file``
+            exists and is not an SQLite database (such as a YAML file).
+        """
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(
+                f"Unknown durability {durability!r}.  Use one of {DURABILITY_LEVELS}."
+            )
+        self._file: pathlib.Path = pathlib.Path(file)
+        if self._file.is_file() and self._file.stat().st_size > 0:
+            with open(self._file, "rb") as f:
+                if f.read(len(SQLITE_HEADER)) != SQLITE_HEADER:
+                    raise ValueError(
+                        f"{str(self._file)!r} is not an SQLite database."
+                        "  Use another file for SQLiteDict."
+                    )
+        self.test_serializable: bool = serializable
+        self._lock: threading.Lock = threading.Lock()
+
+        self._connection = sqlite3.connect(
+            self._file,
+            check_same_thread=False,  # RunEngine & other threads, with our lock
+            isolation_level=None,  # autocommit
+        )
+        weakref.finalize(self, self._connection.close)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={SYNCHRONOUS[durability]}")
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE}"
+            " (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+        self._cache: Dict[Any, Any] = {}
+        self.reload()
+
+    def __deepcopy__(self, memo):
+        """Deep copy of the contents, as a dict (see ``StoredDict``)."""
+        return copy.deepcopy(self._cache, memo)
+
+    def __delitem__(self, key: Any) -> None:
+        """
+        Delete an item from the dictionary by its key.
+
+        Raises:
+            KeyError: If the key does not exist in the dictionary.
+        """
+        del self._cache[key]
+        self._execute(f"DELETE FROM {TABLE} WHERE key = ?", (json.dumps(key),))
+
+    def __getitem__(self, key: Any) -> Any:
+        """Retrieve the value associated with the given key."""
+        return self._cache[key]
+
+    def __iter__(self):
+        """Iterate over the dictionary keys."""
+        yield from self._cache
+
+    def __len__(self):
+        """Number of keys in the dictionary."""
+        return len(self._cache)
+
+    def __repr__(self):
+        """representation of this object."""
+        return f"<{self.__class__.__name__} {dict(self)!r}>"
+
+    def __setitem__(self, key, value):
+        """Write to the dictionary (one row)."""
+        if self.test_serializable:
+            json.dumps({key: value})
+        row = json.dumps(key), json.dumps(value)
+        self._cache[key] = value
+        self._execute(
+            f"INSERT INTO {TABLE} (key, value) VALUES (?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            row,
+        )
+
+    def _execute(self, sql, parameters=()):
+        """(internal) Run one SQL statement, serialized between threads."""
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+    def flush(self):
+        """Nothing to do: each change has been written already."""
+
+    def popitem(self):
+        """
+        Remove and return a (key, value) pair as a 2-tuple.
+
+        Raises:
+            KeyError: If the dictionary is empty.
+        """
+        key, value = self._cache.popitem()
+        self._execute(f"DELETE FROM {TABLE} WHERE key = ?", (json.dumps(key),))
+        return key, value
+
+    def reload(self):
+        """Read dictionary from storage."""
+        logger.debug("reload()")
+        rows = self._execute(f"SELECT key, value FROM {TABLE} ORDER BY rowid")
+        cache = {}
+        for key, value in rows:
+            key = json.loads(key)
+            if isinstance(key, list):
+                key = tuple(key)  # JSON has no tuples; restore hashable key.
+            cache[key] = json.loads(value)
+        self._cache = cache
@@ -12,24 +12,71 @@ ensures that all contents are JSON serializable.
 
 __all__ = ["StoredDict"]
 
+import atexit
 import collections.abc
+import contextlib
+import copy
 import datetime
 import inspect
 import json
 import logging
+import marshal
+import os
 import pathlib
 import threading
 import time
+import weakref
 from typing import Any
 from typing import Dict
+from typing import List
 from typing import Optional
 from typing import Union
 
 import yaml
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows.
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 logger.bsdev(__file__)
 
+DURABILITY_NONE = "none"
+"""Write to a temporary file, then rename.  Safe if the process is killed."""
+DURABILITY_FILE = "file"
+"""Also fsync the file before the rename.  Safe if the computer crashes."""
+DURABILITY_DIRECTORY = "directory"
+"""Also fsync the directory after the rename, so the rename itself is stored."""
+DURABILITY_LEVELS = (DURABILITY_NONE, DURABILITY_FILE, DURABILITY_DIRECTORY)
+DEFAULT_DURABILITY = DURABILITY_FILE
+JOURNAL_MAX_BYTES = 256 * 1024
+HISTORY_MAX_BYTES = 1024 * 1024
+"""Default limit (bytes, as JSON) of the changes kept by ``history()``."""
+JOURNAL_SUFFIX = ".journal"
+LOAD_CACHE_SUFFIX = ".cache"
+LOCK_SUFFIX = ".lock"
+LOAD_CACHE_VERSION = 1
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+"""YAML writer, using libyaml (C) when available."""
+YAML_LOADER = getattr(yaml, "CLoader", yaml.Loader)
+"""YAML reader for Python-specific tags (such as tuples), libyaml if available."""
+YAML_SAFE_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+"""YAML reader, using libyaml (C) when available."""
+
+
+class _YamlDumper(YAML_DUMPER):
+    """(internal) YAML writer that also writes the tracked containers."""
+
+
+_ABSENT = object()
+"""(internal) In a history entry: the key was not in the dictionary."""
+
+_instances: "weakref.WeakValueDictionary[str, StoredDict]" = (
+    weakref.WeakValueDictionary()
+)
+"""All StoredDict objects, so pending changes can be written at exit."""
+
 
 class StoredDict(collections.abc.MutableMapping):
     """
@@ -40,6 +87,57 @@ class StoredDict(collections.abc.MutableMapping):
     flushed after a configurable delay. The YAML serialization and
     deserialization are handled by the static methods `dump` and `load`.
 
+    A single, long-lived sync agent (thread) per object waits (without
+    polling) for the delay to expire after the most recent change.  All
+    changes made within that window are written by one ``dump()``.  See
+    ``sync_stats`` for counters describing the recent writes.
+
+    In *journal* mode, each change (set or delete) is appended as one line
+    of JSON to a sidecar file (the YAML file name with ``.journal`` appended)
+    instead of rewriting the whole YAML file.  Once the journal grows past
+    ``journal_max_bytes``, it is compacted into the YAML file (by the sync
+    agent).  ``reload()`` reads the YAML file, then replays the journal.
+
+    The YAML file is never written in place.  It is written to a temporary
+    file which then replaces the YAML file (an atomic rename).  An
+    interrupted write leaves the previous file intact.  The ``durability``
+    choice (one of ``DURABILITY_LEVELS``) trades write speed for safety
+    after a crash of the computer:
+
+    ===========  ===========================================================
+    durability   description
+    ===========  ===========================================================
+    none         No fsync.  Safe if the process is killed.
+    file         fsync the file before the rename.  (default)
+    directory    fsync the file, then fsync the directory after the rename.
+    ===========  ===========================================================
+
+    YAML is read and written with libyaml (C) when it is available.  With
+    ``load_cache=True``, a compact copy of the contents (the YAML file name
+    with ``.cache`` appended) is kept next to the YAML file.  When the YAML
+    file has not changed since then (same inode, size, and modification
+    time), ``reload()`` reads that copy instead of parsing the YAML.
+
+    With ``shared=True``, several processes (such as the queueserver and an
+    IPython session) may use the same YAML file.  Each write takes an
+    advisory lock (on the YAML file name with ``.lock`` appended), then
+    applies this object's changes, key by key, to the contents on disk.
+    Each read checks (with ``os.stat()``) if the file was replaced by
+    another process and, only if so, merges the file's contents.
+
+    Nested dict and list values are kept as (copies of the value, in)
+    containers which report changes, so that ``md["versions"]["foo"] = ...``
+    or ``md["samples"].append(...)`` is written to storage, just like
+    ``md["key"] = ...``.  Each write serializes only the top-level keys that
+    changed since the previous write.
+
+    With ``history`` greater than zero, the earlier states (as written to
+    storage) are kept in memory as a bounded ring of changes: at most
+    ``history`` entries and (about) ``history_max_bytes`` in total.  Each
+    entry records only the previous values of the keys changed by one write.
+    ``history()`` describes the entries and ``restore(n)`` returns the
+    dictionary to the state before the ``n`` most recent writes.
+
     """
 
     def __init__(
@@ -48,6 +146,13 @@ class StoredDict(collections.abc.MutableMapping):
         delay: float = 5,
         title: Optional[str] = None,
         serializable: bool = True,
+        journal: bool = False,
+        journal_max_bytes: int = JOURNAL_MAX_BYTES,
+        durability: str = DEFAULT_DURABILITY,
+        load_cache: bool = False,
+        shared: bool = False,
+        history: int = 0,
+        history_max_bytes: int = HISTORY_MAX_BYTES,
     ) -> None:
         """
         Initialize the StoredDict instance.
@@ -61,6 +166,25 @@ class StoredDict(collections.abc.MutableMapping):
             If not provided, defaults to "Written by StoredDict.".
             serializable (bool): If True, ensure that new dictionary entries
             are JSON serializable.
+            journal (bool): If True, append each change to a journal file
+            instead of rewriting the YAML file.  Defaults to False.
+            journal_max_bytes (int): Compact the journal into the YAML file
+            when it grows larger than this.
+            durability (str): One of ``DURABILITY_LEVELS``.  Defaults to
+            ``"file"``.
+            load_cache (bool): If True, keep a compact copy of the contents
+            to skip YAML parsing when the file is unchanged.  Defaults to
+            False.
+            shared (bool): If True, merge with changes made to the file by
+            other processes.  Defaults to False.
+            history (int): Number of earlier states to keep for
+            ``restore()``.  Defaults to 0 (none).
+            history_max_bytes (int): Limit (as JSON) of the changes kept for
+            the earlier states.
+
+        Raises:
+            ValueError: If ``durability`` is not recognized, or if
+            ``journal`` is requested with ``shared`` or ``history``.
 
         Returns:
             None
@@ -68,14 +192,73 @@ class StoredDict(collections.abc.MutableMapping):
         self._file: pathlib.Path = pathlib.Path(file)
         self._delay: float = max(0, delay)
         self._title: str = title or f"Written by {self.__class__.__name__}."
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(
+                f"Unknown durability {durability!r}.  Use one of {DURABILITY_LEVELS}."
+            )
+        if shared and journal:
+            raise ValueError("A shared StoredDict cannot use a journal.")
+        if history > 0 and journal:
+            # With a journal, the YAML file is written only when compacted.
+            raise ValueError("A StoredDict with history cannot use a journal.")
+        self._durability: str = durability
+        self._load_cache: bool = load_cache
+        self._shared: bool = shared
+        self._shared_changes: Dict[Any, tuple] = {}
+        self._lock_file: pathlib.Path = self._file.with_name(
+            f"{self._file.name}{LOCK_SUFFIX}"
+        )
+        self._disk_key: Optional[tuple] = None
+        self._ref = weakref.ref(self)
+        self._dirty_keys: set = set()
+        self._generation: int = 0
+        self._snapshot: Dict[Any, Any] = {}
+        self._fragments: Dict[Any, str] = {}
+        self._history: collections.deque = collections.deque()
+        self._history_limit: int = max(0, history)
+        self._history_max_bytes: int = max(0, history_max_bytes)
+        self._history_bytes: int = 0
         self.test_serializable: bool = serializable
-        self.sync_in_progress: bool = False
+        self._journal: bool = journal
+        self._journal_file: pathlib.Path = self._file.with_name(
+            f"{self._file.name}{JOURNAL_SUFFIX}"
+        )
+        self._journal_max_bytes: int = max(0, journal_max_bytes)
+        self._journal_pending: List[str] = []
         self._sync_deadline: float = time.time()
         self._sync_key: str = f"sync_agent_{id(self):x}"
-        self._sync_loop_period: float = 0.005
+        self._sync_condition: threading.Condition = threading.Condition()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._dump_lock: threading.Lock = threading.Lock()
+        self._pending_writes: int = 0
+        self._first_pending_time: Optional[float] = None
+        self._sync_stats: Dict[str, Any] = {
+            "flushes": 0,
+            "writes": 0,
+            "last_writes_per_flush": 0,
+            "max_writes_per_flush": 0,
+            "last_flush_latency": 0.0,
+            "max_flush_latency": 0.0,
+            "last_dump_time": 0.0,
+            "compactions": 0,
+            "last_keys_serialized": 0,
+            "last_generation_written": 0,
+        }
 
         self._cache: Dict[Any, Any] = {}
         self.reload()
+        _instances[self._sync_key] = self
+        weakref.finalize(self, _wake_sync_agent, self._sync_condition)
+
+    def __deepcopy__(self, memo):
+        """
+        Deep copy of the contents, as a dict.
+
+        The RunEngine makes a deep copy of ``RE.md`` for each run.  The copy
+        does not need (and must not share) the sync agent or storage file.
+        """
+        with self._sync_condition:
+            return copy.deepcopy(self._cache, memo)
 
     def __delitem__(self, key: Any) -> None:
         """
@@ -87,7 +270,9 @@ class StoredDict(collections.abc.MutableMapping):
         Raises:
             KeyError: If the key does not exist in the dictionary.
         """
-        del self._cache[key]
+        with self._sync_condition:
+            del self._cache[key]
+            self._delayed_sync_to_storage(("del", key))
 
     def __getitem__(self, key: Any) -> Any:
         """
@@ -99,14 +284,17 @@ class StoredDict(collections.abc.MutableMapping):
         Returns:
             Any: The value corresponding to the specified key.
         """
+        self._check_outside_changes()
         return self._cache[key]
 
     def __iter__(self):
         """Iterate over the dictionary keys."""
+        self._check_outside_changes()
         yield from self._cache
 
     def __len__(self):
         """Number of keys in the dictionary."""
+        self._check_outside_changes()
         return len(self._cache)
 
     def __repr__(self):
@@ -115,51 +303,318 @@ class StoredDict(collections.abc.MutableMapping):
 
     def __setitem__(self, key, value):
         """Write to the dictionary."""
-        outermost_frame = inspect.getouterframes(inspect.currentframe())[-1]
-        if "sphinx-build" in outermost_frame.filename:
-            # Seems that Sphinx is building the documentation.
-            # Ignore all the objects it tries to add.
+        if _building_docs():
+            # Ignore all the objects Sphinx tries to add.
             return
 
         if self.test_serializable:
             json.dumps({key: value})
-        self._cache[key] = value  # Store the new (or revised) content.
+        value = _track(value, self._ref, key)
+        with self._sync_condition:
+            self._cache[key] = value  # Store the new (or revised) content.
+            self._delayed_sync_to_storage(("set", key, value))
 
-        # Reset the deadline.
-        self._sync_deadline = time.time() + self._delay
-        logger.debug("new sync deadline in %f s.", self._delay)
-        if not self.sync_in_progress:
-            # Start the sync_agent (thread).
-            self._delayed_sync_to_storage()
+    @property
+    def sync_in_progress(self) -> bool:
+        """Are there changes waiting to be written to storage?"""
+        return self._pending_writes > 0
 
-    def _delayed_sync_to_storage(self):
+    @property
+    def generation(self) -> int:
+        """Counts the changes to the dictionary (in this process)."""
+        return self._generation
+
+    @property
+    def sync_stats(self) -> Dict[str, Any]:
         """
-        Sync the metadata to storage.
-        Start a time-delay thread.  New writes to the metadata dictionary will
-        extend the deadline.  Sync once the deadline is reached.
+        Counters describing the writes to storage.
+
+        ======================  ================================================
+        key                     description
+        ======================  ================================================
+        flushes                 Number of times the dictionary was written.
+        writes                  Number of changes written (total).
+        last_writes_per_flush   Number of changes covered by the last write.
+        max_writes_per_flush    Most changes covered by any one write.
+        last_flush_latency      Seconds from first pending change to written.
+        max_flush_latency       Longest ``last_flush_latency`` seen.
+        last_dump_time          Seconds spent in the most recent write.
+        compactions             Number of times the journal was compacted.
+        last_keys_serialized    Top-level keys serialized by the last write.
+        last_generation_written ``generation`` of the contents last written.
+        ======================  ================================================
         """
+        with self._sync_condition:
+            return dict(self._sync_stats)
 
-        def sync_agent():
-            """Threaded task."""
-            logger.debug("Starting sync_agent...")
-            self.sync_in_progress = True
-            while time.time() < self._sync_deadline:
-                time.sleep(self._sync_loop_period)
-            logger.debug("Sync waiting period ended")
-            self.sync_in_progress = False
+    def _delayed_sync_to_storage(self, *changes):
+        """
+        Schedule a sync of the dictionary to storage.
+
+        Reset the deadline and wake the sync agent, starting it if needed.
+        New writes to the dictionary will extend the deadline.  The agent
+        syncs once the deadline is reached.
+
+        In journal mode, each of ``changes`` (tuples of ``("set", key, value)``
+        or ``("del", key)``) is queued for the journal.  In shared mode, they
+        are kept to merge with the file contents.
+        """
+        lines = []
+        if self._journal:
+            lines = [StoredDict.journal_entry(*change) for change in changes]
+
+        with self._sync_condition:
+            self._journal_pending.extend(lines)
+            for change in changes:
+                if self._shared:
+                    self._shared_changes[change[1]] = change
+                self._dirty_keys.add(change[1])
+            self._generation += 1
+            now = time.time()
+            if self._pending_writes == 0:
+                self._first_pending_time = now
+            self._pending_writes += max(1, len(changes))
+            self._sync_deadline = now + self._delay
+            logger.debug("new sync deadline in %f s.", self._delay)
+
+            if self._sync_thread is None or not self._sync_thread.is_alive():
+                self._sync_thread = threading.Thread(
+                    target=_sync_agent,
+                    args=(weakref.ref(self), self._sync_condition),
+                    name=self._sync_key,
+                    daemon=True,
+                )
+                self._sync_thread.start()
+            self._sync_condition.notify()
+
+    def _nested_change(self, key):
+        """(internal) A nested value of top-level 'key' was changed."""
+        with self._sync_condition:
+            if key in self._cache:
+                self._delayed_sync_to_storage(("set", key, self._cache[key]))
+
+    def _take_pending(self):
+        """
+        (internal) Claim all pending changes.
+
+        Caller holds the dump lock and the condition.  Until they are
+        written (still holding the dump lock), the claimed changes are not
+        in ``_shared_changes``: a merge by a reader then would lose them.
+        """
+        pending = (
+            self._pending_writes,
+            self._first_pending_time,
+            self._journal_pending,
+            self._shared_changes,
+        )
+        self._pending_writes = 0
+        self._first_pending_time = None
+        self._journal_pending = []
+        self._shared_changes = {}
+        return pending
+
+    def _write_pending(self, compact=False):
+        """(internal) Write the pending changes to storage, update the counters."""
+        compacted = False
+        with self._dump_lock:
+            with self._sync_condition:
+                writes, first_pending_time, lines, changes = self._take_pending()
+            t0 = time.time()
+            if self._journal:
+                StoredDict.append_journal(
+                    self._journal_file, lines, durability=self._durability
+                )
+                if compact or self._journal_size() > self._journal_max_bytes:
+                    # Changes after the journal was written are in the next
+                    # pending batch.  Replaying them later does no harm.
+                    self._dump()
+                    self._journal_file.unlink(missing_ok=True)
+                    compacted = True
+            elif self._shared:
+                with _file_lock(self._lock_file):
+                    if _path_key(self._file) != self._disk_key:
+                        self._merge_from_disk(changes)
+                    self._disk_key = self._dump()
+            else:
+                self._dump()
+            t1 = time.time()
 
-            StoredDict.dump(self._file, self._cache, title=self._title)
+        with self._sync_condition:
+            stats = self._sync_stats
+            stats["flushes"] += 1
+            stats["writes"] += writes
+            stats["last_writes_per_flush"] = writes
+            stats["max_writes_per_flush"] = max(writes, stats["max_writes_per_flush"])
+            stats["last_dump_time"] = t1 - t0
+            stats["compactions"] += int(compacted)
+            if first_pending_time is not None:
+                latency = t1 - first_pending_time
+                stats["last_flush_latency"] = latency
+                stats["max_flush_latency"] = max(latency, stats["max_flush_latency"])
 
-        thred = threading.Thread(target=sync_agent)
-        thred.start()
+    def _check_outside_changes(self):
+        """(internal) In shared mode, merge if another process wrote the file."""
+        if self._shared and _path_key(self._file) != self._disk_key:
+            with self._dump_lock:
+                if _path_key(self._file) != self._disk_key:
+                    self._merge_from_disk({})
+
+    def _merge_from_disk(self, changes):
+        """
+        (internal) Replace the cache with the file contents plus our changes.
+
+        Apply 'changes' (being written now) then any changes made since.
+        Caller holds the dump lock.
+        """
+        key, contents = _load(self._file, load_cache=self._load_cache)
+        with self._sync_condition:
+            for change in (*changes.values(), *self._shared_changes.values()):
+                if change[0] == "set":
+                    contents[change[1]] = change[2]
+                else:
+                    contents.pop(change[1], None)
+            self._set_contents(contents)
+            self._disk_key = key
+        logger.debug("Merged changes from %s", self._file)
+
+    def _set_contents(self, contents):
+        """
+        (internal) Replace the cache.  Caller holds the condition.
+
+        A nested dict or list (which the caller might still hold) is kept
+        when its value is unchanged, so later changes to it are still
+        written.  Once its value was changed by another process, it is
+        replaced: changes to the old container are no longer written.
+        """
+        cache = self._cache
+        self._cache = {}
+        for k, v in contents.items():
+            current = cache.get(k)
+            if isinstance(current, _Tracked) and current == v:
+                self._cache[k] = current
+            else:
+                self._cache[k] = _track(v, self._ref, k)
+        previous = self._snapshot
+        self._snapshot = _untrack(contents)  # as in storage ...
+        for key in self._dirty_keys:  # ... except changes not yet written
+            if key in previous:
+                self._snapshot[key] = previous[key]
+            else:
+                self._snapshot.pop(key, None)
+        self._fragments = {}
+
+    def _take_snapshot(self):
+        """
+        (internal) Consistent copy of the contents, to write to storage.
+
+        Copy-on-write: only the values changed since the previous snapshot
+        are copied (as plain dict and list).  The copies of the others are
+        shared with the previous snapshot.  Holds the condition only while
+        copying, so a write to the dictionary waits at most that long and
+        never for serialization.
+
+        Returns (generation, snapshot, changed keys).
+        """
+        with self._sync_condition:
+            dirty, self._dirty_keys = self._dirty_keys, set()
+            previous = self._snapshot
+            snapshot = {}
+            changed = set()
+            for key, value in self._cache.items():
+                if key in dirty or key not in previous:
+                    snapshot[key] = _untrack(value)
+                    changed.add(key)
+                else:
+                    snapshot[key] = previous[key]
+            self._snapshot = snapshot
+            if self._history_limit > 0:
+                delta = {k: previous.get(k, _ABSENT) for k in changed}
+                delta.update({k: v for k, v in previous.items() if k not in snapshot})
+                self._add_history(delta)
+            return self._generation, snapshot, changed
+
+    def _add_history(self, delta):
+        """
+        (internal) Remember the previous values of the keys just changed.
+
+        Drop the oldest entries beyond the limits.  Caller holds the
+        condition.
+        """
+        if len(delta) == 0:
+            return
+        size = len(json.dumps(list(delta.items()), default=repr))
+        self._history.append(
+            dict(
+                time=datetime.datetime.now(),
+                generation=self._generation,
+                delta=delta,
+                size=size,
+            )
+        )
+        self._history_bytes += size
+        while len(self._history) > self._history_limit or (
+            self._history_bytes > self._history_max_bytes and len(self._history) > 1
+        ):
+            self._history_bytes -= self._history.popleft()["size"]
+
+    def _dump(self):
+        """
+        (internal) Write a snapshot of the dictionary to the YAML file.
+
+        Only the top-level keys changed since the last write are serialized
+        again.  The YAML of the other keys is re-used.  Caller holds the
+        dump lock.
+        """
+        generation, snapshot, changed = self._take_snapshot()
+        fragments = self._fragments
+        changed.update(key for key in snapshot if key not in fragments)
+        for key in changed:
+            fragments[key] = yaml.dump(
+                {key: snapshot[key]}, indent=2, Dumper=YAML_DUMPER
+            )
+        for key in set(fragments).difference(snapshot):
+            del fragments[key]  # deleted keys
+        keys = list(snapshot)
+        try:
+            keys = sorted(keys)  # as yaml.dump()
+        except TypeError:
+            pass  # Keys of different types (such as int and str) cannot be sorted.
+
+        body = "".join(fragments[key] for key in keys) or "{}\n"
+        file_key = _replace_file(
+            self._file, _yaml_header(self._title) + body, durability=self._durability
+        )
+        if self._load_cache:
+            _write_load_cache(self._file, file_key, snapshot)
+        with self._sync_condition:
+            self._sync_stats["last_keys_serialized"] = len(changed)
+            self._sync_stats["last_generation_written"] = generation
+        return file_key
 
     def flush(self):
         """Force a write of the dictionary to disk"""
         logger.debug("flush()")
-        if not self.sync_in_progress:
-            StoredDict.dump(self._file, self._cache, title=self._title)
-        self._sync_deadline = time.time()
-        self.sync_in_progress = False
+        with self._sync_condition:
+            self._sync_deadline = time.time()
+        self._write_pending()
+
+    def compact(self):
+        """
+        Write the dictionary to the YAML file and remove the journal.
+
+        Same as ``flush()`` when not in journal mode.
+        """
+        logger.debug("compact()")
+        with self._sync_condition:
+            self._sync_deadline = time.time()
+        self._write_pending(compact=True)
+
+    def _journal_size(self) -> int:
+        """(internal) Size (bytes) of the journal file."""
+        try:
+            return self._journal_file.stat().st_size
+        except FileNotFoundError:
+            return 0
 
     def popitem(self):
         """
@@ -168,31 +623,614 @@ class StoredDict(collections.abc.MutableMapping):
         Raises:
             KeyError: If the dictionary is empty.
         """
-        return self._cache.popitem()
+        with self._sync_condition:
+            item = self._cache.popitem()
+            self._delayed_sync_to_storage(("del", item[0]))
+        return item
+
+    def history(self) -> List[Dict[str, Any]]:
+        """
+        Describe the earlier states kept for ``restore()``, most recent first.
+
+        Entry ``n`` is the state before the ``n`` most recent writes to
+        storage.  Each is a dict with keys: ``n``, ``time`` (of the write
+        which replaced that state), ``generation``, and ``keys`` (changed by
+        that write).
+        """
+        with self._sync_condition:
+            entries = list(self._history)
+        return [
+            dict(
+                n=n,
+                time=entry["time"],
+                generation=entry["generation"],
+                keys=list(entry["delta"]),
+            )
+            for n, entry in enumerate(reversed(entries), start=1)
+        ]
+
+    def restore(self, n: int = 1) -> None:
+        """
+        Return to the state before the ``n`` most recent writes to storage.
+
+        Starting from the current contents, the changes of the ``n`` most
+        recent history entries are undone.  Only the keys they changed are
+        written.  The restore is itself a change (and so can be undone).
+
+        ``n`` counts the entries of ``history()`` as it was when called.
+        Changes not yet written are also undone.  (They are written first,
+        as one more history entry, which is undone, too.)
+
+        Raises:
+            IndexError: If there are fewer than ``n`` entries in
+            ``history()``.
+        """
+        with self._sync_condition:
+            shown = list(self._history)
+        if not 1 <= n <= len(shown):
+            raise IndexError(f"Cannot restore {n}: {len(shown)} states in history.")
+        self.flush()  # Now, the snapshot holds the current contents.
+        with self._sync_condition:
+            entries = list(self._history)
+            # Entries added by the flush are undone, too.
+            oldest = shown[-n]
+            if not any(entry is oldest for entry in entries):
+                raise IndexError(f"Cannot restore {n}: that state was dropped.")
+            count = len(entries) - next(
+                i for i, entry in enumerate(entries) if entry is oldest
+            )
+            state = {}
+            for entry in reversed(entries[-count:]):  # most recent first
+                state.update(entry["delta"])
+            for key, value in state.items():
+                if value is _ABSENT:
+                    self._cache.pop(key, None)
+                    self._delayed_sync_to_storage(("del", key))
+            self.set_many({k: v for k, v in state.items() if v is not _ABSENT})
+
+    def set_many(self, items) -> None:
+        """
+        Write several items to the dictionary at once.
+
+        Faster than setting each key: the items are checked (as JSON) together
+        and one sync to storage is scheduled for all of them.
+
+        Args:
+            items (dict or iterable): Mapping (or ``(key, value)`` pairs)
+            to write.
+
+        Raises:
+            TypeError: If an item is not JSON serializable.  No item is
+            written.
+        """
+        if _building_docs():
+            return
+
+        items = dict(items)
+        if len(items) == 0:
+            return
+        if self.test_serializable:
+            json.dumps(items)
+        items = {key: _track(value, self._ref, key) for key, value in items.items()}
+        with self._sync_condition:
+            self._cache.update(items)
+            self._delayed_sync_to_storage(
+                *[("set", key, value) for key, value in items.items()]
+            )
+
+    def update(self, *args, **kwargs) -> None:
+        """Update the dictionary (as ``dict.update()``), using ``set_many()``."""
+        self.set_many(dict(*args, **kwargs))
 
     def reload(self):
-        """Read dictionary from storage."""
+        """Read dictionary from storage (and replay the journal, if any)."""
         logger.debug("reload()")
-        self._cache = StoredDict.load(self._file)
+        key, cache = _load(self._file, load_cache=self._load_cache)
+        if self._journal:
+            StoredDict.replay_journal(self._journal_file, cache)
+        with self._sync_condition:
+            self._set_contents(cache)
+            self._disk_key = key
 
     @staticmethod
-    def dump(file, contents, title=None):
-        """Write dictionary to YAML file."""
+    def dump(
+        file, contents, title=None, durability=DEFAULT_DURABILITY, load_cache=False
+    ):
+        """
+        Write dictionary to YAML file.
+
+        The content is written to a temporary file in the same directory
+        which then replaces ``file``.  See ``DURABILITY_LEVELS``.  If
+        ``load_cache`` is True, also write the compact copy for ``load()``.
+
+        Returns an identifier (from ``os.stat()``) of the file written.
+        """
         logger.debug("_dump(): file='%s', contents=%r, title=%r", file, contents, title)
-        with open(file, "w") as f:
-            if isinstance(title, str) and len(title) > 0:
-                f.write(f"# {title}\n")
-            f.write(f"# Dictionary contents written: {datetime.datetime.now()}\n\n")
-            f.write(yaml.dump(contents, indent=2))
+        text = _yaml_header(title) + yaml.dump(contents, indent=2, Dumper=_YamlDumper)
+        key = _replace_file(file, text, durability=durability)
+        if load_cache:
+            _write_load_cache(file, key, _untrack(contents))
+        return key
+
+    @staticmethod
+    def load(file, load_cache=False):
+        """
+        Read dictionary from YAML file.
+
+        If ``load_cache`` is True, read the compact copy instead when the
+        YAML file has not changed since the copy was written.
+        """
+        return _load(file, load_cache=load_cache)[1]
+
+    @staticmethod
+    def journal_entry(op, key, value=None):
+        """Describe one change ('set' or 'del') as a line of JSON."""
+        entry = {"op": op, "key": key}
+        if op == "set":
+            entry["value"] = value
+        return json.dumps(entry, separators=(",", ":")) + "\n"
 
     @staticmethod
-    def load(file):
-        """Read dictionary from YAML file."""
-        from apsbits.utils.config_loaders import load_config_yaml
+    def append_journal(file, lines, durability=DEFAULT_DURABILITY):
+        """Append lines (from ``journal_entry()``) to the journal file."""
+        if len(lines) > 0:
+            created = not os.path.exists(file)
+            with open(file, "a") as f:
+                f.write("".join(lines))
+                if durability != DURABILITY_NONE:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if created and durability == DURABILITY_DIRECTORY:
+                _fsync_directory(pathlib.Path(file).parent)
 
+    @staticmethod
+    def replay_journal(file, contents):
+        """Apply the changes in the journal file to the ``contents`` dictionary."""
         file = pathlib.Path(file)
-        logger.debug("_load('%s')", file)
-        md: Optional[Dict[Any, Any]] = None
+        logger.debug("replay_journal('%s')", file)
+        if not file.exists():
+            return contents
+        with open(file, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                try:
+                    entry = json.loads(line)
+                    key = entry["key"]
+                    if entry["op"] == "set":
+                        contents[key] = entry["value"]
+                    elif entry["op"] == "del":
+                        contents.pop(key, None)
+                except (KeyError, TypeError, ValueError) as exc:
+                    # Such as a partial last line, written when interrupted.
+                    logger.warning(
+                        "Skipping line %d of journal %s: %s", line_number, file, exc
+                    )
+        return contents
+
+
+class _Tracked:
+    """
+    (internal) Container within a StoredDict value that reports its changes.
+
+    Holds a weak reference to the StoredDict and the top-level key of the
+    value.  Contents added are checked (as JSON) and tracked, too.  Changes
+    are made holding the StoredDict's lock, so a snapshot is never torn.
+    """
+
+    __slots__ = ()
+
+    def _check(self, contents):
+        """Check new contents are JSON serializable (if the owner wants)."""
+        sdict = self._owner()
+        if sdict is not None and sdict.test_serializable:
+            json.dumps(contents)
+
+    def _adopt(self, value):
+        """Track a value added to this container."""
+        return _track(value, self._owner, self._key)
+
+    @contextlib.contextmanager
+    def _changing(self):
+        """Make a change, holding the StoredDict's lock, then report it."""
+        sdict = self._owner()
+        if sdict is None:
+            yield
+            return
+        with sdict._sync_condition:
+            yield
+            sdict._nested_change(self._key)
+
+
+class _TrackedDict(_Tracked, dict):
+    """(internal) A dict that reports its changes to a StoredDict."""
+
+    __slots__ = ("_owner", "_key")
+
+    def __init__(self, contents, owner, key):
+        """Copy (and track) 'contents', a value of StoredDict 'owner()[key]'."""
+        super().__init__()
+        self._owner = owner
+        self._key = key
+        for k, v in contents.items():
+            dict.__setitem__(self, k, self._adopt(v))
+
+    def __deepcopy__(self, memo):
+        """Deep copy, as a plain dict."""
+        return copy.deepcopy(dict(self), memo)
+
+    def __reduce__(self):
+        """Copy (and pickle) as a plain dict."""
+        return dict, (dict(self),)
+
+    def __setitem__(self, key, value):
+        """Set an item and report the change."""
+        self._check({key: value})
+        with self._changing():
+            dict.__setitem__(self, key, self._adopt(value))
+
+    def __delitem__(self, key):
+        """Delete an item and report the change."""
+        with self._changing():
+            dict.__delitem__(self, key)
+
+    def __ior__(self, other):
+        """Update (with |=) and report the change."""
+        self.update(other)
+        return self
+
+    def clear(self):
+        """Remove all items and report the change."""
+        with self._changing():
+            dict.clear(self)
+
+    def pop(self, key, *default):
+        """Remove an item, return its value, and report the change."""
+        with self._changing():
+            value = dict.pop(self, key, *default)
+        return value
+
+    def popitem(self):
+        """Remove the last item, return it, and report the change."""
+        with self._changing():
+            item = dict.popitem(self)
+        return item
+
+    def setdefault(self, key, default=None):
+        """Set (and report) the key if it is not present.  Return its value."""
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        """Update from a mapping (or pairs) and report the change once."""
+        updates = dict(*args, **kwargs)
+        self._check(updates)
+        with self._changing():
+            for k, v in updates.items():
+                dict.__setitem__(self, k, self._adopt(v))
+
+
+class _TrackedList(_Tracked, list):
+    """(internal) A list that reports its changes to a StoredDict."""
+
+    __slots__ = ("_owner", "_key")
+
+    def __init__(self, contents, owner, key):
+        """Copy (and track) 'contents', a value of StoredDict 'owner()[key]'."""
+        self._owner = owner
+        self._key = key
+        super().__init__(self._adopt(v) for v in contents)
+
+    def __deepcopy__(self, memo):
+        """Deep copy, as a plain list."""
+        return copy.deepcopy(list(self), memo)
+
+    def __reduce__(self):
+        """Copy (and pickle) as a plain list."""
+        return list, (list(self),)
+
+    def __setitem__(self, index, value):
+        """Set item(s) and report the change."""
+        if isinstance(index, slice):
+            value = list(value)
+            self._check(value)
+            value = [self._adopt(v) for v in value]
+        else:
+            self._check(value)
+            value = self._adopt(value)
+        with self._changing():
+            list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        """Delete item(s) and report the change."""
+        with self._changing():
+            list.__delitem__(self, index)
+
+    def __iadd__(self, other):
+        """Extend (with +=) and report the change."""
+        self.extend(other)
+        return self
+
+    def __imul__(self, n):
+        """Repeat (with *=) and report the change."""
+        with self._changing():
+            list.__imul__(self, n)
+        return self
+
+    def append(self, value):
+        """Append an item and report the change."""
+        self._check(value)
+        with self._changing():
+            list.append(self, self._adopt(value))
+
+    def clear(self):
+        """Remove all items and report the change."""
+        with self._changing():
+            list.clear(self)
+
+    def extend(self, values):
+        """Append items and report the change once."""
+        values = list(values)
+        self._check(values)
+        with self._changing():
+            list.extend(self, [self._adopt(v) for v in values])
+
+    def insert(self, index, value):
+        """Insert an item and report the change."""
+        self._check(value)
+        with self._changing():
+            list.insert(self, index, self._adopt(value))
+
+    def pop(self, index=-1):
+        """Remove an item, return it, and report the change."""
+        with self._changing():
+            value = list.pop(self, index)
+        return value
+
+    def remove(self, value):
+        """Remove the first matching item and report the change."""
+        with self._changing():
+            list.remove(self, value)
+
+    def reverse(self):
+        """Reverse in place and report the change."""
+        with self._changing():
+            list.reverse(self)
+
+    def sort(self, *args, **kwargs):
+        """Sort in place and report the change."""
+        with self._changing():
+            list.sort(self, *args, **kwargs)
+
+
+_YamlDumper.add_representer(_TrackedDict, _YamlDumper.represent_dict)
+_YamlDumper.add_representer(_TrackedList, _YamlDumper.represent_list)
+
+
+def _track(value, owner, key):
+    """(internal) Value to store as StoredDict 'owner()[key]', tracking changes."""
+    if isinstance(value, _Tracked) and value._owner is owner and value._key == key:
+        return value  # Already tracked for this key.
+    if isinstance(value, dict):
+        return _TrackedDict(value, owner, key)
+    if isinstance(value, list):
+        return _TrackedList(value, owner, key)
+    return value
+
+
+def _untrack(value):
+    """(internal) Copy of 'value' with plain dict and list containers."""
+    if isinstance(value, dict):
+        return {k: _untrack(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_untrack(v) for v in value]
+    return value
+
+
+def _yaml_header(title):
+    """(internal) Comments written at the top of the YAML file."""
+    text = ""
+    if isinstance(title, str) and len(title) > 0:
+        text += f"# {title}\n"
+    text += f"# Dictionary contents written: {datetime.datetime.now()}\n\n"
+    return text
+
+
+def _building_docs() -> bool:
+    """(internal) Is Sphinx building the documentation?"""
+    frame = inspect.currentframe()
+    while frame.f_back is not None:  # Walk out, without reading any source.
+        frame = frame.f_back
+    return "sphinx-build" in frame.f_code.co_filename
+
+
+def _load(file, load_cache=False):
+    """(internal) Read a YAML file.  Returns its ``_file_key()`` and contents."""
+    file = pathlib.Path(file)
+    logger.debug("_load('%s')", file)
+    try:
+        key = _file_key(os.stat(file))
+    except FileNotFoundError:
+        return None, {}
+    if load_cache:
+        md = _read_load_cache(file, key)
+        if md is not None:
+            return key, md
+
+    md: Optional[Dict[Any, Any]] = None
+    with open(file, "r") as f:
+        content = f.read()
+    try:
+        md = yaml.load(content, Loader=YAML_SAFE_LOADER)
+    except yaml.constructor.ConstructorError:
+        # Written with Python-specific tags (such as '!!python/tuple').
+        md = yaml.load(content, Loader=YAML_LOADER)
+    md = md or {}
+    if load_cache:
+        _write_load_cache(file, key, md)
+    return key, md
+
+
+def _replace_file(file, text, durability=DEFAULT_DURABILITY):
+    """
+    (internal) Write text to a temporary file, then rename it to 'file'.
+
+    Returns the ``_file_key()`` of the file written.
+    """
+    file = pathlib.Path(file)
+    temporary = file.with_name(
+        f".{file.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with open(temporary, "w") as f:
+            f.write(text)
+            if durability != DURABILITY_NONE:
+                f.flush()
+                os.fsync(f.fileno())
         if file.exists():
-            md = load_config_yaml(file)
-        return md or {}
+            os.chmod(temporary, file.stat().st_mode)
+        # The rename keeps inode, size, and modification time.
+        key = _file_key(os.stat(temporary))
+        os.replace(temporary, file)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+    if durability == DURABILITY_DIRECTORY:
+        _fsync_directory(file.parent)
+    return key
+
+
+def _file_key(stat):
+    """(internal) Identify one version of a file, from its os.stat() result."""
+    return (
+        LOAD_CACHE_VERSION,
+        marshal.version,
+        stat.st_ino,
+        stat.st_size,
+        stat.st_mtime_ns,
+    )
+
+
+def _path_key(file):
+    """(internal) The ``_file_key()`` of a file, or None if it does not exist."""
+    try:
+        return _file_key(os.stat(file))
+    except FileNotFoundError:
+        return None
+
+
+@contextlib.contextmanager
+def _file_lock(file):
+    """(internal) Hold an exclusive, advisory lock on 'file' (POSIX only)."""
+    with open(file, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _load_cache_file(file):
+    """(internal) Name of the compact copy of a YAML file."""
+    file = pathlib.Path(file)
+    return file.with_name(f"{file.name}{LOAD_CACHE_SUFFIX}")
+
+
+def _read_load_cache(file, key):
+    """(internal) Contents from the compact copy, or None if it is stale."""
+    try:
+        with open(_load_cache_file(file), "rb") as f:
+            cached_key, contents = marshal.load(f)
+    except FileNotFoundError:
+        return None
+    except (EOFError, TypeError, ValueError) as exc:
+        logger.debug("Ignoring unreadable load cache for %s: %s", file, exc)
+        return None
+    if tuple(cached_key) != key:
+        return None
+    return contents
+
+
+def _write_load_cache(file, key, contents):
+    """
+    (internal) Write the compact copy of a YAML file (using marshal).
+
+    The 'marshal' format is fast and (unlike 'pickle') cannot run code when
+    read.  Contents it cannot represent (such as dates) are not cached.
+    """
+    try:
+        data = marshal.dumps((key, contents))
+    except ValueError as exc:
+        logger.debug("Not caching %s: %s", file, exc)
+        return
+    cache_file = _load_cache_file(file)
+    temporary = cache_file.with_name(
+        f".{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, cache_file)
+    except OSError as exc:
+        temporary.unlink(missing_ok=True)
+        logger.debug("Could not write load cache %s: %s", cache_file, exc)
+
+
+def _fsync_directory(path):
+    """(internal) Store a directory's entries (such as a rename) on disk."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError as exc:  # Such as on Windows.
+        logger.debug("Cannot open directory %s for fsync: %s", path, exc)
+        return
+    try:
+        os.fsync(fd)
+    except OSError as exc:
+        logger.debug("Cannot fsync directory %s: %s", path, exc)
+    finally:
+        os.close(fd)
+
+
+def _sync_agent(ref, condition):
+    """
+    (internal) Long-lived thread that writes a StoredDict after its deadline.
+
+    Waits on ``condition`` (no polling) for changes.  Holds only a weak
+    reference to the StoredDict while idle so the dictionary can be deleted.
+    """
+    logger.debug("Starting sync_agent...")
+    while True:
+        with condition:
+            sdict = ref()
+            if sdict is None:
+                return  # The StoredDict has been deleted.
+            if sdict._pending_writes == 0:
+                del sdict  # Do not keep the dictionary alive while idle.
+                condition.wait()
+                continue
+            remaining = sdict._sync_deadline - time.time()
+            if remaining > 0:
+                condition.wait(remaining)
+                continue
+            logger.debug("Sync waiting period ended")
+
+        try:
+            sdict._write_pending()  # Claims the changes pending by then.
+        except Exception as exc:
+            logger.error("Could not write %s: %s", sdict._file, exc)
+        del sdict
+
+
+def _wake_sync_agent(condition):
+    """(internal) Wake a sync agent so it can notice its StoredDict is gone."""
+    with condition:
+        condition.notify_all()
+
+
+@atexit.register
+def _flush_at_exit():
+    """(internal) Write any StoredDict that has changes not yet written."""
+    for sdict in list(_instances.values()):
+        if sdict.sync_in_progress:
+            sdict.flush()